@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import logging
+from tableauscraper import api
+from tableauscraper.TableauScraper import TableauScraper
+from tableauscraper.TableauWorkbook import TableauWorkbook
+from tableauscraper.TableauWorksheet import TableauWorksheet
+
+
+class AsyncTableauScraper(TableauScraper):
+
+    executor = None
+    workbook: TableauWorkbook = None  # workbook returned by the last command
+    _lock = None
+
+    def __init__(self, logLevel=logging.INFO, delayMs=500, verify=True, executor=None, **kwargs):
+        super().__init__(logLevel=logLevel, delayMs=delayMs, verify=verify, **kwargs)
+        # commands run in an executor thread: each of their requests sleeps there for its delay slot,
+        # the event loop is not blocked
+        self.executor = executor
+        self.workbook = None
+        self._lock = None
+
+    def getLock(self):
+        # created lazily so that it's bound to the running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def throttle(self):
+        # waits for a request slot on the event loop, for requests sent outside of the api
+        waitTime = api.reserveDelay(self)
+        if waitTime > 0:
+            self.logger.debug(f"delaying request by {waitTime} seconds")
+            await asyncio.sleep(waitTime)
+        return waitTime
+
+    async def command(self, func, *args, keepWorkbook=True, **kwargs):
+        # a viz session holds server side state, commands of one session are serialized
+        async with self.getLock():
+            result = await self.run(func, *args, **kwargs)
+            api.setLastActionTime(self)
+            if keepWorkbook:
+                self.workbook = result
+            return result
+
+    def resolveWorksheet(self, worksheet) -> TableauWorksheet:
+        if isinstance(worksheet, TableauWorksheet):
+            return worksheet
+        if self.workbook is not None:
+            return self.workbook.getWorksheet(worksheet)
+        return TableauScraper.getWorksheet(self, worksheet)
+
+    def emptyWorkbook(self) -> TableauWorkbook:
+        return TableauWorkbook(
+            scraper=self, originalData=self.data, originalInfo=self.info, data=[]
+        )
+
+    async def loads(self, url, params={}):
+        async with self.getLock():
+            await self.run(TableauScraper.loads, self, url, params)
+            self.workbook = None
+
+    def restore(self, state):
+        TableauScraper.restore(self, state)
+        # a fork must not share the lock nor the last workbook of its origin
+        self.workbook = None
+        self._lock = None
+        return self
+
+    async def getWorkbook(self) -> TableauWorkbook:
+        # no request is sent but the data dictionary and the segments must not change meanwhile
+        async with self.getLock():
+            return await self.run(TableauScraper.getWorkbook, self)
+
+    async def getWorksheet(self, worksheetName) -> TableauWorksheet:
+        async with self.getLock():
+            return await self.run(TableauScraper.getWorksheet, self, worksheetName)
+
+    async def setFilter(self, worksheet, columnName, value, **kwargs) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.resolveWorksheet(worksheet).setFilter(
+                columnName, value, **kwargs)
+        )
+
+    async def select(self, worksheet, column, value) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.resolveWorksheet(worksheet).select(column, value)
+        )
+
+    async def setFilters(self, worksheet, filters, **kwargs) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.resolveWorksheet(worksheet).setFilters(
+                filters, **kwargs)
+        )
+
+    async def selectMany(self, worksheet, column, values) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.resolveWorksheet(worksheet).selectMany(column, values)
+        )
+
+    async def levelDrill(self, worksheet, drillDown, position=0) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.resolveWorksheet(worksheet).levelDrill(
+                drillDown, position)
+        )
+
+    async def setParameter(self, inputName, value, inputParameter=False) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.emptyWorkbook().setParameter(
+                inputName, value, inputParameter)
+        )
+
+    async def goToSheet(self, sheetName) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.emptyWorkbook().goToSheet(sheetName)
+        )
+
+    async def goToStoryPoint(self, storyPointId) -> TableauWorkbook:
+        return await self.command(
+            lambda: self.emptyWorkbook().goToStoryPoint(storyPointId)
+        )
+
+    async def getDownloadableSummaryData(self, worksheet, numRows=200):
+        return await self.command(
+            lambda: self.resolveWorksheet(
+                worksheet).getDownloadableSummaryData(numRows),
+            keepWorkbook=False
+        )
+
+    async def getDownloadableUnderlyingData(self, worksheet, numRows=200):
+        return await self.command(
+            lambda: self.resolveWorksheet(
+                worksheet).getDownloadableUnderlyingData(numRows),
+            keepWorkbook=False
+        )
+
+    async def getCsvData(self, sheetName, prefix="vudcsv"):
+        return await self.command(
+            lambda: self.emptyWorkbook().getCsvData(sheetName, prefix=prefix),
+            keepWorkbook=False
+        )
+
+    async def getCrossTabData(self, sheetName):
+        return await self.command(
+            lambda: self.emptyWorkbook().getCrossTabData(sheetName),
+            keepWorkbook=False
+        )
+
+    async def getAllCrossTabs(self, sheetNames=None, workers=4):
+        return await self.command(
+            lambda: self.emptyWorkbook().getAllCrossTabs(sheetNames, workers),
+            keepWorkbook=False
+        )
@@ -1,12 +1,17 @@
 from urllib.parse import urlparse, unquote, urlunparse, urlunsplit
-from bs4 import BeautifulSoup
 import json
-import re
+import threading
 from tableauscraper import dashboard
 from tableauscraper import parameterControl
 from tableauscraper import selectItem
 from tableauscraper import utils
 from tableauscraper import api
+from tableauscraper import transport
+from tableauscraper import snapshot
+from tableauscraper import cache
+from tableauscraper import state
+from tableauscraper import instrumentation
+from tableauscraper.dataDictionary import DataDictionary
 from tableauscraper.TableauWorksheet import TableauWorksheet
 from tableauscraper.TableauWorkbook import TableauWorkbook
 import logging
@@ -28,82 +33,139 @@ class TableauScraper:
     dashboard: str = ""
     tableauData = {}
     dataSegments = {}  # persistent data dictionary
-    parameters = []  # persist parameter controls
-    filters = {}  # persist filters per worksheet
+    dataDictionary: DataDictionary = None  # values of dataSegments merged per dataType
+    parameters = {}  # persist parameter controls by parameterName
+    filters = {}  # persist filters per worksheet by globalFieldName
     zones = {}  # persist zones
     logger = logging.getLogger("tableauScraper")
     delayMs = 500  # delay between actions (select/dropdown)
     lastActionTime = 0
     session = None
+    adapter = None  # pooled/retrying transport shared by all sessions of this scraper
+    rateLimiter = None  # optional ratelimit.RateLimiter shared between scrapers, replaces delayMs
+    blockingDelay = True  # api calls sleep before each session request (delayMs or rateLimiter)
     verify = True
-
-    def __init__(self, logLevel=logging.INFO, delayMs=500, verify=True):
-        ch = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        ch.setFormatter(formatter)
-        self.logger.addHandler(ch)
+    cache = None  # optional cache.ResponseCache for vizql commands
+    stateHash: str = ""  # hash of the viz url and of the stateful commands sent since loads
+    pendingCommands = []  # commands served from the cache, not sent to the server yet
+    onRequestStart = []  # callables receiving the event dict of each request, see instrumentation
+    onRequestEnd = []
+    lock = None  # guards pendingCommands, stateHash and the cache writes of this scraper
+    delayLock = None  # guards lastActionTime
+
+    def __init__(self, logLevel=logging.INFO, delayMs=500, verify=True, poolSize=10, retries=3, backoffFactor=0.5, timeout=(10, 120), adapter=None, rateLimiter=None, cache=None, onRequestStart=None, onRequestEnd=None):
+        # the logger is shared by all instances, only attach the handler once
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
         self.logger.setLevel(logLevel)
         self.delayMs = delayMs
         self.tableauData = {}
         self.data = {}
         self.info = {}
+        # per instance state, the class level defaults would be shared between scrapers
+        self.dataSegments = {}
+        self.dataDictionary = DataDictionary(release=True)
+        self.parameters = {}
+        self.filters = {}
+        self.zones = {}
         self.verify = verify
+        self.rateLimiter = rateLimiter
+        self.cache = cache
+        self.stateHash = ""
+        self.pendingCommands = []
+        self.lock = threading.RLock()
+        self.delayLock = threading.Lock()
+        self.onRequestStart = instrumentation.getHooks(onRequestStart)
+        self.onRequestEnd = instrumentation.getHooks(onRequestEnd)
+        self.adapter = adapter if adapter is not None else transport.createAdapter(
+            poolConnections=poolSize,
+            poolMaxsize=poolSize,
+            retries=retries,
+            backoffFactor=backoffFactor,
+            timeout=timeout
+        )
 
-def loads(self, url, params={}):
-    api.setSession(self)
-    r = api.getTableauViz(self, self.session, url, params)
-    soup = BeautifulSoup(r, "html.parser")
-
-    tableauPlaceHolder = soup.find("div", {"class": "tableauPlaceholder"})
-
-    if tableauPlaceHolder is not None:
-        params = dict([
-            (t.get("name", ""), unquote(t.get("value", "")))
-            for t in tableauPlaceHolder.findAll("param")
-        ])
-        if ("host_url" not in params) or ("site_root" not in params) or ("name" not in params):
-            self.logger.info("No params found in placeholder")
-            return
-
-        if "ticket" in params:
-            # Get xsrf cookie
-            sessionUrl = f'{params["host_url"]}trusted/{params["ticket"]}{params["site_root"]}/views/{params["name"]}'
-            api.getSessionUrl(self, self.session, sessionUrl)
-
-        url = f'{params["host_url"][:-1]}{params["site_root"]}/views/{params["name"]}'
-        r = api.getTableauVizForSession(self, self.session, url)
-        soup = BeautifulSoup(r, "html.parser")
-
-    container = soup.find("textarea", {"id": "tsConfigContainer"})
-    if container and container.text:
-        self.tableauData = json.loads(container.text)
-    else:
-        scheme, domain, path, param, query, frag = urlparse(url)
-        parts = path.split("/")
-        path = f'/shared/{parts[2]}/startSession/viewing'
-        surl = urlunparse((scheme, domain, path, param, query, frag))
-        self.tableauData = self.session.post(surl, params=params, verify=self.verify).json()
-
-    uri = urlparse(url)
-    self.host = "{uri.scheme}://{uri.netloc}".format(uri=uri)
-
-    r = api.getTableauData(self)
-
-    try:
-        dataReg = re.search(r"\d+;({.*})\d+;({.*})", r, re.MULTILINE)
-        self.info = json.loads(dataReg.group(1))
-        self.data = json.loads(dataReg.group(2))
-
-        if "presModelMap" in self.data["secondaryInfo"]:
-            presModelMap = self.data["secondaryInfo"]["presModelMap"]
-            self.dataSegments = presModelMap["dataDictionary"]["presModelHolder"]["genDataDictionaryPresModel"]["dataSegments"]
-            self.parameters = utils.getParameterControlInput(self.info)
-        self.dashboard = self.info["sheetName"]
-        self.filters = utils.getFiltersForAllWorksheet(self.logger, self.data, self.info, rootDashboard=self.dashboard)
-    except AttributeError:
-        raise TableauException(message=r)
+    def loads(self, url, params={}):
+        api.setSession(self)
+        rootUrl, rootParams = url, params
+        self.stateHash = ""
+        self.pendingCommands = []
+        r = api.getTableauViz(self, self.session, url, params)
+
+        placeholderParams = utils.getTableauPlaceholderParams(r)
+
+        if placeholderParams is not None:
+            params = dict([
+                (name, unquote(value))
+                for name, value in placeholderParams.items()
+            ])
+            if ("host_url" not in params) or ("site_root" not in params) or ("name" not in params):
+                self.logger.info("No params found in placeholder")
+                return
+
+            if "ticket" in params:
+                # Get xsrf cookie
+                sessionUrl = f'{params["host_url"]}trusted/{params["ticket"]}{params["site_root"]}/views/{params["name"]}'
+                api.getSessionUrl(self, self.session, sessionUrl)
+
+            url = f'{params["host_url"][:-1]}{params["site_root"]}/views/{params["name"]}'
+            r = api.getTableauVizForSession(self, self.session, url)
+
+        container = utils.getTsConfigContainer(r)
+        if container and container.strip():
+            self.tableauData = json.loads(container)
+        else:
+            scheme, domain, path, param, query, frag = urlparse(url)
+            parts = path.split("/")
+            path = f'/shared/{parts[2]}/startSession/viewing'
+            surl = urlunparse((scheme, domain, path, param, query, frag))
+            self.tableauData = api.sendRequest(
+                self, self.session, "POST", surl, "startSession", params=params, verify=self.verify).json()
+
+        uri = urlparse(url)
+        self.host = "{uri.scheme}://{uri.netloc}".format(uri=uri)
+
+        r = api.getTableauData(self)
+        self.dataSegments = {}
+        self.dataDictionary = DataDictionary(release=True)
+
+        try:
+            self.info, self.data = utils.getBootstrapDocuments(r)
+
+            if "presModelMap" in self.data["secondaryInfo"]:
+                presModelMap = self.data["secondaryInfo"]["presModelMap"]
+                # detached from the bootstrap document, only this copy gets the released segments
+                self.dataSegments = dict(
+                    presModelMap["dataDictionary"]["presModelHolder"]["genDataDictionaryPresModel"]["dataSegments"])
+                self.parameters = state.getParameterStore(
+                    utils.getParameterControlInput(self.info))
+            self.dashboard = self.info["sheetName"]
+            self.filters = state.getFilterStore(utils.getFiltersForAllWorksheet(
+                self.logger, self.data, self.info, rootDashboard=self.dashboard))
+        except (ValueError, IndexError):
+            raise TableauException(message=r)
+        self.stateHash = cache.getStateHash(
+            rootUrl, rootParams, bootstrap=self.dataSegments)
+
+    def snapshot(self):
+        return snapshot.takeSnapshot(self)
+
+    def restore(self, state):
+        return snapshot.restoreSnapshot(self, state)
+
+    def saveSnapshot(self, path):
+        snapshot.saveSnapshot(self, path)
+
+    def loadSnapshot(self, path):
+        return snapshot.loadSnapshot(self, path)
+
+    def fork(self):
+        return snapshot.fork(self)
 
     def getWorkbook(self) -> TableauWorkbook:
         return dashboard.getWorksheets(self, self.data, self.info)
@@ -3,12 +3,37 @@ from tableauscraper.TableauWorksheet import TableauWorksheet
 from tableauscraper import utils
 from tableauscraper import dashboard
 from tableauscraper import api
-import copy
+from tableauscraper import state
+from tableauscraper import profiling
+from tableauscraper.presModelIndex import getPresModelIndex
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-from io import StringIO
+import requests
 from pandas.errors import ParserError, EmptyDataError
 
 
+def readCsv(stream, encoding, chunkSize=None, **kwargs):
+    try:
+        if chunkSize is not None:
+            return readCsvChunks(stream, encoding, chunkSize, **kwargs)
+        with stream:
+            return pd.read_csv(stream, encoding=encoding, **kwargs)
+    except (ParserError, EmptyDataError):
+        stream.close()
+        return None
+
+
+def readCsvChunks(stream, encoding, chunkSize, **kwargs):
+    reader = pd.read_csv(stream, encoding=encoding,
+                         chunksize=chunkSize, **kwargs)
+
+    def chunks():
+        with stream, reader:
+            for df in reader:
+                yield df
+    return chunks()
+
+
 class TableauWorkbook:
 
     worksheets: List[TableauWorksheet] = []
@@ -24,76 +49,47 @@ class TableauWorkbook:
         self._originalData = originalData
         self._originalInfo = originalInfo
 
+    @profiling.profiled("TableauWorkbook.updateFullData")
     def updateFullData(self, cmdResponse):
+        # returns the index of the response zones, for the workbook built from the same response
+        index = None
         # update data dictionary if present
         if (("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]) and
                 ("dataDictionary" in cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"])):
             presModel = cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
             if "dataSegments" in presModel["dataDictionary"]:
-                dataSegments = presModel["dataDictionary"]["dataSegments"]
-                dataSegmentscp = copy.deepcopy(dataSegments)
-                keys = list(dataSegmentscp.keys())
-                for key in keys:
-                    if dataSegmentscp[key] is not None:
-                        self._scraper.dataSegments[key] = dataSegmentscp[key]
+                with profiling.span("TableauWorkbook.updateFullData.dataSegments"):
+                    dataSegments = presModel["dataDictionary"]["dataSegments"]
+                    # segments are never mutated, the data dictionary copies their values when merging
+                    for key in list(dataSegments):
+                        if dataSegments[key] is not None:
+                            self._scraper.dataSegments[key] = dataSegments[key]
             else:
                 self._scraper.logger.warning(
                     f"no data dictionary present in response")
         else:
             self._scraper.logger.warning(
                 f"no data dictionary present in response")
-        # update parameters if present
-        self._scraper.parameters = self.getParameters()
         if ("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]):
             presModel = cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-            newParameters = utils.getParameterControlVqlResponse(
-                presModel)
-            newParameterscsp = copy.deepcopy(newParameters)
-            for newParam in newParameterscsp:
-                found = False
-                for param in self._scraper.parameters:
-                    if newParam["parameterName"] == param["parameterName"]:
-                        found = True
-                if not found:
-                    self._scraper.parameters.append(newParam)
-        # update filters if present
-        if ("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]):
-            newFilters = utils.getFiltersForAllWorksheet(
-                self._scraper.logger, data=cmdResponse, info=None, rootDashboard=self._scraper.dashboard, cmdResponse=True)
-            newFilterscsp = copy.deepcopy(newFilters)
-            for worksheet in newFilterscsp:
-                if worksheet not in self._scraper.filters:
-                    self._scraper.filters[worksheet] = newFilters[worksheet]
-                else:
-                    for newFilter in newFilters[worksheet]:
-                        found = False
-                        foundFilterIndex = -1
-                        for idx, filter in enumerate(self._scraper.filters[worksheet]):
-                            if newFilter["globalFieldName"] == filter["globalFieldName"]:
-                                found = True
-                                foundFilterIndex = idx
-                        if not found:
-                            self._scraper.filters[worksheet].append(newFilter)
-                        else:
-                            del self._scraper.filters[worksheet][foundFilterIndex]
-                            self._scraper.filters[worksheet].append(newFilter)
-
-        # persist zones
-        if ("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]):
-            presModel = cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-            newZones = utils.getZones(presModel)
-            newZonesStorage = {}
-            for zone in newZones.keys():
-                if newZones[zone] is not None:
-                    zoneHasVizdata = utils.hasVizData(newZones[zone])
-                    if (not zoneHasVizdata) and (zone in self._scraper.zones):
-                        newZonesStorage[zone] = copy.deepcopy(
-                            self._scraper.zones[zone])
-                    else:
-                        newZonesStorage[zone] = copy.deepcopy(newZones[zone])
-            self._scraper.zones = newZonesStorage
+            # update parameters
+            with profiling.span("TableauWorkbook.updateFullData.parameters"):
+                self._scraper.parameters = state.mergeParameters(
+                    self._scraper.parameters, utils.getParameterControlVqlResponse(presModel))
+            # update filters
+            with profiling.span("TableauWorkbook.updateFullData.filters"):
+                index = getPresModelIndex(utils.getZones(presModel))
+                newFilters = utils.getFiltersForAllWorksheet(
+                    self._scraper.logger, data=cmdResponse, info=None, rootDashboard=self._scraper.dashboard, cmdResponse=True, index=index)
+                self._scraper.filters = state.mergeFilters(
+                    self._scraper.filters, newFilters)
+            # persist zones
+            with profiling.span("TableauWorkbook.updateFullData.zones"):
+                self._scraper.zones = state.mergeZones(
+                    self._scraper.zones, utils.getZones(presModel))
         else:
             self._scraper.zones = {}
+        return index
 
     def getWorksheetNames(self):
         return utils.getWorksheetNames(self)
@@ -116,13 +112,13 @@ class TableauWorkbook:
         return worksheets[0]
 
     def getParameters(self):
-        return self._scraper.parameters
+        return state.getParameters(self._scraper.parameters)
 
     def setParameter(self, inputName, value, inputParameter=False):
         if not inputParameter:
             parameterNames = [
                 t["parameterName"]
-                for t in self._scraper.parameters
+                for t in state.getParameters(self._scraper.parameters)
                 if t["column"] == inputName
             ]
             if len(parameterNames) == 0:
@@ -140,8 +136,8 @@ class TableauWorkbook:
         r = api.setParameterValue(
             self._scraper, parameterNames[0], value
         )
-        self.updateFullData(r)
-        return dashboard.getWorksheetsCmdResponse(self._scraper, r)
+        index = self.updateFullData(r)
+        return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
 
     def getSheets(self):
         presModel = utils.getPresModelVizInfo(
@@ -173,9 +169,9 @@ class TableauWorkbook:
                 cmdResponse=self.cmdResponse,
             )
         r = api.goToSheet(self._scraper, windowId[0])
-        self.updateFullData(r)
+        index = self.updateFullData(r)
         self._scraper.dashboard = sheetName
-        return dashboard.getWorksheetsCmdResponse(self._scraper, r)
+        return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
 
     def getDownloadableData(self, sheetName):
         presModel = utils.getPresModelVizInfo(
@@ -191,17 +187,15 @@ class TableauWorkbook:
             self._scraper.logger.warning(
                 f"no viewIds found in json info")
 
-    def getCsvData(self, sheetName, prefix="vudcsv"):
+    def getCsvData(self, sheetName, prefix="vudcsv", chunkSize=None):
+        # with chunkSize, an iterator of dataframes parsed while the download goes on
         presModel = utils.getPresModelVizInfo(
             self._originalInfo)
         if ("workbookPresModel" in presModel) and ("dashboardPresModel" in presModel["workbookPresModel"]) and ("viewIds" in presModel["workbookPresModel"]["dashboardPresModel"]):
             if sheetName in presModel["workbookPresModel"]["dashboardPresModel"]["viewIds"]:
-                r = api.getCsvData(
-                    self._scraper, presModel["workbookPresModel"]["dashboardPresModel"]["viewIds"][sheetName], prefix=prefix)
-                try:
-                    return pd.read_csv(StringIO(r))
-                except (ParserError, EmptyDataError):
-                    return None
+                r = api.getCsvDataStream(
+                    self._scraper, presModel["workbookPresModel"]["dashboardPresModel"]["viewIds"][sheetName], prefix=prefix, spool=chunkSize is None)
+                return readCsv(r, encoding="utf-8", chunkSize=chunkSize)
 
             else:
                 self._scraper.logger.warning(
@@ -211,20 +205,15 @@ class TableauWorkbook:
                 f"no viewIds found in json info")
         return None
 
-    def getCrossTabData(self, sheetName):
+    def getCrossTabSheetIds(self):
         r = api.exportCrosstabServerDialog(self._scraper)
-
-        sheets = [
-            t for t in r["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]["presentationLayerNotification"][
+        return dict([
+            (t["sheetName"], t["sheetdocId"])
+            for t in r["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]["presentationLayerNotification"][
                 0]["presModelHolder"]["genExportCrosstabOptionsDialogPresModel"]["thumbnailSheetPickerItems"]
-            if t["sheetName"] == sheetName
-        ]
-        if len(sheets) == 0:
-            self._scraper.logger.warning(
-                f"sheet {sheetName} not found in API result")
-            return None
+        ])
 
-        sheetId = sheets[0]["sheetdocId"]
+    def exportCrossTabStream(self, sheetId, spool=True):
         r = api.exportCrosstabToCsvServer(
             self._scraper, sheetId)
         presModelHandler = r[
@@ -237,11 +226,51 @@ class TableauWorkbook:
             self._scraper.logger.warning(
                 f"no genExportFilePresModel or genFileDownloadPresModel found in result")
             return None
-        r = api.downloadCrossTabData(self._scraper, resultKey)
-        try:
-            return pd.read_csv(StringIO(r), sep='\t')
-        except (ParserError, EmptyDataError):
+        return api.downloadCrossTabDataStream(
+            self._scraper, resultKey, spool=spool)
+
+    def exportCrossTab(self, sheetId, chunkSize=None):
+        r = self.exportCrossTabStream(sheetId, spool=chunkSize is None)
+        if r is None:
             return None
+        return readCsv(r, encoding="utf-16", chunkSize=chunkSize, sep="\t")
+
+    def getCrossTabData(self, sheetName, chunkSize=None):
+        sheetIds = self.getCrossTabSheetIds()
+        if sheetName not in sheetIds:
+            self._scraper.logger.warning(
+                f"sheet {sheetName} not found in API result")
+            return None
+        return self.exportCrossTab(sheetIds[sheetName], chunkSize=chunkSize)
+
+    def getAllCrossTabs(self, sheetNames=None, workers=4):
+        # the export dialog is requested once, then each sheet is exported and downloaded concurrently;
+        # the workers share the scraper session, its state is guarded by the scraper locks
+        # and each request still waits for its own delay slot
+        sheetIds = self.getCrossTabSheetIds()
+        if sheetNames is None:
+            sheetNames = list(sheetIds.keys())
+        result = {}
+        for sheetName in sheetNames:
+            if sheetName not in sheetIds:
+                self._scraper.logger.warning(
+                    f"sheet {sheetName} not found in API result")
+                result[sheetName] = None
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = dict([
+                (executor.submit(self.exportCrossTab, sheetIds[sheetName]), sheetName)
+                for sheetName in sheetNames
+                if sheetName in sheetIds
+            ])
+            for future in as_completed(futures):
+                try:
+                    result[futures[future]] = future.result()
+                except (api.APIResponseException, requests.RequestException, ValueError, KeyError) as e:
+                    self._scraper.logger.warning(
+                        f"crosstab export of {futures[future]} failed: {e}")
+                    result[futures[future]] = None
+        # same order as sheetNames, whatever the completion order
+        return dict([(sheetName, result[sheetName]) for sheetName in sheetNames])
 
     def getStoryPoints(self):
         return utils.getStoryPointsFromInfo(self._scraper.logger, self._originalInfo)
@@ -250,5 +279,5 @@ class TableauWorkbook:
         storypointResult = self.getStoryPoints()
         r = api.setActiveStoryPoint(
             self._scraper, storyBoard=storypointResult["storyBoard"], storyPointId=storyPointId)
-        self.updateFullData(r)
-        return dashboard.getWorksheetsCmdResponse(self._scraper, r)
+        index = self.updateFullData(r)
+        return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
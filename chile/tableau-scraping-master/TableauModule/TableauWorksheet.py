@@ -4,19 +4,27 @@ import tableauscraper
 from tableauscraper import utils
 from tableauscraper import dashboard
 from tableauscraper import api
-import copy
+from tableauscraper import state
+from tableauscraper import profiling
+from tableauscraper.presModelIndex import getPresModelIndex
 
 
 class TableauWorksheet:
 
     name: str = ""
-    data: pd.DataFrame = pd.DataFrame()
     cmdResponse: bool = False
 
     _originalData = {}
     _originalInfo = {}
     _data_dictionnary = {}
     _scraper = None
+    _dataFrame = None
+    _dataLoader = None
+    _indicesInfo = {}
+    _selectableValues = {}
+    _valueIndex = {}
+    _tupleIds = None
+    _presModelIndex = None
 
     def __init__(
         self,
@@ -27,27 +35,57 @@ class TableauWorksheet:
         dataFrame,
         dataFull,
         cmdResponse=False,
+        dataLoader=None,
+        presModelIndex=None,
     ):
         self._scraper = scraper
         self.name = worksheetName
-        self.data = dataFrame
+        self._dataFrame = dataFrame
+        # decodes the dataframe on first access when no dataFrame is given
+        self._dataLoader = dataLoader
         self._originalData = originalData
         self._originalInfo = originalInfo
         self.cmdResponse = cmdResponse
         self._data_dictionnary = dataFull
+        self._indicesInfo = {}
+        self._selectableValues = {}  # column -> decoded values
+        self._valueIndex = {}  # column -> value -> first index in the column
+        self._tupleIds = None
+        # index of the response zones, shared with the other worksheets of the response
+        self._presModelIndex = presModelIndex
 
+    @property
+    def data(self) -> pd.DataFrame:
+        if self._dataFrame is None:
+            if self._dataLoader is not None:
+                self._dataFrame = self._dataLoader()
+            else:
+                self._dataFrame = pd.DataFrame()
+            self._dataLoader = None
+        return self._dataFrame
+
+    @data.setter
+    def data(self, dataFrame: pd.DataFrame):
+        self._dataFrame = dataFrame
+        self._dataLoader = None
+
+    def isLoaded(self) -> bool:
+        return self._dataFrame is not None
+
+    @profiling.profiled("TableauWorksheet.updateFullData")
     def updateFullData(self, cmdResponse):
+        # the zones index built for the filters is returned, the workbook of this response reuses it
+        index = None
         # persist data dictionary
         if (("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]) and
                 ("dataDictionary" in cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"])):
             presModel = cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
             if "dataSegments" in presModel["dataDictionary"]:
                 dataSegments = presModel["dataDictionary"]["dataSegments"]
-                dataSegmentscp = copy.deepcopy(dataSegments)
-                keys = list(dataSegmentscp.keys())
-                for key in keys:
-                    if dataSegmentscp[key] is not None:
-                        self._scraper.dataSegments[key] = dataSegmentscp[key]
+                # segments are never mutated, the data dictionary copies their values when merging
+                for key in list(dataSegments):
+                    if dataSegments[key] is not None:
+                        self._scraper.dataSegments[key] = dataSegments[key]
             else:
                 self._scraper.logger.warning(
                     f"no data dictionary present in response")
@@ -59,142 +97,189 @@ class TableauWorksheet:
                 ("dataSegments" in cmdResponse["vqlCmdResponse"]["cmdResultList"][0]["commandReturn"]["underlyingDataTable"]["dataDictionary"])):
             dataSegments = cmdResponse["vqlCmdResponse"]["cmdResultList"][
                 0]["commandReturn"]["underlyingDataTable"]["dataDictionary"]["dataSegments"]
-            dataSegmentscp = copy.deepcopy(dataSegments)
-            keys = list(dataSegmentscp.keys())
-            for key in keys:
-                if dataSegmentscp[key] is not None:
-                    self._scraper.dataSegments[key] = dataSegmentscp[key]
+            # segments are never mutated, the data dictionary copies their values when merging
+            for key in list(dataSegments):
+                if dataSegments[key] is not None:
+                    self._scraper.dataSegments[key] = dataSegments[key]
         else:
             self._scraper.logger.warning(
                 f"no data dictionary present in response")
 
-        # update filters if present
-        if ("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]):
-            newFilters = utils.getFiltersForAllWorksheet(
-                self._scraper.logger, data=cmdResponse, info=None, rootDashboard=self._scraper.dashboard, cmdResponse=True)
-            newFilterscsp = copy.deepcopy(newFilters)
-            for worksheet in newFilterscsp:
-                if worksheet not in self._scraper.filters:
-                    self._scraper.filters[worksheet] = newFilters[worksheet]
-                else:
-                    for newFilter in newFilters[worksheet]:
-                        found = False
-                        foundFilterIndex = -1
-                        for idx, filter in enumerate(self._scraper.filters[worksheet]):
-                            if newFilter["globalFieldName"] == filter["globalFieldName"]:
-                                found = True
-                                foundFilterIndex = idx
-                        if not found:
-                            self._scraper.filters[worksheet].append(newFilter)
-                        else:
-                            del self._scraper.filters[worksheet][foundFilterIndex]
-                            self._scraper.filters[worksheet].append(newFilter)
-        # persist zones
         if ("applicationPresModel" in cmdResponse["vqlCmdResponse"]["layoutStatus"]):
+            # update filters
             presModel = cmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-            newZones = utils.getZones(presModel)
-            newZonesStorage = {}
-            for zone in newZones.keys():
-                zoneHasVizdata = utils.hasVizData(newZones[zone])
-                if (not zoneHasVizdata) and (zone in self._scraper.zones):
-                    newZonesStorage[zone] = copy.deepcopy(
-                        self._scraper.zones[zone])
-                else:
-                    newZonesStorage[zone] = copy.deepcopy(newZones[zone])
-            self._scraper.zones = newZonesStorage
+            with profiling.span("TableauWorksheet.updateFullData.filters"):
+                index = getPresModelIndex(utils.getZones(presModel))
+                newFilters = utils.getFiltersForAllWorksheet(
+                    self._scraper.logger, data=cmdResponse, info=None, rootDashboard=self._scraper.dashboard, cmdResponse=True, index=index)
+                self._scraper.filters = state.mergeFilters(
+                    self._scraper.filters, newFilters)
+            # persist zones
+            with profiling.span("TableauWorksheet.updateFullData.zones"):
+                self._scraper.zones = state.mergeZones(
+                    self._scraper.zones, utils.getZones(presModel))
         else:
             self._scraper.zones = {}
+        return index
+
+    def getIndicesInfo(self, noSelectFilter=True, noFieldCaption=False, storyPoint=False):
+        # a worksheet is bound to one response, its column metadata never changes
+        key = (noSelectFilter, noFieldCaption, storyPoint)
+        if key not in self._indicesInfo:
+            if self.cmdResponse:
+                presModel = self._originalData["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
+                if storyPoint:
+                    indicesInfo = utils.getIndicesInfoStoryPoint(
+                        presModel, self.name, noSelectFilter=noSelectFilter, noFieldCaption=noFieldCaption, index=self._presModelIndex)
+                else:
+                    indicesInfo = utils.getIndicesInfoVqlResponse(
+                        presModel, self.name, noSelectFilter=noSelectFilter, noFieldCaption=noFieldCaption, index=self._presModelIndex)
+            else:
+                presModel = utils.getPresModelVizData(
+                    self._originalData)
+                if presModel is None:
+                    presModel = utils.getPresModelVizInfo(
+                        self._originalInfo)
+                    indicesInfo = utils.getIndicesInfoStoryPoint(
+                        presModel, self.name, noSelectFilter=noSelectFilter, noFieldCaption=noFieldCaption, index=self._presModelIndex)
+                else:
+                    indicesInfo = utils.getIndicesInfo(
+                        presModel, self.name, noSelectFilter=noSelectFilter, noFieldCaption=noFieldCaption)
+            self._indicesInfo[key] = indicesInfo
+        return self._indicesInfo[key]
 
     def getColumns(self) -> List[str]:
-        if self.cmdResponse:
-            presModel = self._originalData["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-            return [
-                t["fieldCaption"]
-                for t in utils.getIndicesInfoVqlResponse(
-                    presModel, self.name, noSelectFilter=True
-                )
-            ]
-        else:
-            presModel = utils.getPresModelVizData(
-                self._originalData)
-            return [
-                t["fieldCaption"]
-                for t in utils.getIndicesInfo(
-                    presModel, self.name, noSelectFilter=True
-                )
-            ]
+        return [
+            t["fieldCaption"]
+            for t in self.getIndicesInfo(noSelectFilter=True)
+        ]
 
     def getFilters(self) -> List[str]:
-        return self._scraper.filters[self.name] if self.name in self._scraper.filters else []
+        return list(self._scraper.filters[self.name].values()) if self.name in self._scraper.filters else []
+
+    def resolveFilter(self, columnName, value, dashboardFilter=False, indexValues=[], noCheck=False):
+        # filter to send and its current selection, raises ValueError when the column or value is unknown
+        filter = [None]
+        selectedIndex = []
+        if ((not noCheck) and (dashboardFilter)) or (not dashboardFilter):
+            filter = [
+                {
+                    "globalFieldName": t["globalFieldName"],
+                    "indices": (
+                        (
+                            [t["values"].index(value)]
+                            if len(indexValues) == 0
+                            else indexValues
+                        )
+                        if not isinstance(value, list)
+                        else (
+                            [
+                                t["values"].index(it)
+                                for it in value
+                            ] if len(indexValues) == 0
+                            else indexValues
+                        )
+                    ),
+                    "selection": t["selection"],
+                    "selectionAlt": t["selectionAlt"],
+                    "values": t["values"],
+                    "ordinal": t["ordinal"],
+                    "storyboard": t["storyboard"] if "storyboard" in t else None,
+                    "storyboardId": t["storyboardId"] if "storyboardId" in t else None,
+                    "dashboard": t["dashboard"] if "dashboard" in t else self._scraper.dashboard
+                }
+                for t in self.getFilters()
+                if t["column"] == columnName
+            ]
+            if len(filter) == 0:
+                raise ValueError(f"column {columnName} not found")
+
+            # get selection from filterJson
+            if (len(filter[0]["selection"]) > 0):
+                for idx, val in enumerate(filter[0]["selection"]):
+                    if val != value:
+                        selectedIndex.append(idx)
+            # get selection from quickFilter
+            elif (len(filter[0]["selectionAlt"]) > 0) and ("domainTables" in filter[0]["selectionAlt"][0]):
+                for idx, val in enumerate(filter[0]["selectionAlt"][0]["domainTables"]):
+                    if ("isSelected" in val) and val["isSelected"] and (idx not in selectedIndex):
+                        selectedIndex.append(idx)
+        return filter[0], selectedIndex
+
+    def applyFilter(self, columnName, value, dashboardFilter=False, membershipTarget=True, filterDelta=False, indexValues=[], noCheck=False, resolved=None):
+        # sends the filter command and persists its state, raises ValueError when the column or value is unknown
+        # returns the response and its zones index
+        if resolved is None:
+            resolved = self.resolveFilter(
+                columnName, value, dashboardFilter=dashboardFilter, indexValues=indexValues, noCheck=noCheck)
+        filter, selectedIndex = resolved
+        if dashboardFilter:
+            r = api.dashboardFilter(
+                self._scraper, columnName, [value] if not isinstance(value, list) else value)
+        else:
+            r = api.filter(
+                self._scraper,
+                worksheetName=self.name,
+                globalFieldName=filter["globalFieldName"],
+                selection=filter["indices"],
+                selectionToRemove=[] if not filterDelta else selectedIndex,
+                membershipTarget=membershipTarget,
+                filterDelta=filterDelta,
+                storyboard=filter["storyboard"],
+                storyboardId=filter["storyboardId"],
+                dashboard=filter["dashboard"]
+            )
+        index = self.updateFullData(r)
+        return r, index
 
     def setFilter(self, columnName, value, dashboardFilter=False, membershipTarget=True, filterDelta=False, indexValues=[], noCheck=False):
         try:
-            if ((not noCheck) and (dashboardFilter)) or (not dashboardFilter):
-                filter = [
-                    {
-                        "globalFieldName": t["globalFieldName"],
-                        "indices": (
-                            (
-                                [t["values"].index(value)]
-                                if len(indexValues) == 0
-                                else indexValues
-                            )
-                            if not isinstance(value, list)
-                            else (
-                                [
-                                    t["values"].index(it)
-                                    for it in value
-                                ] if len(indexValues) == 0
-                                else indexValues
-                            )
-                        ),
-                        "selection": t["selection"],
-                        "selectionAlt": t["selectionAlt"],
-                        "values": t["values"],
-                        "ordinal": t["ordinal"],
-                        "storyboard": t["storyboard"] if "storyboard" in t else None,
-                        "storyboardId": t["storyboardId"] if "storyboardId" in t else None,
-                        "dashboard": t["dashboard"] if "dashboard" in t else self._scraper.dashboard
-                    }
-                    for t in self.getFilters()
-                    if t["column"] == columnName
-                ]
-                if len(filter) == 0:
-                    self._scraper.logger.error(
-                        f"column {columnName} not found")
-                    return tableauscraper.TableauWorkbook(
-                        scraper=self._scraper, originalData={}, originalInfo={}, data=[]
-                    )
-                selectedIndex = []
-
-                # get selection from filterJson
-                if (len(filter[0]["selection"]) > 0):
-                    for idx, val in enumerate(filter[0]["selection"]):
-                        if val != value:
-                            selectedIndex.append(idx)
-                # get selection from quickFilter
-                elif (len(filter[0]["selectionAlt"]) > 0) and ("domainTables" in filter[0]["selectionAlt"][0]):
-                    for idx, val in enumerate(filter[0]["selectionAlt"][0]["domainTables"]):
-                        if ("isSelected" in val) and val["isSelected"] and (idx not in selectedIndex):
-                            selectedIndex.append(idx)
-            if dashboardFilter:
-                r = api.dashboardFilter(
-                    self._scraper, columnName, [value] if not isinstance(value, list) else value)
-            else:
-                r = api.filter(
-                    self._scraper,
-                    worksheetName=self.name,
-                    globalFieldName=filter[0]["globalFieldName"],
-                    selection=filter[0]["indices"],
-                    selectionToRemove=[] if not filterDelta else selectedIndex,
+            r, index = self.applyFilter(
+                columnName,
+                value,
+                dashboardFilter=dashboardFilter,
+                membershipTarget=membershipTarget,
+                filterDelta=filterDelta,
+                indexValues=indexValues,
+                noCheck=noCheck
+            )
+            return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
+        except ValueError as e:
+            self._scraper.logger.error(str(e))
+            return tableauscraper.TableauWorkbook(
+                scraper=self._scraper, originalData={}, originalInfo={}, data=[]
+            )
+        except api.APIResponseException as e:
+            self._scraper.logger.error(str(e))
+            return tableauscraper.TableauWorkbook(
+                scraper=self._scraper, originalData={}, originalInfo={}, data=[]
+            )
+
+    def setFilters(self, filters, dashboardFilter=False, membershipTarget=True, filterDelta=False, noCheck=False):
+        # one filter command per column, only the workbook of the last response is built
+        try:
+            # every column and value is checked before the first command is sent
+            resolved = [
+                (columnName, value, self.resolveFilter(
+                    columnName, value, dashboardFilter=dashboardFilter, noCheck=noCheck))
+                for columnName, value in filters.items()
+            ]
+            r, index = None, None
+            for columnName, value, filter in resolved:
+                r, index = self.applyFilter(
+                    columnName,
+                    value,
+                    dashboardFilter=dashboardFilter,
                     membershipTarget=membershipTarget,
                     filterDelta=filterDelta,
-                    storyboard=filter[0]["storyboard"],
-                    storyboardId=filter[0]["storyboardId"],
-                    dashboard=filter[0]["dashboard"]
+                    noCheck=noCheck,
+                    resolved=filter
                 )
-            self.updateFullData(r)
-            return dashboard.getWorksheetsCmdResponse(self._scraper, r)
+            if r is None:
+                return tableauscraper.TableauWorkbook(
+                    scraper=self._scraper, originalData={}, originalInfo={}, data=[]
+                )
+            return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
         except ValueError as e:
             self._scraper.logger.error(str(e))
             return tableauscraper.TableauWorkbook(
@@ -207,150 +292,90 @@ class TableauWorksheet:
             )
 
     def getSelectableItems(self) -> List[str]:
-        if self.cmdResponse:
-            presModel = self._originalData["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-            selectableItems = [
-                {
-                    "column": t["fieldCaption"],
-                    "values": next(iter([y for y in utils.getData(self._data_dictionnary, [t]).values()]), [])
-                }
-                for t in utils.getIndicesInfoVqlResponse(presModel, self.name, noSelectFilter=True)
-            ]
-            if len(selectableItems) == 0:
-                indicesInfo = utils.getIndicesInfoStoryPoint(
-                    presModel, self.name, noSelectFilter=True)
-                return [
-                    {
-                        "column": t["fieldCaption"],
-                        "values": next(iter([y for y in utils.getData(self._data_dictionnary, [t]).values()]), [])
-                    }
-                    for t in indicesInfo
-                ]
-            return selectableItems
-        else:
-            presModel = utils.getPresModelVizData(
-                self._originalData)
-            if presModel is None:
-                presModel = utils.getPresModelVizInfo(
-                    self._originalInfo)
-                indicesInfo = utils.getIndicesInfoStoryPoint(
-                    presModel, self.name, noSelectFilter=True)
-            else:
-                indicesInfo = utils.getIndicesInfo(
-                    presModel, self.name, noSelectFilter=True)
-            return [
-                {
-                    "column": t["fieldCaption"],
-                    "values": next(iter([
-                        y
-                        for y in utils.getData(self._data_dictionnary, [t]).values()
-                    ]), [])
-                }
-                for t in indicesInfo
-            ]
+        indicesInfo = self.getIndicesInfo(noSelectFilter=True)
+        if self.cmdResponse and (len(indicesInfo) == 0):
+            indicesInfo = self.getIndicesInfo(
+                noSelectFilter=True, storyPoint=True)
+        return [
+            {
+                "column": t["fieldCaption"],
+                "values": next(iter(utils.getData(self._data_dictionnary, [t]).values()), [])
+            }
+            for t in indicesInfo
+        ]
 
-    def getSelectableValues(self, column) -> List[str]:
-        if self.cmdResponse:
-            presModel = self._originalData["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
+    def getColumnValues(self, column):
+        # decoded once per column, shared by getSelectableValues and select
+        if column not in self._selectableValues:
             columnObj = [
                 t
-                for t in utils.getIndicesInfoVqlResponse(
-                    presModel, self.name, noSelectFilter=True
-                )
+                for t in self.getIndicesInfo(noSelectFilter=True)
                 if t["fieldCaption"] == column
             ]
-            if len(columnObj) == 0:
-                indicesInfo = utils.getIndicesInfoStoryPoint(
-                    presModel, self.name, noSelectFilter=True)
+            if self.cmdResponse and (len(columnObj) == 0):
                 columnObj = [
                     t
-                    for t in indicesInfo
+                    for t in self.getIndicesInfo(noSelectFilter=True, storyPoint=True)
                     if t["fieldCaption"] == column
                 ]
-                if len(columnObj) == 0:
-                    return []
-            frameData = utils.getData(
-                self._data_dictionnary, [columnObj[0]]
-            )
-            frameDataKeys = list(frameData.keys())
-
-            if len(frameDataKeys) == 0:
-                return []
-            return frameData[frameDataKeys[0]]
-        else:
-            presModel = utils.getPresModelVizData(
-                self._originalData)
-            if presModel is None:
-                presModel = utils.getPresModelVizInfo(
-                    self._originalInfo)
-                indicesInfo = utils.getIndicesInfoStoryPoint(
-                    presModel, self.name, noSelectFilter=True)
-            else:
-                indicesInfo = utils.getIndicesInfo(
-                    presModel, self.name, noSelectFilter=True)
+            values = []
+            if len(columnObj) > 0:
+                frameData = utils.getData(
+                    self._data_dictionnary, [columnObj[0]]
+                )
+                values = next(iter(frameData.values()), [])
+            self._selectableValues[column] = values
+        return self._selectableValues[column]
 
-            columnObj = [
-                t
-                for t in indicesInfo
-                if t["fieldCaption"] == column
-            ]
-            if len(columnObj) == 0:
-                return []
-            frameData = utils.getData(
-                self._data_dictionnary, [columnObj[0]]
-            )
-            frameDataKeys = list(frameData.keys())
+    def getValueIndex(self, column, value):
+        if column not in self._valueIndex:
+            valueIndex = {}
+            for idx, t in enumerate(self.getColumnValues(column)):
+                try:
+                    valueIndex.setdefault(t, idx)
+                except TypeError:
+                    pass
+            self._valueIndex[column] = valueIndex
+        try:
+            index = self._valueIndex[column].get(value)
+        except TypeError:
+            index = None
+        if index is None:
+            # unhashable values fall back to a scan, raises ValueError when missing
+            return self.getColumnValues(column).index(value)
+        return index
 
-            if len(frameDataKeys) == 0:
-                return []
-            return frameData[frameDataKeys[0]]
+    def getSelectableValues(self, column) -> List[str]:
+        return list(self.getColumnValues(column))
 
     def getTupleIds(self) -> List[int]:
-        if self.cmdResponse:
-            presModel = self._originalData["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-            columnObj = [
-                t
-                for t in utils.getIndicesInfoVqlResponse(
-                    presModel, self.name, noSelectFilter=True, noFieldCaption=True
-                )
+        if self._tupleIds is None:
+            self._tupleIds = [
+                t["tupleIds"]
+                for t in self.getIndicesInfo(noSelectFilter=True, noFieldCaption=True)
                 if t["fn"] == "[system:visual].[tuple_id]"
             ]
-            if len(columnObj) == 0:
-                return []
+        return self._tupleIds
 
-            return [t["tupleIds"] for t in columnObj]
-        else:
-            presModel = utils.getPresModelVizData(
-                self._originalData)
-            columnObj = [
-                t
-                for t in utils.getIndicesInfo(
-                    presModel, self.name, noSelectFilter=True, noFieldCaption=True
-                )
-                if t["fn"] == "[system:visual].[tuple_id]"
-            ]
-            if len(columnObj) == 0:
-                return []
-            return [t["tupleIds"] for t in columnObj]
+    def getObjectId(self, column, value):
+        values = self.getColumnValues(column)
+        for tupleItem in self.getTupleIds():
+            if len(tupleItem) >= len(values):
+                return tupleItem[self.getValueIndex(column, value)]
+        return self.getValueIndex(column, value) + 1
 
     def select(self, column, value):
-        values = self.getSelectableValues(column)
-        tupleItems = self.getTupleIds()
-        try:
+        return self.selectMany(column, [value])
 
-            indexedByTuple = False
-            for tupleItem in tupleItems:
-                if len(tupleItem) >= len(values):
-                    index = values.index(value)
-                    index = tupleItem[index]
-                    indexedByTuple = True
-                    break
-            if not indexedByTuple:
-                index = values.index(value)
-                index = index + 1
-            r = api.select(self._scraper, self.name, [index])
-            self.updateFullData(r)
-            return dashboard.getWorksheetsCmdResponse(self._scraper, r)
+    def selectMany(self, column, values):
+        # all the values are selected with a single command
+        try:
+            r = api.select(self._scraper, self.name, [
+                self.getObjectId(column, value)
+                for value in values
+            ])
+            index = self.updateFullData(r)
+            return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
         except ValueError as e:
             self._scraper.logger.error(str(e))
             return tableauscraper.TableauWorkbook(
@@ -369,11 +394,24 @@ class TableauWorksheet:
         self.updateFullData(r)
         return dashboard.getWorksheetDownloadCmdResponse(self._scraper, r)
 
+    def iterDownloadableSummaryData(self, numRows=0, chunkSize=10000):
+        # numRows=0 requests every row, frames of chunkSize rows are decoded one at a time
+        r = api.getDownloadableSummaryData(
+            self._scraper, self.name, self._scraper.dashboard, numRows)
+        self.updateFullData(r)
+        return dashboard.iterWorksheetDownloadCmdResponse(self._scraper, r, chunkSize)
+
+    def iterDownloadableUnderlyingData(self, numRows=0, chunkSize=10000):
+        r = api.getDownloadableUnderlyingData(
+            self._scraper, self.name, self._scraper.dashboard, numRows)
+        self.updateFullData(r)
+        return dashboard.iterWorksheetDownloadCmdResponse(self._scraper, r, chunkSize)
+
     def levelDrill(self, drillDown, position=0):
         r = api.levelDrill(
             self._scraper, self.name, drillDown, position)
-        self.updateFullData(r)
-        return dashboard.getWorksheetsCmdResponse(self._scraper, r)
+        index = self.updateFullData(r)
+        return dashboard.getWorksheetsCmdResponse(self._scraper, r, index=index)
 
     def renderTooltip(self, x, y):
         r = api.renderTooltipServer(
@@ -1,4 +1,5 @@
-__all__ = ["TableauScraper", "TableauWorksheet", "TableauWorkbook"]
+__all__ = ["TableauScraper", "AsyncTableauScraper", "TableauWorksheet", "TableauWorkbook"]
 from tableauscraper.TableauScraper import TableauScraper
+from tableauscraper.AsyncTableauScraper import AsyncTableauScraper
 from tableauscraper.TableauWorksheet import TableauWorksheet
 from tableauscraper.TableauWorkbook import TableauWorkbook
@@ -2,6 +2,11 @@ import json
 from json.decoder import JSONDecodeError
 import time
 import requests
+from urllib.parse import urlparse
+from tableauscraper import transport
+from tableauscraper import ratelimit
+from tableauscraper import cache
+from tableauscraper import instrumentation
 
 
 class APIResponseException(Exception):
@@ -13,11 +18,117 @@ class APIResponseException(Exception):
 
 
 def setSession(scraper):
-    scraper.session = requests.Session()
+    # a new session keeps cookies isolated per viz, the shared adapter keeps the pooled connections
+    if scraper.adapter is None:
+        scraper.adapter = transport.createAdapter()
+    scraper.session = transport.mountAdapter(requests.Session(), scraper.adapter)
+    if scraper.rateLimiter is not None:
+        scraper.session.hooks["response"].append(
+            getRateLimiterHook(scraper.rateLimiter))
+
+
+def getRateLimiterHook(rateLimiter):
+    def hook(r, *args, **kwargs):
+        uri = urlparse(r.url)
+        rateLimiter.onResponse(
+            f"{uri.scheme}://{uri.netloc}",
+            r.status_code,
+            ratelimit.parseRetryAfter(r.headers.get("Retry-After"))
+        )
+    return hook
+
+
+def sendRequest(scraper, session, method, url, endpoint, delay=False, **kwargs):
+    # every request of the api goes through here, onRequestStart/onRequestEnd hooks see them all;
+    # delay waits for a delayMs/rateLimiter slot, in the executor thread for AsyncTableauScraper,
+    # and the wait is reported as the event sleepTime
+    sleepTime = delayExecution(scraper) if delay else 0
+    event = instrumentation.startRequest(
+        scraper, endpoint, method, url, sleepTime)
+    try:
+        r = session.request(method, url, **kwargs)
+    except requests.RequestException as e:
+        instrumentation.endRequest(scraper, event, error=e)
+        raise
+    instrumentation.endRequest(
+        scraper, event, r, stream=kwargs.get("stream", False))
+    return r
+
+
+def getCommandUrl(scraper, command):
+    return f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/{command}'
+
+
+def postCommand(scraper, command, payload, stateful=True, cacheable=True, checkResponse=False):
+    # stateful commands change the server session, they chain the state hash used in the cache keys
+    key = None
+    if scraper.cache is not None:
+        with scraper.lock:
+            # an unknown session state, after a failed replay, has no cache key
+            if scraper.stateHash:
+                key = cache.getCommandKey(scraper.stateHash, command, payload)
+                result = scraper.cache.get(key) if cacheable else None
+                if result is not None:
+                    if stateful:
+                        # the server only receives this command before the next cache miss
+                        scraper.pendingCommands.append((command, payload))
+                        scraper.stateHash = key
+                    return result
+            sendPendingCommands(scraper)
+    r = sendRequest(
+        scraper, scraper.session, "POST", getCommandUrl(scraper, command), command,
+        delay=True,
+        files=payload,
+        verify=scraper.verify
+    )
+    setLastActionTime(scraper)
+    if checkResponse:
+        try:
+            result = r.json()
+        except ValueError:
+            raise APIResponseException(message=r.text)
+    else:
+        result = r.json()
+    if key is not None:
+        with scraper.lock:
+            if cacheable:
+                scraper.cache.set(key, result)
+            if stateful:
+                scraper.stateHash = key
+    return result
+
+
+def sendPendingCommands(scraper):
+    # replay the commands served from the cache so that the server session is in the expected state,
+    # before any request reading that state: command cache misses and the csv/viewData/tempfile downloads
+    # the scraper lock is held until they are all sent, no other request of this scraper reads that state before
+    with scraper.lock:
+        pendingCommands, scraper.pendingCommands = scraper.pendingCommands, []
+        for command, payload in pendingCommands:
+            try:
+                r = sendRequest(
+                    scraper, scraper.session, "POST", getCommandUrl(scraper, command), command,
+                    delay=True,
+                    files=payload,
+                    verify=scraper.verify
+                )
+                setLastActionTime(scraper)
+                if r.status_code >= 400:
+                    raise APIResponseException(
+                        message=f"{command} replay failed with status {r.status_code}: {r.text}")
+                try:
+                    r.json()
+                except ValueError:
+                    raise APIResponseException(message=r.text)
+            except Exception:
+                # the server session is not in the cached state, its commands can't be served from the cache anymore
+                scraper.stateHash = ""
+                scraper.pendingCommands = []
+                raise
 
 
 def getTableauVizForSession(scraper, session, url):
-    r = session.get(url, params={
+    r = sendRequest(scraper, session, "GET", url, "viz", params={
         ":embed": "y",
         ":showVizHome": "no"},
         verify=scraper.verify
@@ -31,80 +142,94 @@ def getTableauViz(scraper, session, url, params={}):
             ":embed": "y",
             ":showVizHome": "no"
         }
-    r = session.get(url, params=params,
+    r = sendRequest(scraper, session, "GET", url, "viz", params=params,
                     verify=scraper.verify
                     )
     return r.text
 
 
 def getSessionUrl(scraper, session, url):
-    r = session.get(url, verify=scraper.verify)
+    r = sendRequest(scraper, session, "GET", url,
+                    "trusted", verify=scraper.verify)
     return r.text
 
 
 def getTableauData(scraper):
     dataUrl = f'{scraper.host}{scraper.tableauData["vizql_root"]}/bootstrapSession/sessions/{scraper.tableauData["sessionid"]}'
-    r = scraper.session.post(
-        dataUrl,
+    r = sendRequest(
+        scraper, scraper.session, "POST", dataUrl, "bootstrapSession",
         data={
             "sheet_id": scraper.tableauData["sheetId"],
             "clientDimension": json.dumps({"w": 1920, "h": 1080})
         },
         verify=scraper.verify
     )
-    scraper.lastActionTime = time.time()
+    setLastActionTime(scraper)
     return r.text
 
 
 def getCsvData(scraper, viewId, prefix="vudcsv"):
+    sendPendingCommands(scraper)
     dataUrl = f'{scraper.host}{scraper.tableauData["vizql_root"]}/{prefix}/sessions/{scraper.tableauData["sessionid"]}/views/{viewId}'
-    r = scraper.session.get(
-        dataUrl,
+    r = sendRequest(
+        scraper, scraper.session, "GET", dataUrl, prefix,
+        delay=True,
         params={
             "csv": "true",
             "showall": "true"
         },
         verify=scraper.verify)
-    scraper.lastActionTime = time.time()
+    setLastActionTime(scraper)
     return r.content.decode('utf-8')
 
 
+def getCsvDataStream(scraper, viewId, prefix="vudcsv", spool=True):
+    # spool=False returns the socket stream, parsing can start before the download ends
+    sendPendingCommands(scraper)
+    dataUrl = f'{scraper.host}{scraper.tableauData["vizql_root"]}/{prefix}/sessions/{scraper.tableauData["sessionid"]}/views/{viewId}'
+    r = sendRequest(
+        scraper, scraper.session, "GET", dataUrl, prefix,
+        delay=True,
+        params={
+            "csv": "true",
+            "showall": "true"
+        },
+        verify=scraper.verify,
+        stream=True)
+    setLastActionTime(scraper)
+    return transport.spoolResponse(r) if spool else transport.getResponseStream(r)
+
+
 def getDownloadableData(scraper, worksheetName, dashboardName, viewId):
+    sendPendingCommands(scraper)
     input = json.dumps({
         "worksheet": worksheetName,
         "dashboard": dashboardName
     })
     dataUrl = f'{scraper.host}{scraper.tableauData["vizql_root"]}/viewData/sessions/{scraper.tableauData["sessionid"]}/views/{viewId}'
-    r = scraper.session.get(
-        dataUrl,
+    r = sendRequest(
+        scraper, scraper.session, "GET", dataUrl, "viewData",
+        delay=True,
         params={
             "maxrows": "200",
             "viz": input
         },
         verify=scraper.verify)
-    scraper.lastActionTime = time.time()
+    setLastActionTime(scraper)
     return r.text
 
 
 def getDownloadableSummaryData(scraper, worksheetName, dashboardName, numRows=200):
-    delayExecution(scraper)
     payload = (
         ("maxRows", (None, numRows)),
         ("visualIdPresModel", (None, json.dumps(
             {"worksheet": worksheetName, "dashboard": dashboardName, "flipboardZoneId": 0, "storyPointId": 0}))
          ),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/get-summary-data',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabdoc/get-summary-data", payload, stateful=False)
 
 
 def getDownloadableUnderlyingData(scraper, worksheetName, dashboardName, numRows=200):
-    delayExecution(scraper)
     payload = (
         ("maxRows", (None, numRows)),
         ("includeAllColumns", (None, "true")),
@@ -112,20 +237,10 @@ def getDownloadableUnderlyingData(scraper, worksheetName, dashboardName, numRows
             {"worksheet": worksheetName, "dashboard": dashboardName, "flipboardZoneId": 0, "storyPointId": 0}))
          ),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/get-underlying-data',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    try:
-        return r.json()
-    except ValueError:
-        raise APIResponseException(message=r.text)
+    return postCommand(scraper, "tabdoc/get-underlying-data", payload, stateful=False, checkResponse=True)
 
 
 def select(scraper, worksheetName, selection):
-    delayExecution(scraper)
     payload = (
         ("worksheet", (None, worksheetName)),
         ("dashboard", (None, scraper.dashboard)),
@@ -133,20 +248,10 @@ def select(scraper, worksheetName, selection):
             {"objectIds": selection, "selectionType": "tuples"}))),
         ("selectOptions", (None, "select-options-simple")),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/select',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    try:
-        return r.json()
-    except (ValueError, JSONDecodeError):
-        raise APIResponseException(message=r.text)
+    return postCommand(scraper, "tabdoc/select", payload, checkResponse=True)
 
 
 def filter(scraper, worksheetName, globalFieldName, dashboard, selection=[], selectionToRemove=[], membershipTarget=True, filterDelta=False, storyboard=None, storyboardId=None):
-    delayExecution(scraper)
     visualIdPresModel = {
         "worksheet": worksheetName,
         "dashboard": dashboard
@@ -169,20 +274,10 @@ def filter(scraper, worksheetName, globalFieldName, dashboard, selection=[], sel
             (("filterRemoveIndices", (None, json.dumps(selectionToRemove))),) + payload
     else:
         payload = (("filterIndices", (None, json.dumps(selection))),) + payload
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/categorical-filter-by-index',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    try:
-        return r.json()
-    except ValueError:
-        raise APIResponseException(message=r.text)
+    return postCommand(scraper, "tabdoc/categorical-filter-by-index", payload, checkResponse=True)
 
 
 def dashboardFilter(scraper, columnName, selection):
-    delayExecution(scraper)
     payload = (
         ("dashboard", (None, scraper.dashboard)),
         ("qualifiedFieldCaption", (None, columnName)),
@@ -192,110 +287,87 @@ def dashboardFilter(scraper, columnName, selection):
                                            ensure_ascii=False)))
     )
 
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/dashboard-categorical-filter',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    try:
-        return r.json()
-    except ValueError:
-        raise APIResponseException(message=r.text)
+    return postCommand(scraper, "tabdoc/dashboard-categorical-filter", payload, checkResponse=True)
 
 
 def setParameterValue(scraper, parameterName, value):
-    delayExecution(scraper)
     payload = (
         ("globalFieldName", (None, parameterName)),
         ("valueString", (None, value)),
         ("useUsLocale", (None, "false")),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/set-parameter-value',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabdoc/set-parameter-value", payload)
 
 
 def goToSheet(scraper, windowId):
-    delayExecution(scraper)
     payload = (
         ("windowId", (None, windowId)),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/goto-sheet',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabdoc/goto-sheet", payload)
 
 
 def exportCrosstabServerDialog(scraper):
-    delayExecution(scraper)
     payload = (
         ("thumbnailUris", (None, json.dumps({}))),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabsrv/export-crosstab-server-dialog',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabsrv/export-crosstab-server-dialog", payload, stateful=False, cacheable=False)
 
 
 def exportCrosstabToCsvServer(scraper, sheetId):
-    delayExecution(scraper)
     payload = (
         ("sheetdocId", (None, sheetId)),
         ("useTabs", (None, "true")),
         ("sendNotifications", (None, "true")),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabsrv/export-crosstab-to-csvserver',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabsrv/export-crosstab-to-csvserver", payload, stateful=False, cacheable=False)
 
 
 def downloadCrossTabData(scraper, resultKey):
-    r = scraper.session.get(
+    sendPendingCommands(scraper)
+    r = sendRequest(
+        scraper, scraper.session, "GET",
         f'{scraper.host}{scraper.tableauData["vizql_root"]}/tempfile/sessions/{scraper.tableauData["sessionid"]}/',
+        "tempfile",
+        delay=True,
         params={
             "key": resultKey,
             "keepfile": "yes",
             "attachment": "yes"
         },
         verify=scraper.verify)
-    scraper.lastActionTime = time.time()
+    setLastActionTime(scraper)
     return r.content.decode('utf-16')
 
 
+def downloadCrossTabDataStream(scraper, resultKey, spool=True):
+    sendPendingCommands(scraper)
+    r = sendRequest(
+        scraper, scraper.session, "GET",
+        f'{scraper.host}{scraper.tableauData["vizql_root"]}/tempfile/sessions/{scraper.tableauData["sessionid"]}/',
+        "tempfile",
+        delay=True,
+        params={
+            "key": resultKey,
+            "keepfile": "yes",
+            "attachment": "yes"
+        },
+        verify=scraper.verify,
+        stream=True)
+    setLastActionTime(scraper)
+    return transport.spoolResponse(r) if spool else transport.getResponseStream(r)
+
+
 def setActiveStoryPoint(scraper, storyBoard, storyPointId):
-    delayExecution(scraper)
     payload = (
         ("storyboard", (None, storyBoard)),
         ("storyPointId", (None, storyPointId)),
         ("shouldAutoCapture", (None, "false")),
         ("shouldAutoRevert", (None, "true")),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/set-active-story-point',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabdoc/set-active-story-point", payload)
 
 
 def levelDrill(scraper, worksheetName, drillDown, position=0):
-    delayExecution(scraper)
     payload = (
         ("worksheet", (None, worksheetName)),
         ("dashboard", (None, scraper.dashboard)),
@@ -303,17 +375,10 @@ def levelDrill(scraper, worksheetName, drillDown, position=0):
         ("shelfType", (None, "columns-shelf")),
         ("position", (None, position)),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabdoc/level-drill-up-down',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabdoc/level-drill-up-down", payload)
 
 
 def renderTooltipServer(scraper, worksheetName, x, y):
-    delayExecution(scraper)
     payload = (
         ("worksheet", (None, worksheetName)),
         ("dashboard", (None, scraper.dashboard)),
@@ -330,23 +395,35 @@ def renderTooltipServer(scraper, worksheetName, x, y):
         ("allowWork", (None, "false")),
         ("useInlineImages", (None, "true")),
     )
-    r = scraper.session.post(
-        f'{scraper.host}{scraper.tableauData["vizql_root"]}/sessions/{scraper.tableauData["sessionid"]}/commands/tabsrv/render-tooltip-server',
-        files=payload,
-        verify=scraper.verify
-    )
-    scraper.lastActionTime = time.time()
-    return r.json()
+    return postCommand(scraper, "tabsrv/render-tooltip-server", payload, stateful=False)
 
 
-def delayExecution(scraper):
-    if scraper.lastActionTime != 0:
+def reserveDelay(scraper):
+    # book the next request slot and return how long to wait for it
+    if scraper.rateLimiter is not None:
+        return scraper.rateLimiter.reserve(scraper.host)
+    with scraper.delayLock:
         currentTime = time.time()
-        timeDif = currentTime - scraper.lastActionTime
-        if timeDif < (scraper.delayMs / 1000):
-            waitTime = timeDif + (scraper.delayMs / 1000)
-            scraper.logger.debug(f"delaying request by {waitTime} seconds")
-            time.sleep(waitTime)
-            scraper.lastActionTime = currentTime
-        else:
-            scraper.lastActionTime = currentTime
+        waitTime = 0
+        if scraper.lastActionTime != 0:
+            timeDif = currentTime - scraper.lastActionTime
+            if timeDif < (scraper.delayMs / 1000):
+                waitTime = (scraper.delayMs / 1000) - timeDif
+        scraper.lastActionTime = currentTime + waitTime
+        return waitTime
+
+
+def setLastActionTime(scraper):
+    # a slot reserved in the future by another thread of this scraper is kept
+    with scraper.delayLock:
+        scraper.lastActionTime = max(scraper.lastActionTime, time.time())
+
+
+def delayExecution(scraper):
+    if not scraper.blockingDelay:
+        return 0
+    waitTime = reserveDelay(scraper)
+    if waitTime > 0:
+        scraper.logger.debug(f"delaying request by {waitTime} seconds")
+        time.sleep(waitTime)
+    return waitTime
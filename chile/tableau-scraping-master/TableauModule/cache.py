@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+
+def getStateHash(url, params={}, bootstrap=None):
+    # root of the chain, a new viz session starts from the same state
+    # the digest of the bootstrap data tells a republished or refreshed viz from the one in the cache
+    root = [url, params]
+    if bootstrap is not None:
+        root.append(hashlib.sha256(
+            json.dumps(bootstrap, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest())
+    return hashlib.sha256(
+        json.dumps(root, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def getCommandKey(stateHash, command, payload):
+    # the key of a stateful command is also the state hash of the session after it
+    return hashlib.sha256(
+        json.dumps([stateHash, command, payload], default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class ResponseCache:
+    # one json file per vizql response, expired after ttl seconds and evicted least recently used past maxSize bytes
+
+    path: str = ""
+    ttl: float = DEFAULT_TTL
+    maxSize: int = DEFAULT_MAX_SIZE
+
+    def __init__(self, path, ttl=DEFAULT_TTL, maxSize=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        # key -> size in bytes, least recently used first
+        self.entries = OrderedDict()
+        self.size = 0
+        files = [
+            t for t in os.scandir(path)
+            if t.is_file() and t.name.endswith(".json")
+        ]
+        for entry in sorted(files, key=lambda t: t.stat().st_mtime):
+            size = entry.stat().st_size
+            self.entries[entry.name[:-len(".json")]] = size
+            self.size += size
+
+    def getFile(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self.getFile(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self.remove(key)
+                self.misses += 1
+                return None
+            if (self.ttl is not None) and (time.time() - entry["created"] > self.ttl):
+                self.remove(key)
+                self.misses += 1
+                return None
+            # mtime keeps the recency order across processes
+            os.utime(self.getFile(key))
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["response"]
+
+    def set(self, key, response):
+        content = json.dumps({
+            "created": time.time(),
+            "response": response
+        })
+        with self.lock:
+            fd, tmpPath = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmpPath, self.getFile(key))
+            if key in self.entries:
+                self.size -= self.entries.pop(key)
+            self.entries[key] = os.path.getsize(self.getFile(key))
+            self.size += self.entries[key]
+            while (self.size > self.maxSize) and (len(self.entries) > 1):
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        self.size -= self.entries.pop(key, 0)
+        try:
+            os.remove(self.getFile(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self.remove(key)
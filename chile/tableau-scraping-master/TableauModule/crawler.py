@@ -0,0 +1,230 @@
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+import requests
+from tableauscraper.TableauScraper import TableauScraper
+from tableauscraper import api
+
+# one bootstrapped scraper per worker thread/process and per crawl
+sessionStorage = threading.local()
+
+
+class CrawlException(Exception):
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def getCombinations(filters):
+    if isinstance(filters, dict):
+        filters = list(filters.items())
+    columns = [t[0] for t in filters]
+    return [
+        dict(zip(columns, values))
+        for values in itertools.product(*[t[1] for t in filters])
+    ]
+
+
+def getChunks(items, chunkSize):
+    return [items[i:i + chunkSize] for i in range(0, len(items), chunkSize)]
+
+
+def getSessions():
+    if not hasattr(sessionStorage, "sessions"):
+        sessionStorage.sessions = {}
+    return sessionStorage.sessions
+
+
+def getSeed(scraper, workers):
+    # the bootstrapped scraper of the caller is lent to the first worker asking for a session,
+    # the other workers and the retries bootstrap a fork of it (same transport, cache and settings)
+    scrapers = queue.Queue()
+    scrapers.put(scraper)
+    return {
+        "scrapers": scrapers,
+        # a single worker forks the scraper it dropped, concurrent workers fork a copy nobody uses
+        "template": scraper.fork() if workers > 1 else scraper,
+        "lock": threading.Lock()
+    }
+
+
+def getScraper(url, params, scraperOptions, seed=None):
+    if seed is None:
+        ts = TableauScraper(**scraperOptions)
+        ts.loads(url, params)
+        return ts
+    try:
+        return seed["scrapers"].get_nowait()
+    except queue.Empty:
+        pass
+    # forks share the server side session of their origin, concurrent workers need their own
+    with seed["lock"]:
+        ts = seed["template"].fork()
+    ts.loads(url, params)
+    return ts
+
+
+def getSession(crawlId, url, params, scraperOptions, seed=None):
+    sessions = getSessions()
+    if crawlId not in sessions:
+        ts = getScraper(url, params, scraperOptions, seed)
+        sessions[crawlId] = {
+            "scraper": ts,
+            "workbook": None,
+            "applied": {}
+        }
+    return sessions[crawlId]
+
+
+def dropSession(crawlId):
+    getSessions().pop(crawlId, None)
+
+
+def getWorksheet(session, worksheetName):
+    if session["workbook"] is not None:
+        return session["workbook"].getWorksheet(worksheetName)
+    return session["scraper"].getWorksheet(worksheetName)
+
+
+def applyCombination(session, combination, filterWorksheet, filterOptions):
+    # combinations of a chunk share their leading values, only re-send the filters that changed
+    for column, value in combination.items():
+        if (column in session["applied"]) and (session["applied"][column] == value):
+            continue
+        # unknown state until the server acknowledged this filter
+        session["applied"].pop(column, None)
+        wb = getWorksheet(session, filterWorksheet).setFilter(
+            column, value, **filterOptions)
+        if len(wb.worksheets) == 0:
+            raise CrawlException(f"failed to set filter {column}={value}")
+        session["workbook"] = wb
+        session["applied"][column] = value
+
+
+def crawlChunk(crawlId, url, params, scraperOptions, worksheetName, filterWorksheet, filterOptions, chunk, retries, frames, seed=None, stop=None):
+    # each frame is put in the frames queue as soon as it is decoded, the failures are returned
+    # put blocks while the queue is full, a worker doesn't get ahead of the sink
+    failed = []
+    try:
+        for combination in chunk:
+            if (stop is not None) and stop.is_set():
+                break
+            attempt = 0
+            while True:
+                try:
+                    session = getSession(
+                        crawlId, url, params, scraperOptions, seed)
+                    applyCombination(session, combination,
+                                     filterWorksheet, filterOptions)
+                    df = getWorksheet(session, worksheetName).data
+                    frames.put((combination, df))
+                    break
+                except (CrawlException, api.APIResponseException, requests.RequestException, ValueError, KeyError) as e:
+                    # the server session state is unknown, bootstrap a new one
+                    dropSession(crawlId)
+                    attempt += 1
+                    if attempt > retries:
+                        failed.append((combination, str(e)))
+                        break
+    finally:
+        # None marks the end of the chunk, the sink waits for one per chunk
+        frames.put(None)
+    return failed
+
+
+def getBrokenCallback(frames):
+    # a worker process that died never marked the end of its chunk
+    def onBroken(future):
+        if (not future.cancelled()) and isinstance(future.exception(), BrokenProcessPool):
+            frames.put(None)
+    return onBroken
+
+
+def sinkFrames(frames, futures, sink, stop):
+    # sink is always called from the calling thread, for each frame as soon as a worker produced it
+    remaining = len(futures)
+    try:
+        while remaining > 0:
+            frame = frames.get()
+            if frame is None:
+                remaining -= 1
+                continue
+            combination, df = frame
+            sink(combination, df)
+    except BaseException:
+        # the chunks not started yet are cancelled, the running ones stop after their current combination,
+        # their frames are dropped so that they are not blocked on the full queue
+        stop.set()
+        remaining -= len([t for t in futures if t.cancel()])
+        while remaining > 0:
+            if frames.get() is None:
+                remaining -= 1
+        raise
+
+
+def crawl(url, worksheetName, filters, sink, workers=4, filterWorksheet=None, params={}, scraperOptions={}, filterOptions={}, chunkSize=None, retries=1, processes=False, scraper=None):
+    if (scraper is not None) and processes:
+        raise ValueError("a bootstrapped scraper can only be shared with thread workers")
+    combinations = getCombinations(filters)
+    if len(combinations) == 0:
+        return []
+    seed = getSeed(scraper, workers) if scraper is not None else None
+    if chunkSize is None:
+        # a few chunks per worker balances the load while keeping filter changes incremental
+        chunkSize = max(1, math.ceil(len(combinations) / (workers * 4)))
+    chunks = getChunks(combinations, chunkSize)
+    crawlId = f"{os.getpid()}-{uuid.uuid4()}"
+    executorClass = ProcessPoolExecutor if processes else ThreadPoolExecutor
+
+    # worker processes can only reach the calling process through a managed queue
+    # bounded so that the decoded frames waiting for the sink don't pile up in memory
+    manager = multiprocessing.Manager() if processes else None
+    frames = manager.Queue(workers * 2) if processes else queue.Queue(workers * 2)
+    stop = manager.Event() if processes else threading.Event()
+
+    failedCombinations = []
+    try:
+        with executorClass(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    crawlChunk, crawlId, url, params, scraperOptions, worksheetName,
+                    filterWorksheet if filterWorksheet is not None else worksheetName,
+                    filterOptions, chunk, retries, frames, seed, stop)
+                for chunk in chunks
+            ]
+            if processes:
+                for future in futures:
+                    future.add_done_callback(getBrokenCallback(frames))
+            sinkFrames(frames, futures, sink, stop)
+            for future in futures:
+                failedCombinations.extend(future.result())
+    finally:
+        if manager is not None:
+            manager.shutdown()
+    return failedCombinations
+
+
+def csvSink(path, encoding="utf-8"):
+    state = {"header": not os.path.exists(path)}
+    lock = threading.Lock()
+
+    def sink(combination, df):
+        frame = df.copy() if df is not None else pd.DataFrame()
+        if frame.empty:
+            return
+        for column, value in combination.items():
+            frame[column] = value
+        with lock:
+            frame.to_csv(path, mode="a", header=state["header"],
+                         index=False, encoding=encoding)
+            state["header"] = False
+    return sink
@@ -1,9 +1,109 @@
+import functools
+import math
+import warnings
+import numpy as np
 import pandas as pd
-from pandas.core import frame
+from pandas.api.types import infer_dtype
 from tableauscraper import utils
+from tableauscraper import profiling
+from tableauscraper.presModelIndex import getPresModelIndex
 from tableauscraper.TableauWorksheet import TableauWorksheet
 from tableauscraper.TableauWorkbook import TableauWorkbook
 
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def padColumn(values, length, fillValue=0):
+    values = np.asarray(values, dtype=object)
+    missing = pd.isna(values)
+    if missing.any():
+        # None values are filled like fillna(0) used to do it
+        values = values.copy()
+        values[missing] = fillValue
+    if len(values) < length:
+        # ragged column, padded the same way
+        values = np.concatenate(
+            [values, np.full(length - len(values), fillValue, dtype=object)])
+    return values
+
+
+def parseDates(values):
+    with warnings.catch_warnings():
+        # values that don't share a format are parsed one by one, that's expected
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(values)
+
+
+def getColumnType(values, dataType):
+    # dtype of a column holding these values
+    inferred = infer_dtype(values, skipna=False)
+    if inferred == "integer":
+        return np.dtype(np.float64 if dataType == "real" else np.int64)
+    if inferred in ["floating", "mixed-integer-float"]:
+        return np.dtype(np.float64)
+    if inferred == "boolean":
+        return np.dtype(bool)
+    if inferred == "string":
+        if dataType in ["date", "datetime"]:
+            try:
+                return parseDates(values).dtype
+            except (ValueError, TypeError, OverflowError):
+                return np.dtype(object)
+        return pd.CategoricalDtype()
+    # mixed values (eg %null% in a numeric column) stay as python objects
+    return np.dtype(object)
+
+
+def castColumn(values, columnType):
+    if isinstance(columnType, pd.CategoricalDtype):
+        return pd.Categorical(values, dtype=columnType)
+    if columnType == np.dtype(object):
+        # an explicit object series, pandas would infer a string dtype for a chunk holding only strings
+        return pd.Series(values, dtype=object)
+    if columnType.kind == "M":
+        return parseDates(values).astype(columnType)
+    try:
+        return values.astype(columnType)
+    except OverflowError:
+        # integers out of the int64 (or float64) range stay python objects
+        return pd.Series(values, dtype=object)
+
+
+def getColumn(values, dataType, length, fillValue=0, columnType=None):
+    values = padColumn(values, length, fillValue)
+    if columnType is None:
+        columnType = getColumnType(values, dataType)
+    return castColumn(values, columnType)
+
+
+@profiling.profiled("dashboard.buildDataFrame")
+def buildDataFrame(frameData, dataTypes={}, fillValue=0, columnTypes={}):
+    if len(frameData) == 0:
+        return pd.DataFrame()
+    length = max([len(t) for t in frameData.values()])
+    return pd.DataFrame({
+        column: getColumn(values, dataTypes.get(column), length,
+                          fillValue, columnTypes.get(column))
+        for column, values in frameData.items()
+    })
+
+
+@profiling.profiled("dashboard.loadWorksheet")
+def loadWorksheet(dataFull, indicesInfo) -> pd.DataFrame:
+    dataTypes = {}
+    frameData = utils.getData(
+        dataFull, indicesInfo, asArray=True, dataTypes=dataTypes)
+    return buildDataFrame(frameData, dataTypes)
+
+
+@profiling.profiled("dashboard.loadWorksheetCmdResponse")
+def loadWorksheetCmdResponse(selectedZone, dataFull) -> pd.DataFrame:
+    dataTypes = {}
+    frameData = utils.getWorksheetCmdResponse(
+        selectedZone, dataFull, asArray=True, dataTypes=dataTypes)
+    return buildDataFrame(frameData, dataTypes)
+
 
 def get(TS, data, info, logger):
     output = []
@@ -18,23 +118,23 @@ def get(TS, data, info, logger):
     )
 
 
-def getWorksheet(TS, data, info, worksheet) -> TableauWorksheet:
+@profiling.profiled("dashboard.getWorksheet")
+def getWorksheet(TS, data, info, worksheet, index=None) -> TableauWorksheet:
 
     presModelMap = utils.getPresModelVizData(data)
     if presModelMap is None:
         presModelMap = utils.getPresModelVizInfo(info)
-        indicesInfo = utils.getIndicesInfoStoryPoint(presModelMap, worksheet)
+        # index is the one of the info zones, shared by all the worksheets of the info
+        index = getPresModelIndex(utils.getZones(presModelMap), index)
+        indicesInfo = utils.getIndicesInfoStoryPoint(presModelMap, worksheet, index=index)
 
         if "dataDictionary" not in presModelMap:
             presModelMap = utils.getPresModelVizDataWithoutViz(data)
 
-        dataFull = utils.getDataFull(presModelMap, TS.dataSegments)
+        dataFull = utils.getDataFull(presModelMap, TS.dataSegments, TS.dataDictionary)
     else:
         indicesInfo = utils.getIndicesInfo(presModelMap, worksheet)
-        dataFull = utils.getDataFull(presModelMap, TS.dataSegments)
-
-    frameData = utils.getData(dataFull, indicesInfo)
-    df = pd.DataFrame.from_dict(frameData, orient="index").fillna(0).T
+        dataFull = utils.getDataFull(presModelMap, TS.dataSegments, TS.dataDictionary)
 
     return TableauWorksheet(
         scraper=TS,
@@ -42,10 +142,13 @@ def getWorksheet(TS, data, info, worksheet) -> TableauWorksheet:
         originalInfo=info,
         worksheetName=worksheet,
         dataFull=dataFull,
-        dataFrame=df
+        dataFrame=None,
+        dataLoader=functools.partial(loadWorksheet, dataFull, indicesInfo),
+        presModelIndex=index
     )
 
 
+@profiling.profiled("dashboard.getWorksheets")
 def getWorksheets(TS, data, info) -> TableauWorkbook:
 
     presModelMapVizData = utils.getPresModelVizData(data)
@@ -59,9 +162,12 @@ def getWorksheets(TS, data, info) -> TableauWorkbook:
     else:
         worksheets = []
 
+    index = None
+    if presModelMapVizInfo is not None:
+        index = getPresModelIndex(utils.getZones(presModelMapVizInfo))
     output = []
     for worksheet in worksheets:
-        df = getWorksheet(TS, data, info, worksheet)
+        df = getWorksheet(TS, data, info, worksheet, index)
         output.append(df)
 
     return TableauWorkbook(
@@ -69,7 +175,8 @@ def getWorksheets(TS, data, info) -> TableauWorkbook:
     )
 
 
-def getCmdResponse(TS, data, logger):
+@profiling.profiled("dashboard.getCmdResponse")
+def getCmdResponse(TS, data, logger, index=None):
     presModel = data["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
     zonesWithWorksheet = [
         TS.zones[z]
@@ -80,32 +187,33 @@ def getCmdResponse(TS, data, logger):
         and ("vizData" in TS.zones[z]["presModelHolder"]["visual"])
     ]
     #zonesWithWorksheet = utils.selectWorksheetCmdResponse(presModel, logger)
-    dataFull = utils.getDataFullCmdResponse(presModel, TS.dataSegments)
+    dataFull = utils.getDataFullCmdResponse(presModel, TS.dataSegments, dataDictionary=TS.dataDictionary)
+    # updateFullData already indexed this response when it persisted its filters
+    index = getPresModelIndex(utils.getZones(presModel), index)
     output = []
     for selectedZone in zonesWithWorksheet:
-        frameData = utils.getWorksheetCmdResponse(selectedZone, dataFull)
-
-        if frameData is None:
+        if not utils.hasWorksheetCmdResponseData(selectedZone):
             continue
 
-        df = pd.DataFrame.from_dict(frameData, orient="index").fillna(0).T
-
         output.append(
             TableauWorksheet(
                 scraper=TS,
                 originalData=data,
                 originalInfo={},
                 worksheetName=selectedZone["worksheet"],
-                dataFrame=df,
-                dataFull=utils.getDataFullCmdResponse(
-                    presModel, TS.dataSegments),
+                dataFrame=None,
+                dataFull=dataFull,
                 cmdResponse=True,
+                dataLoader=functools.partial(
+                    loadWorksheetCmdResponse, selectedZone, dataFull),
+                presModelIndex=index,
             )
         )
     return TableauWorkbook(scraper=TS, originalData=data, originalInfo={}, data=output, cmdResponse=True)
 
 
-def getWorksheetsCmdResponse(TS, data):
+@profiling.profiled("dashboard.getWorksheetsCmdResponse")
+def getWorksheetsCmdResponse(TS, data, index=None):
     presModel = data["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
     zonesWithWorksheet = [
         TS.zones[z]
@@ -115,25 +223,28 @@ def getWorksheetsCmdResponse(TS, data):
         and ("visual" in TS.zones[z]["presModelHolder"])
         and ("vizData" in TS.zones[z]["presModelHolder"]["visual"])
     ]
+    # updateFullData already indexed this response when it persisted its filters
+    index = getPresModelIndex(utils.getZones(presModel), index)
     if len(zonesWithWorksheet) == 0:
-        zonesWithWorksheet = utils.listStoryPointsCmdResponse(presModel, TS)
-    dataFull = utils.getDataFullCmdResponse(presModel, TS.dataSegments)
+        zonesWithWorksheet = utils.listStoryPointsCmdResponse(presModel, TS, index=index)
+    dataFull = utils.getDataFullCmdResponse(presModel, TS.dataSegments, dataDictionary=TS.dataDictionary)
     output = []
     for selectedZone in zonesWithWorksheet:
-        frameData = utils.getWorksheetCmdResponse(selectedZone, dataFull)
-        if frameData is None:
+        if not utils.hasWorksheetCmdResponseData(selectedZone):
             continue
 
-        df = pd.DataFrame.from_dict(frameData, orient="index").fillna(0).T
         output.append(
             TableauWorksheet(
                 scraper=TS,
                 originalData=data,
                 originalInfo={},
                 worksheetName=selectedZone["worksheet"],
-                dataFrame=df,
+                dataFrame=None,
                 dataFull=dataFull,
                 cmdResponse=True,
+                dataLoader=functools.partial(
+                    loadWorksheetCmdResponse, selectedZone, dataFull),
+                presModelIndex=index,
             )
         )
     return TableauWorkbook(
@@ -141,11 +252,144 @@ def getWorksheetsCmdResponse(TS, data):
     )
 
 
+@profiling.profiled("dashboard.getWorksheetDownloadCmdResponse")
 def getWorksheetDownloadCmdResponse(TS, data):
     table = data["vqlCmdResponse"]["cmdResultList"][0]["commandReturn"]["underlyingDataTable"]
     dataFull = utils.getDataFullCmdResponse(
-        {}, TS.dataSegments, table["dataDictionary"]["dataSegments"])
+        {}, TS.dataSegments, table["dataDictionary"]["dataSegments"], TS.dataDictionary)
+    dataTypes = {}
     frameData = utils.getWorksheetDownloadCmdResponse(
-        dataFull, table["underlyingDataTableColumns"])
-    df = pd.DataFrame.from_dict(frameData, orient="index").fillna(0).T
-    return df
+        dataFull, table["underlyingDataTableColumns"], asArray=True, dataTypes=dataTypes)
+    return buildDataFrame(frameData, dataTypes)
+
+
+def iterWorksheetDownloadCmdResponse(TS, data, chunkSize=10000):
+    table = data["vqlCmdResponse"]["cmdResultList"][0]["commandReturn"]["underlyingDataTable"]
+    dataFull = utils.getDataFullCmdResponse(
+        {}, TS.dataSegments, table["dataDictionary"]["dataSegments"], TS.dataDictionary)
+    # the index lists are the bulk of the response, keep them as compact arrays only
+    indicesInfo = utils.getWorksheetDownloadIndicesInfo([
+        dict(
+            t,
+            valueIndices=np.asarray(t["valueIndices"], dtype=np.int64),
+            aliasIndices=np.asarray(t["aliasIndices"], dtype=np.int64)
+        )
+        for t in table["underlyingDataTableColumns"]
+        if t.get("fieldCaption")
+    ])
+    del data, table
+    arrays = utils.getDataArrays(dataFull, indicesInfo)
+    rowCount = max(
+        [max(len(t["valueIndices"]), len(t["aliasIndices"])) for t in indicesInfo] + [0])
+    # every chunk gets the dtypes of the whole columns (eg int64 then %null% would be object in a later chunk only),
+    # decided by a first pass over the indices that only keeps a running state per column
+    columnStates = getColumnStates(dataFull, indicesInfo, arrays, rowCount, chunkSize)
+    columnTypes = dict([
+        (key, getStateType(state, dataType))
+        for key, (state, dataType) in columnStates.items()
+    ])
+    del columnStates
+    for start in range(0, rowCount, chunkSize):
+        dataTypes = {}
+        frameData = utils.getData(
+            dataFull, getChunkIndicesInfo(indicesInfo, start, start + chunkSize),
+            asArray=True, dataTypes=dataTypes, arrays=arrays)
+        df = buildDataFrame(frameData, dataTypes, columnTypes=columnTypes)
+        df.index = pd.RangeIndex(start, start + len(df))
+        yield df
+
+
+def getChunkIndicesInfo(indicesInfo, start, end):
+    return [
+        dict(
+            t,
+            valueIndices=t["valueIndices"][start:end],
+            aliasIndices=t["aliasIndices"][start:end]
+        )
+        for t in indicesInfo
+    ]
+
+
+def getValueKind(value):
+    # same kinds as infer_dtype once the missing values are filled with 0
+    if value is None:
+        return "integer"
+    if isinstance(value, (bool, np.bool_)):
+        return "boolean"
+    if isinstance(value, (int, np.integer)):
+        return "integer"
+    if isinstance(value, (float, np.floating)):
+        return "integer" if math.isnan(value) else "floating"
+    if isinstance(value, str):
+        return "string"
+    return "mixed"
+
+
+def updateColumnState(state, values):
+    # values are the distinct values of the column in one chunk
+    if values.dtype.kind in "iu":
+        state["kinds"].add("integer")
+    elif values.dtype.kind == "f":
+        state["kinds"].add("floating")
+    elif values.dtype.kind == "b":
+        state["kinds"].add("boolean")
+    else:
+        for value in values:
+            state["kinds"].add(getValueKind(value))
+            if isinstance(value, int) and (not isinstance(value, bool)) and \
+                    not (INT64_MIN <= value <= INT64_MAX):
+                state["overflow"] = True
+    # the distinct values are only kept for string columns, they give the categories or the dates
+    if state["kinds"] == {"string"}:
+        state["distinct"].update(values)
+    else:
+        state["distinct"].clear()
+
+
+def getColumnStates(dataFull, indicesInfo, arrays, rowCount, chunkSize):
+    cstring = arrays["cstring"]
+    columns = utils.getDataColumns(indicesInfo)
+    states = dict([
+        (key, ({"kinds": set(), "overflow": False, "distinct": set()}, index["dataType"]))
+        for key, index, indicesKey in columns
+    ])
+    for start in range(0, rowCount, chunkSize):
+        lengths = {}
+        for key, index, indicesKey in columns:
+            values = arrays[index["dataType"] if index["dataType"] in dataFull else "cstring"]
+            indices = index[indicesKey][start:start + chunkSize]
+            # out of range indices are dropped like decodeIndices does
+            indices = indices[indices < len(values)]
+            lengths[key] = len(indices)
+            if len(indices) > 0:
+                updateColumnState(states[key][0], utils.decodeIndices(
+                    np.unique(indices), values, cstring))
+        length = max(list(lengths.values()) + [0])
+        for key, count in lengths.items():
+            if count < length:
+                # padded with 0 in this chunk
+                states[key][0]["kinds"].add("integer")
+    return states
+
+
+def getStateType(state, dataType):
+    kinds = state["kinds"]
+    if kinds == {"integer"}:
+        if dataType == "real":
+            return np.dtype(np.float64)
+        # integers out of the int64 range stay python objects
+        return np.dtype(object) if state["overflow"] else np.dtype(np.int64)
+    if kinds in [{"floating"}, {"integer", "floating"}]:
+        return np.dtype(np.float64)
+    if kinds == {"boolean"}:
+        return np.dtype(bool)
+    if kinds == {"string"}:
+        values = np.array(sorted(state["distinct"]), dtype=object)
+        if dataType in ["date", "datetime"]:
+            try:
+                return parseDates(values).dtype
+            except (ValueError, TypeError, OverflowError):
+                return np.dtype(object)
+        return pd.CategoricalDtype(values)
+    # mixed values (eg %null% in a numeric column) stay as python objects
+    return np.dtype(object)
@@ -0,0 +1,265 @@
+import array
+import threading
+import numpy as np
+from collections.abc import Sequence
+from types import MappingProxyType
+from tableauscraper import profiling
+
+
+# numeric pools are packed (8 bytes a value instead of a python object and its pointer)
+POOL_TYPECODES = {"integer": "q", "real": "d"}
+
+
+def toObjectArray(values):
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    return result
+
+
+def toArray(values):
+    # values is a copy of a pool: a numpy view on the pool itself would prevent it from growing
+    if isinstance(values, array.array):
+        return np.frombuffer(values, dtype=values.typecode)
+    return toObjectArray(values)
+
+
+def newPool(dataType, values):
+    if dataType in POOL_TYPECODES:
+        try:
+            return array.array(POOL_TYPECODES[dataType], values)
+        except (TypeError, OverflowError):
+            # values that don't fit the type (nulls, big integers) stay python objects
+            pass
+    return list(values)
+
+
+def takeValues(pool, length, indices):
+    # the numpy view exports the pool buffer, which can't grow while the view exists: it is dropped right away
+    values = np.frombuffer(pool, dtype=pool.typecode)[:length]
+    try:
+        return values[indices]
+    finally:
+        del values
+
+
+def releaseSegment(segment):
+    # same segment without its values, the data dictionary pools hold them
+    return dict(segment, dataColumns=[
+        dict([(key, value) for key, value in column.items() if key != "dataValues"])
+        for column in segment["dataColumns"]
+    ])
+
+
+def isReleased(segment):
+    return any(["dataValues" not in t for t in segment["dataColumns"]])
+
+
+class DataView(Sequence):
+    # read-only snapshot of the first `length` values of an append-only pool
+
+    def __init__(self, values, length, arrayLoader=None, takeLoader=None):
+        self.values = values
+        self.length = length
+        self.arrayLoader = arrayLoader
+        self.takeLoader = takeLoader
+        self.array = None
+
+    def isTyped(self):
+        return isinstance(self.values, array.array)
+
+    def take(self, indices):
+        # values at the given positions, numeric pools are indexed in place without copying them
+        if self.takeLoader is not None:
+            return self.takeLoader(self.length, indices)
+        if self.isTyped():
+            return takeValues(self.values, self.length, indices)
+        return self.toArray()[indices]
+
+    def toArray(self):
+        if self.array is not None:
+            return self.array
+        if self.arrayLoader is not None:
+            result = self.arrayLoader(self.length)
+        else:
+            result = toArray(self.values[:self.length])
+        if not isinstance(self.values, array.array):
+            # object arrays are views on the pool array, numeric copies are not kept
+            self.array = result
+        return result
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.toArray()
+        return array if dtype is None else array.astype(dtype)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, np.ndarray):
+            return self.take(index)
+        if isinstance(index, slice):
+            return list(self.values[:self.length][index])
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("data view index out of range")
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __eq__(self, other):
+        if isinstance(other, (DataView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"DataView({list(self)!r})"
+
+
+class DataDictionary:
+    # append-only per dataType value pools, merged segment by segment
+
+    def __init__(self, release=False):
+        self.pools = {}
+        self.segments = {}  # segment key -> merged segment
+        self.layout = {}  # segment key -> [(dataType, start, count)] of its columns in the pools
+        self.arrays = {}  # dataType -> numpy array of an object pool, extended on demand
+        # replace the merged segments by their released copy, the pools become the only copy of the values
+        self.release = release
+        self.lock = threading.Lock()
+
+    def hasSegment(self, key):
+        return key in self.segments
+
+    @profiling.profiled("DataDictionary.merge")
+    def merge(self, dataSegments):
+        if not dataSegments:
+            return False
+        merged = False
+        with self.lock:
+            replaced = [
+                key
+                for key in list(dataSegments)
+                if (key in self.segments) and (dataSegments[key] is not None)
+                and (dataSegments[key] is not self.segments[key])
+            ]
+            pools, segments, layout = self.pools, self.segments, self.layout
+            if len(replaced) > 0:
+                # a segment was replaced in place, values after it are shifted: rebuild
+                self.pools = {}
+                self.segments = {}
+                self.layout = {}
+                self.arrays = {}
+            for key in list(dataSegments):
+                segment = dataSegments[key]
+                if (segment is None) or (key in self.segments):
+                    continue
+                if (key in layout) and (segment is segments[key]):
+                    # kept by the rebuild, released segments only have their values in the old pools
+                    columns = [
+                        (dataType, pools[dataType][start:start + count])
+                        for dataType, start, count in layout[key]
+                    ]
+                elif isReleased(segment):
+                    raise ValueError(
+                        f"segment {key} was released by another data dictionary")
+                else:
+                    columns = [(t["dataType"], t["dataValues"])
+                               for t in segment["dataColumns"]]
+                self.layout[key] = [
+                    self.extendPool(dataType, values) for dataType, values in columns
+                ]
+                if self.release:
+                    segment = releaseSegment(segment)
+                    dataSegments[key] = segment
+                self.segments[key] = segment
+                merged = True
+        return merged
+
+    def extendPool(self, dataType, values):
+        values = newPool(dataType, values)
+        pool = self.pools.get(dataType)
+        if pool is None:
+            self.pools[dataType] = values
+            return (dataType, 0, len(values))
+        start = len(pool)
+        if isinstance(pool, list) or isinstance(values, array.array):
+            pool.extend(values)
+        else:
+            # a typed pool meets values it can't hold: it becomes a list, views keep the old pool
+            self.pools[dataType] = list(pool) + list(values)
+        return (dataType, start, len(values))
+
+    def take(self, pool, length, indices):
+        # under the lock, extendPool can't grow the pool while its buffer is exported
+        with self.lock:
+            return takeValues(pool, length, indices)
+
+    def getArray(self, dataType, pool, length):
+        with self.lock:
+            if (self.pools.get(dataType) is not pool) or isinstance(pool, array.array):
+                # a full copy of a numeric pool, decoding goes through take instead;
+                # a view that outlived a rebuild has a pool that is no longer tracked
+                return toArray(pool[:length])
+            result = self.arrays.get(dataType)
+            if (result is None) or (len(result) > len(pool)):
+                result = toArray(pool)
+            elif len(result) < len(pool):
+                # only the values appended since the last call are converted
+                result = np.concatenate([result, toArray(pool[len(result):])])
+            self.arrays[dataType] = result
+            return result[:length]
+
+    def getView(self):
+        with self.lock:
+            return MappingProxyType({
+                dataType: DataView(
+                    values, len(values),
+                    arrayLoader=lambda length, dataType=dataType, values=values: self.getArray(
+                        dataType, values, length),
+                    takeLoader=(lambda length, indices, values=values: self.take(
+                        values, length, indices)) if isinstance(values, array.array) else None)
+                for dataType, values in self.pools.items()
+            })
+
+    def copy(self) -> "DataDictionary":
+        result = DataDictionary()
+        with self.lock:
+            result.pools = {
+                dataType: values[:]
+                for dataType, values in self.pools.items()
+            }
+            result.segments = dict(self.segments)
+            result.layout = dict(self.layout)
+        return result
+
+    def getState(self):
+        # json serializable pools and layout, the segments themselves are saved by the caller
+        with self.lock:
+            return {
+                "pools": {
+                    dataType: values.tolist() if isinstance(values, array.array) else list(values)
+                    for dataType, values in self.pools.items()
+                },
+                "layout": {
+                    key: [list(t) for t in columns]
+                    for key, columns in self.layout.items()
+                },
+            }
+
+    def restore(self, state, dataSegments):
+        # the segments of the layout must be the ones the caller merges later, released or not
+        with self.lock:
+            self.pools = {
+                dataType: newPool(dataType, values)
+                for dataType, values in state["pools"].items()
+            }
+            self.layout = {
+                key: [tuple(t) for t in columns]
+                for key, columns in state["layout"].items()
+                if dataSegments.get(key) is not None
+            }
+            self.segments = dict([(key, dataSegments[key]) for key in self.layout])
+            self.arrays = {}
+        return self
@@ -0,0 +1,42 @@
+import os
+
+
+def writeCsv(frames, path, encoding="utf-8", append=False):
+    # frames are written as they come, only the first one writes the header
+    header = not (append and os.path.exists(path))
+    mode = "a" if append else "w"
+    rows = 0
+    for df in frames:
+        df.to_csv(path, mode=mode, header=header,
+                  index=False, encoding=encoding)
+        header = False
+        mode = "a"
+        rows += len(df)
+    if (rows == 0) and (not append):
+        open(path, "w", encoding=encoding).close()
+    return rows
+
+
+def writeParquet(frames, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("writeParquet requires pyarrow: pip install pyarrow")
+    writer = None
+    rows = 0
+    try:
+        for df in frames:
+            if writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                # every row group must match the schema of the first frame
+                table = pa.Table.from_pandas(
+                    df, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -0,0 +1,144 @@
+import threading
+import time
+
+# upper bounds of the latency histogram buckets, in seconds
+HISTOGRAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def getHooks(hooks):
+    if hooks is None:
+        return []
+    if callable(hooks):
+        return [hooks]
+    return list(hooks)
+
+
+def getBodySize(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return 0
+
+
+def startRequest(scraper, endpoint, method, url, sleepTime=0):
+    # nothing is measured when no hook is registered
+    if (len(scraper.onRequestStart) == 0) and (len(scraper.onRequestEnd) == 0):
+        return None
+    event = {
+        "endpoint": endpoint,
+        "method": method,
+        "url": url,
+        "sleepTime": sleepTime,  # rate limiting sleep before the request
+        "start": time.time(),
+        "payloadBytes": 0,
+        "responseBytes": 0,
+        "status": 0,
+        "duration": 0,
+        "serverTime": 0,  # until the response headers are parsed
+        "error": None,
+    }
+    for hook in scraper.onRequestStart:
+        hook(event)
+    event["perfCounter"] = time.perf_counter()
+    return event
+
+
+def endRequest(scraper, event, r=None, stream=False, error=None):
+    if event is None:
+        return
+    event["duration"] = time.perf_counter() - event.pop("perfCounter")
+    if r is not None:
+        event["status"] = r.status_code
+        event["serverTime"] = r.elapsed.total_seconds()
+        event["payloadBytes"] = getBodySize(r.request.body)
+        if stream:
+            # the body is still on the socket
+            event["responseBytes"] = int(r.headers.get("Content-Length", 0))
+        else:
+            event["responseBytes"] = len(r.content)
+    if error is not None:
+        event["error"] = str(error)
+    for hook in scraper.onRequestEnd:
+        hook(event)
+
+
+def getPercentile(values, percentile):
+    # nearest rank
+    if len(values) == 0:
+        return 0
+    return values[max(0, -(-percentile * len(values) // 100) - 1)]
+
+
+class RequestStats:
+    # aggregates the onRequestEnd events of one or several scrapers, per endpoint
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def attach(self, scraper):
+        scraper.onRequestEnd.append(self.onRequestEnd)
+        return self
+
+    def detach(self, scraper):
+        scraper.onRequestEnd.remove(self.onRequestEnd)
+
+    def onRequestEnd(self, event):
+        with self.lock:
+            if event["endpoint"] not in self.endpoints:
+                self.endpoints[event["endpoint"]] = {
+                    "count": 0,
+                    "errors": 0,
+                    "payloadBytes": 0,
+                    "responseBytes": 0,
+                    "duration": 0,
+                    "serverTime": 0,
+                    "sleepTime": 0,
+                    "durations": [],
+                    "histogram": [0] * (len(self.buckets) + 1),
+                }
+            stats = self.endpoints[event["endpoint"]]
+            stats["count"] += 1
+            if (event["error"] is not None) or (event["status"] >= 400):
+                stats["errors"] += 1
+            for key in ["payloadBytes", "responseBytes", "duration", "serverTime", "sleepTime"]:
+                stats[key] += event[key]
+            stats["durations"].append(event["duration"])
+            bucket = len([t for t in self.buckets if t < event["duration"]])
+            stats["histogram"][bucket] += 1
+
+    def getSummary(self):
+        with self.lock:
+            summary = {}
+            for endpoint, stats in self.endpoints.items():
+                durations = sorted(stats["durations"])
+                summary[endpoint] = dict(
+                    [(key, stats[key]) for key in ["count", "errors", "payloadBytes", "responseBytes", "duration", "serverTime", "sleepTime"]],
+                    p50=getPercentile(durations, 50),
+                    p90=getPercentile(durations, 90),
+                    p99=getPercentile(durations, 99),
+                    max=durations[-1] if len(durations) > 0 else 0,
+                    # (upper bound in seconds, count), the last bucket has no upper bound
+                    histogram=list(zip(list(self.buckets) + [None], stats["histogram"])),
+                )
+            return summary
+
+    def report(self):
+        summary = self.getSummary()
+        lines = [
+            f'{"endpoint":<40} {"count":>6} {"errors":>6} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"total s":>8} {"server s":>8} {"sleep s":>8} {"in kB":>9} {"out kB":>9}'
+        ]
+        for endpoint in sorted(summary, key=lambda t: -summary[t]["duration"]):
+            stats = summary[endpoint]
+            lines.append(
+                f'{endpoint:<40} {stats["count"]:>6} {stats["errors"]:>6} {stats["p50"] * 1000:>8.1f} {stats["p90"] * 1000:>8.1f} {stats["p99"] * 1000:>8.1f} '
+                f'{stats["duration"]:>8.2f} {stats["serverTime"]:>8.2f} {stats["sleepTime"]:>8.2f} {stats["responseBytes"] / 1024:>9.1f} {stats["payloadBytes"] / 1024:>9.1f}')
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
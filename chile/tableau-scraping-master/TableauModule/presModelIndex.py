@@ -0,0 +1,111 @@
+import json
+
+
+def getColumnsIndicesInfo(columnsData, noSelectFilter=True, noFieldCaption=False):
+    return [
+        {
+            "fieldCaption": t.get("fieldCaption", ""),
+            "tupleIds": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["tupleIds"],
+            "valueIndices": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["valueIndices"],
+            "aliasIndices": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["aliasIndices"],
+            "dataType": t.get("dataType", ""),
+            "paneIndices": t["paneIndices"][0],
+            "columnIndices": t["columnIndices"][0],
+            "fn": t.get("fn", "")
+        }
+        for t in columnsData["vizDataColumns"]
+        if (t.get("fieldCaption") or noFieldCaption) and (noSelectFilter or (t.get("isAutoSelect") == True))
+    ]
+
+
+class PresModelIndex:
+    # one pass over the zones of a dashboard, worksheet lookups are then dict accesses
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.worksheetZones = []  # zones with vizData, in layout order
+        self.worksheetZoneByName = {}  # worksheet name -> first zone with vizData
+        self.selectedFilters = {}  # worksheet name -> categorical quick filters
+        self.filtersJson = {}  # worksheet name -> raw filtersJson of each zone
+        self.storyPoints = None  # storyPoints of the first flipboard zone
+        self.parsedFilters = {}
+        self.columns = {}
+        self.storyPointIndexes = {}
+        for z in list(zones):
+            zone = zones[z]
+            if (zone is None) or ("presModelHolder" not in zone):
+                continue
+            holder = zone["presModelHolder"]
+            if (self.storyPoints is None) and ("flipboard" in holder) and ("storyPoints" in holder["flipboard"]):
+                self.storyPoints = holder["flipboard"]["storyPoints"]
+            if "worksheet" not in zone:
+                continue
+            worksheetName = zone["worksheet"]
+            if "visual" in holder:
+                if "vizData" in holder["visual"]:
+                    self.worksheetZones.append(zone)
+                    if worksheetName not in self.worksheetZoneByName:
+                        self.worksheetZoneByName[worksheetName] = zone
+                if "filtersJson" in holder["visual"]:
+                    self.filtersJson.setdefault(worksheetName, []).append(
+                        holder["visual"]["filtersJson"])
+            if (("quickFilterDisplay" in holder) and
+                ("quickFilter" in holder["quickFilterDisplay"]) and
+                    ("categoricalFilter" in holder["quickFilterDisplay"]["quickFilter"])):
+                categoricalFilter = holder["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]
+                self.selectedFilters.setdefault(worksheetName, []).append({
+                    "fn": categoricalFilter["fn"],
+                    "columnFullNames": categoricalFilter["columnFullNames"],
+                    "domainTables": categoricalFilter["domainTables"],
+                })
+
+    def getWorksheetZones(self):
+        return list(self.worksheetZones)
+
+    def getWorksheetZone(self, worksheetName):
+        return self.worksheetZoneByName.get(worksheetName)
+
+    def getSelectedFilters(self, worksheetName):
+        return list(self.selectedFilters.get(worksheetName, []))
+
+    def getFilters(self, worksheetName):
+        if worksheetName not in self.parsedFilters:
+            self.parsedFilters[worksheetName] = [
+                json.loads(t) for t in self.filtersJson.get(worksheetName, [])
+            ]
+        return self.parsedFilters[worksheetName]
+
+    def getColumns(self, worksheetName, noSelectFilter=True, noFieldCaption=False):
+        key = (worksheetName, noSelectFilter, noFieldCaption)
+        if key not in self.columns:
+            zone = self.getWorksheetZone(worksheetName)
+            details = zone["presModelHolder"]["visual"]["vizData"] if zone is not None else {}
+            if "paneColumnsData" not in details:
+                self.columns[key] = []
+            else:
+                self.columns[key] = getColumnsIndicesInfo(
+                    details["paneColumnsData"], noSelectFilter, noFieldCaption)
+        return self.columns[key]
+
+    def getStoryPointKeys(self):
+        return list(self.storyPoints.keys()) if self.storyPoints is not None else []
+
+    def getStoryPointIndex(self, key=None) -> "PresModelIndex":
+        # first story point by default
+        if key is None:
+            keys = self.getStoryPointKeys()
+            if len(keys) == 0:
+                return None
+            key = keys[0]
+        if key not in self.storyPointIndexes:
+            self.storyPointIndexes[key] = PresModelIndex(
+                self.storyPoints[key]["dashboardPresModel"]["zones"])
+        return self.storyPointIndexes[key]
+
+
+def getPresModelIndex(zones, index=None) -> PresModelIndex:
+    # responses are never mutated once parsed: the objects built from one response
+    # (worksheets, filters) share its index, they pass it back here
+    if (index is not None) and (index.zones is zones):
+        return index
+    return PresModelIndex(zones)
@@ -0,0 +1,146 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# decode stage timings, disabled by default: a disabled span is a shared no-op context manager
+
+enabled = False
+events = []
+eventsLock = threading.Lock()
+
+
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+nullSpan = NullSpan()
+
+
+class Span:
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        end = time.perf_counter()
+        event = {
+            "name": self.name,
+            "ph": "X",  # complete event of the chrome trace format
+            "ts": self.start * 1e6,
+            "dur": (end - self.start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        with eventsLock:
+            events.append(event)
+        return False
+
+
+def span(name, **args):
+    if not enabled:
+        return nullSpan
+    return Span(name, args)
+
+
+def profiled(name):
+    # span around each call of the decorated function
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with Span(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    global events
+    with eventsLock:
+        events = []
+
+
+def getEvents():
+    with eventsLock:
+        return list(events)
+
+
+def getSummary():
+    # name -> count and total/max duration in seconds, nested spans are counted in their parents too
+    summary = {}
+    for event in getEvents():
+        stats = summary.setdefault(
+            event["name"], {"count": 0, "total": 0, "max": 0})
+        stats["count"] += 1
+        stats["total"] += event["dur"] / 1e6
+        stats["max"] = max(stats["max"], event["dur"] / 1e6)
+    return summary
+
+
+def getChromeTrace():
+    return {"traceEvents": getEvents(), "displayTimeUnit": "ms"}
+
+
+def exportChromeTrace(path):
+    # open the file in chrome://tracing or https://ui.perfetto.dev
+    with open(path, "w") as f:
+        json.dump(getChromeTrace(), f)
+
+
+class Profiler:
+
+    def __init__(self, clear=True):
+        self.clear = clear
+        self.wasEnabled = False
+
+    def __enter__(self):
+        self.wasEnabled = enabled
+        if self.clear:
+            reset()
+        enable()
+        return self
+
+    def __exit__(self, *args):
+        if not self.wasEnabled:
+            disable()
+        return False
+
+    def getEvents(self):
+        return getEvents()
+
+    def getSummary(self):
+        return getSummary()
+
+    def exportChromeTrace(self, path):
+        exportChromeTrace(path)
+
+
+def profile(clear=True) -> Profiler:
+    # with profiling.profile() as p: ..., then p.exportChromeTrace(path)
+    return Profiler(clear)
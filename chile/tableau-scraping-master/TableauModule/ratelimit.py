@@ -0,0 +1,97 @@
+import threading
+import time
+
+BACKOFF_STATUS = (429, 503)
+
+
+class TokenBucket:
+
+    rate: float = 2.0  # current tokens per second
+    maxRate: float = 2.0
+    minRate: float = 0.1
+    burst: int = 1
+    backoffFactor: float = 0.5  # rate multiplier on 429/503
+    recoveryStep: float = 0.05  # fraction of maxRate recovered on each successful response
+
+    def __init__(self, rate, burst=1, minRate=None, backoffFactor=0.5, recoveryStep=0.05):
+        self.rate = float(rate)
+        self.maxRate = float(rate)
+        self.minRate = float(minRate) if minRate is not None else self.maxRate / 20
+        self.burst = burst
+        self.backoffFactor = backoffFactor
+        self.recoveryStep = recoveryStep
+        self.tokens = float(burst)
+        self.lastRefill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(float(self.burst), self.tokens +
+                          (now - self.lastRefill) * self.rate)
+        self.lastRefill = now
+
+    def reserve(self, tokens=1):
+        # take the tokens now, possibly going into debt, and return how long the caller must wait
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def acquire(self, tokens=1):
+        waitTime = self.reserve(tokens)
+        if waitTime > 0:
+            time.sleep(waitTime)
+        return waitTime
+
+    def onResponse(self, status, retryAfter=None):
+        with self.lock:
+            self.refill(time.monotonic())
+            if status in BACKOFF_STATUS:
+                self.rate = max(self.minRate, self.rate * self.backoffFactor)
+                if retryAfter is not None:
+                    # nobody gets a token before the server said it's ok
+                    self.tokens = min(self.tokens, -retryAfter * self.rate)
+            elif status < 400:
+                self.rate = min(self.maxRate, self.rate +
+                                self.maxRate * self.recoveryStep)
+
+
+class RateLimiter:
+    # one token bucket per host, shared by every scraper and thread using this limiter
+
+    def __init__(self, rate=2.0, burst=1, minRate=None, backoffFactor=0.5, recoveryStep=0.05):
+        self.options = {
+            "rate": rate,
+            "burst": burst,
+            "minRate": minRate,
+            "backoffFactor": backoffFactor,
+            "recoveryStep": recoveryStep
+        }
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def getBucket(self, host) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(**self.options)
+            return self.buckets[host]
+
+    def reserve(self, host, tokens=1):
+        return self.getBucket(host).reserve(tokens)
+
+    def acquire(self, host, tokens=1):
+        return self.getBucket(host).acquire(tokens)
+
+    def onResponse(self, host, status, retryAfter=None):
+        self.getBucket(host).onResponse(status, retryAfter)
+
+
+def parseRetryAfter(value):
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date format is not worth the parsing, the rate is already reduced
+        return None
@@ -26,7 +26,7 @@ def get(TS, data, info, logger):
     field = result[int(selected)]
     logger.info(f"you have selected {field['fieldCaption']}")
 
-    dataFull = utils.getDataFull(presModel, TS.dataSegments)
+    dataFull = utils.getDataFull(presModel, TS.dataSegments, TS.dataDictionary)
     frameData = utils.getData(dataFull, [field])
     frameDataKeys = list(frameData.keys())
 
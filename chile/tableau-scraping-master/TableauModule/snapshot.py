@@ -0,0 +1,125 @@
+import copy
+import json
+import threading
+from tableauscraper import api
+from tableauscraper import state
+from tableauscraper.dataDictionary import DataDictionary
+
+SNAPSHOT_VERSION = 3
+DATA_SEGMENTS_PATH = ["secondaryInfo", "presModelMap", "dataDictionary",
+                      "presModelHolder", "genDataDictionaryPresModel"]
+
+
+def getCookies(session):
+    if session is None:
+        return []
+    return [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "secure": cookie.secure,
+            "expires": cookie.expires,
+        }
+        for cookie in session.cookies
+    ]
+
+
+def setCookies(session, cookies):
+    for cookie in cookies:
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie["domain"],
+            path=cookie["path"],
+            secure=cookie["secure"],
+            expires=cookie["expires"],
+        )
+
+
+def withDataSegments(data, dataSegments):
+    # the bootstrap document holds the scraper segments dict: copy it along that path only
+    parents = [data]
+    for key in DATA_SEGMENTS_PATH:
+        if (not isinstance(parents[-1], dict)) or (key not in parents[-1]):
+            return data
+        parents.append(parents[-1][key])
+    node = dict(parents[-1], dataSegments=dataSegments)
+    for key, parent in reversed(list(zip(DATA_SEGMENTS_PATH, parents[:-1]))):
+        node = dict(parent, **{key: node})
+    return node
+
+
+def takeSnapshot(TS):
+    # bootstrap documents, filters, parameters and zones are never mutated, only replaced
+    # values are saved from the data dictionary pools, the segments are released first
+    TS.dataDictionary.merge(TS.dataSegments)
+    dataSegments = dict(TS.dataSegments)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "host": TS.host,
+        "tableauData": TS.tableauData,
+        "info": TS.info,
+        "data": withDataSegments(TS.data, dataSegments),
+        "dashboard": TS.dashboard,
+        "dataSegments": dataSegments,
+        "dataDictionary": TS.dataDictionary.getState(),
+        "parameters": dict(TS.parameters),
+        "filters": dict(TS.filters),
+        "zones": TS.zones,
+        "stateHash": TS.stateHash,
+        "pendingCommands": list(TS.pendingCommands),
+        "cookies": getCookies(TS.session),
+    }
+
+
+def restoreSnapshot(TS, snapshot):
+    if snapshot.get("version") not in (1, 2, SNAPSHOT_VERSION):
+        raise ValueError(
+            f'unsupported snapshot version {snapshot.get("version")}')
+    api.setSession(TS)
+    # a fork is a copy of its origin, it must not share its locks
+    TS.lock = threading.RLock()
+    TS.delayLock = threading.Lock()
+    setCookies(TS.session, snapshot["cookies"])
+    TS.host = snapshot["host"]
+    TS.tableauData = snapshot["tableauData"]
+    TS.info = snapshot["info"]
+    TS.dashboard = snapshot["dashboard"]
+    TS.dataSegments = dict(snapshot["dataSegments"])
+    # the document has its own copy of the segments dict, like after loads
+    TS.data = withDataSegments(snapshot["data"], dict(TS.dataSegments))
+    TS.dataDictionary = DataDictionary(release=True)
+    if "dataDictionary" in snapshot:
+        TS.dataDictionary.restore(snapshot["dataDictionary"], TS.dataSegments)
+    # older versions kept the values in the segments, they are merged again on the next worksheet access
+    if snapshot["version"] == 1:
+        # parameters and filters were lists
+        TS.parameters = state.getParameterStore(snapshot["parameters"])
+        TS.filters = state.getFilterStore(snapshot["filters"])
+    else:
+        TS.parameters = dict(snapshot["parameters"])
+        TS.filters = dict(snapshot["filters"])
+    TS.zones = snapshot["zones"]
+    TS.stateHash = snapshot.get("stateHash", "")
+    TS.pendingCommands = [
+        (command, payload) for command, payload in snapshot.get("pendingCommands", [])
+    ]
+    return TS
+
+
+def saveSnapshot(TS, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(takeSnapshot(TS), f)
+
+
+def loadSnapshot(TS, path):
+    with open(path, "r", encoding="utf-8") as f:
+        return TS.restore(json.load(f))
+
+
+def fork(TS):
+    # the fork shares the adapter and rate limiter but has its own requests session
+    forked = copy.copy(TS)
+    return forked.restore(takeSnapshot(TS))
@@ -0,0 +1,54 @@
+from tableauscraper import utils
+
+# filters, parameters and zones are replaced, never mutated: a merge builds new containers
+# for the parts that changed and shares the rest with the previous state
+
+
+def getFilterStore(filters):
+    # worksheet -> globalFieldName -> filter, dict order is the order of the last update
+    return dict([
+        (worksheet, dict([(t["globalFieldName"], t) for t in filters[worksheet]]))
+        for worksheet in filters
+    ])
+
+
+def getParameterStore(parameters):
+    # parameterName -> parameter controls, several controls can be bound to the same parameter
+    store = {}
+    for parameter in parameters:
+        store.setdefault(parameter["parameterName"], []).append(parameter)
+    return store
+
+
+def getParameters(parameters):
+    return [t for controls in parameters.values() for t in controls]
+
+
+def mergeFilters(filters, newFilters):
+    merged = dict(filters)
+    for worksheet in newFilters:
+        worksheetFilters = dict(merged.get(worksheet, {}))
+        for newFilter in newFilters[worksheet]:
+            # updated filters move to the end
+            worksheetFilters.pop(newFilter["globalFieldName"], None)
+            worksheetFilters[newFilter["globalFieldName"]] = newFilter
+        merged[worksheet] = worksheetFilters
+    return merged
+
+
+def mergeParameters(parameters, newParameters):
+    # parameters already known are kept as is
+    merged = dict(parameters)
+    for newParameter in newParameters:
+        if newParameter["parameterName"] not in merged:
+            merged[newParameter["parameterName"]] = [newParameter]
+    return merged
+
+
+def mergeZones(zones, newZones):
+    # zones without vizData keep the last vizData received
+    return dict([
+        (zone, zones[zone] if (not utils.hasVizData(newZones[zone])) and (zone in zones) else newZones[zone])
+        for zone in newZones
+        if newZones[zone] is not None
+    ])
@@ -0,0 +1,77 @@
+import tempfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_METHODS = ("HEAD", "GET", "OPTIONS")
+SPOOL_MAX_SIZE = 16 * 1024 * 1024  # downloads bigger than this are spooled to disk
+CHUNK_SIZE = 64 * 1024
+
+
+class TableauHTTPAdapter(HTTPAdapter):
+    # requests has no session-wide timeout, apply a default one per request
+    timeout = None
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def createRetry(retries=3, backoffFactor=0.5, statusForcelist=RETRY_STATUS, methods=RETRY_METHODS):
+    options = {
+        "total": retries,
+        "connect": retries,
+        "read": retries,
+        "status": retries,
+        "backoff_factor": backoffFactor,
+        "status_forcelist": statusForcelist,
+        "raise_on_status": False,
+    }
+    try:
+        return Retry(allowed_methods=frozenset(methods), **options)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=frozenset(methods), **options)
+
+
+def createAdapter(poolConnections=10, poolMaxsize=10, retries=3, backoffFactor=0.5, timeout=(10, 120), retryMethods=RETRY_METHODS):
+    return TableauHTTPAdapter(
+        timeout=timeout,
+        pool_connections=poolConnections,
+        pool_maxsize=poolMaxsize,
+        max_retries=createRetry(
+            retries=retries, backoffFactor=backoffFactor, methods=retryMethods),
+        pool_block=False
+    )
+
+
+def mountAdapter(session, adapter):
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def spoolResponse(r, maxSize=SPOOL_MAX_SIZE, chunkSize=CHUNK_SIZE):
+    # copies a streamed body chunk by chunk, the whole payload is never held as one bytes object
+    spool = tempfile.SpooledTemporaryFile(max_size=maxSize)
+    try:
+        for chunk in r.iter_content(chunk_size=chunkSize):
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        r.close()
+    spool.seek(0)
+    return spool
+
+
+def getResponseStream(r):
+    # file object reading the body from the socket, content encoding is decoded on the fly
+    r.raw.decode_content = True
+    return r.raw
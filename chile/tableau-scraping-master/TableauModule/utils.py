@@ -1,5 +1,109 @@
-import copy
+import html
 import json
+import re
+import numpy as np
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from tableauscraper.dataDictionary import DataDictionary, DataView, isReleased, toObjectArray
+from tableauscraper.presModelIndex import getPresModelIndex
+from tableauscraper import profiling
+
+
+def loadsJson(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+@profiling.profiled("utils.getBootstrapDocuments")
+def getBootstrapDocuments(text, count=2):
+    # the bootstrap body is length prefixed: <len>;<json><len>;<json>
+    documents = []
+    position = 0
+    decoder = json.JSONDecoder()
+    while len(documents) < count:
+        separator = text.find(";", position)
+        if separator == -1:
+            raise ValueError("bootstrap response is not length prefixed")
+        length = int(text[position:separator].strip())
+        start = separator + 1
+        end = start + length
+        try:
+            if (end > len(text)) or (text[end - 1] != "}"):
+                raise ValueError("length prefix does not match a document")
+            documents.append(loadsJson(text[start:end]))
+        except ValueError:
+            # the server counts utf-16 code units, decode a single document instead
+            while text[start].isspace():
+                start += 1
+            document, end = decoder.raw_decode(text, start)
+            documents.append(document)
+        position = end
+    return documents
+
+
+# (?<![-\w]) so that data-id/data-class attributes don't match
+TS_CONFIG_CONTAINER = re.compile(
+    r'<textarea\b[^>]*(?<![-\w])id\s*=\s*["\']?tsConfigContainer\b[^>]*>', re.IGNORECASE)
+TABLEAU_PLACEHOLDER = re.compile(
+    r'<div\b[^>]*(?<![-\w])class\s*=\s*["\'][^"\']*\btableauPlaceholder\b[^>]*>', re.IGNORECASE)
+DIV_TAG = re.compile(r"<(/?)div\b[^>]*>", re.IGNORECASE)
+PARAM_TAG = re.compile(r"<param\b([^>]*)>", re.IGNORECASE)
+TAG_ATTRIBUTE = re.compile(
+    r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>/]+))')
+
+
+def getSoup(text):
+    # only imported when the targeted extraction fails
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(text, "html.parser")
+
+
+@profiling.profiled("utils.getTsConfigContainer")
+def getTsConfigContainer(text):
+    match = TS_CONFIG_CONTAINER.search(text)
+    if match is None:
+        if "tsConfigContainer" not in text:
+            return None
+        container = getSoup(text).find("textarea", {"id": "tsConfigContainer"})
+        return container.text if container is not None else None
+    end = text.lower().find("</textarea", match.end())
+    if end == -1:
+        end = len(text)
+    return html.unescape(text[match.end():end])
+
+
+def getTableauPlaceholderParams(text):
+    match = TABLEAU_PLACEHOLDER.search(text)
+    if match is None:
+        if "tableauPlaceholder" not in text:
+            return None
+        placeholder = getSoup(text).find("div", {"class": "tableauPlaceholder"})
+        if placeholder is None:
+            return None
+        return dict([
+            (t.get("name", ""), t.get("value", ""))
+            for t in placeholder.find_all("param")
+        ])
+    # the params may be in nested divs, the placeholder ends at its matching close tag
+    end = len(text)
+    depth = 1
+    for tag in DIV_TAG.finditer(text, match.end()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            end = tag.start()
+            break
+    params = {}
+    for param in PARAM_TAG.finditer(text, match.end(), end):
+        attributes = {
+            t.group(1).lower(): html.unescape(
+                next((v for v in t.group(2, 3, 4) if v is not None), ""))
+            for t in TAG_ATTRIBUTE.finditer(param.group(1))
+        }
+        params[attributes.get("name", "")] = attributes.get("value", "")
+    return params
 
 
 def selectWorksheet(data, logger, single=False):
@@ -124,6 +228,7 @@ def listWorksheet(presModelMap):
     )
 
 
+@profiling.profiled("utils.getIndicesInfo")
 def getIndicesInfo(presModelMap, worksheet, noSelectFilter=True, noFieldCaption=False):
     genVizDataPresModel = presModelMap["vizData"][
         "presModelHolder"
@@ -155,171 +260,130 @@ def getIndicesInfo(presModelMap, worksheet, noSelectFilter=True, noFieldCaption=
     return result
 
 
-def getIndicesInfoVqlResponse(presModel, worksheet, noSelectFilter=True, noFieldCaption=False):
-    zonesWithWorksheet = listWorksheetCmdResponse(presModel)
-
-    selectedZones = [
-        t for t in zonesWithWorksheet if t["worksheet"] == worksheet]
-    if len(selectedZones) == 0:
-        return []
-    selectedZone = selectedZones[0]
-
-    details = selectedZone["presModelHolder"]["visual"]["vizData"]
-
-    if "paneColumnsData" not in details:
-        return []
-    columnsData = details["paneColumnsData"]
-
-    return [
-        {
-            "fieldCaption": t.get("fieldCaption", ""),
-            "tupleIds": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["tupleIds"],
-            "valueIndices": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["valueIndices"],
-            "aliasIndices": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["aliasIndices"],
-            "dataType": t.get("dataType", ""),
-            "paneIndices": t["paneIndices"][0],
-            "columnIndices": t["columnIndices"][0],
-            "fn": t.get("fn", "")
-        }
-        for t in columnsData["vizDataColumns"]
-        if (t.get("fieldCaption") or noFieldCaption) and (noSelectFilter or (t.get("isAutoSelect") == True))
-    ]
-
-
-def getIndicesInfoStoryPoint(presModel, worksheet, noSelectFilter=True, noFieldCaption=False):
-    zonesWithWorksheet = listWorksheetStoryPoint(presModel)
-
-    selectedZones = [
-        t for t in zonesWithWorksheet if t["worksheet"] == worksheet]
-    if len(selectedZones) == 0:
-        return []
-    selectedZone = selectedZones[0]
+@profiling.profiled("utils.getIndicesInfoVqlResponse")
+def getIndicesInfoVqlResponse(presModel, worksheet, noSelectFilter=True, noFieldCaption=False, index=None):
+    return getPresModelIndex(getZones(presModel), index).getColumns(
+        worksheet, noSelectFilter, noFieldCaption)
 
-    details = selectedZone["presModelHolder"]["visual"]["vizData"]
 
-    if "paneColumnsData" not in details:
+@profiling.profiled("utils.getIndicesInfoStoryPoint")
+def getIndicesInfoStoryPoint(presModel, worksheet, noSelectFilter=True, noFieldCaption=False, index=None):
+    storyPointIndex = getPresModelIndex(getZones(presModel), index).getStoryPointIndex()
+    if storyPointIndex is None:
         return []
-    columnsData = details["paneColumnsData"]
-
-    return [
-        {
-            "fieldCaption": t.get("fieldCaption", ""),
-            "tupleIds": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["tupleIds"],
-            "valueIndices": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["valueIndices"],
-            "aliasIndices": columnsData["paneColumnsList"][t["paneIndices"][0]]["vizPaneColumns"][t["columnIndices"][0]]["aliasIndices"],
-            "dataType": t.get("dataType", ""),
-            "paneIndices": t["paneIndices"][0],
-            "columnIndices": t["columnIndices"][0],
-            "fn": t.get("fn", "")
-        }
-        for t in columnsData["vizDataColumns"]
-        if (t.get("fieldCaption") or noFieldCaption) and (noSelectFilter or (t.get("isAutoSelect") == True))
-    ]
+    return storyPointIndex.getColumns(worksheet, noSelectFilter, noFieldCaption)
 
 
-def getDataFull(presModelMap, originSegments):
+@profiling.profiled("utils.getDataFull")
+def getDataFull(presModelMap, originSegments, dataDictionary=None):
     dataSegments = {}
     if (("dataDictionary" in presModelMap) and
             ("presModelHolder" in presModelMap["dataDictionary"]) and
             ("genDataDictionaryPresModel" in presModelMap["dataDictionary"]["presModelHolder"]) and
             ("dataSegments" in presModelMap["dataDictionary"]["presModelHolder"]["genDataDictionaryPresModel"])):
         dataSegments = presModelMap["dataDictionary"]["presModelHolder"]["genDataDictionaryPresModel"]["dataSegments"]
+    return getDataDictionaryView(originSegments, dataSegments, dataDictionary)
+
+
+def getDataDictionaryView(originSegments, dataSegments, dataDictionary=None):
+    # the data dictionary mirrors originSegments (the scraper's persisted segments) and only merges new ones
+    if dataDictionary is None:
+        dataDictionary = DataDictionary()
+        # the values of released segments are in the scraper's dictionary only, the document may still have them
+        originSegments = dict([
+            (key, dataSegments[key]
+             if (segment is not None) and isReleased(segment) and (dataSegments.get(key) is not None)
+             else segment)
+            for key, segment in originSegments.items()
+        ])
+    dataDictionary.merge(originSegments)
+    extraSegments = {
+        key: dataSegments[key]
+        for key in list(dataSegments)
+        if (key not in originSegments) and (dataSegments[key] is not None)
+    }
+    if len(extraSegments) == 0:
+        return dataDictionary.getView()
+    # segments that are not persisted are decoded from a temporary copy
+    temporary = dataDictionary.copy()
+    temporary.merge(extraSegments)
+    return temporary.getView()
 
-    dataSegmentscp = copy.deepcopy(dataSegments)
-    originSegmentscp = copy.deepcopy(originSegments)
-    dataColumns = []
-    for d in list(originSegmentscp):
-        dataColumns.extend(originSegmentscp[d]["dataColumns"])
 
-    for d in list(dataSegmentscp):
-        if d not in originSegments:
-            dataColumns.extend(dataSegmentscp[d]["dataColumns"])
+def onDataValue(it, value, cstring):
+    return value[it] if (it >= 0) else cstring[abs(it) - 1]
 
-    dataFull = {}
-    for t in dataColumns:
-        if t["dataType"] in dataFull:
-            dataFull[t["dataType"]].extend(t["dataValues"])
-        else:
-            dataFull[t["dataType"]] = t["dataValues"]
-    return dataFull
 
+def getValuesArray(values):
+    if isinstance(values, DataView):
+        # numeric pools are indexed in place by decodeIndices, only the decoded rows are copied
+        return values if values.isTyped() else values.toArray()
+    # object dtype keeps the decoded values as the original python objects
+    return toObjectArray(list(values))
+
+
+def decodeIndices(indices, values, cstring):
+    # same as onDataValue on each index, out of range indices are dropped
+    indices = np.asarray(indices, dtype=np.int64)
+    indices = indices[indices < len(values)]
+    negative = indices < 0
+    if not negative.any():
+        return values[indices]
+    result = np.empty(len(indices), dtype=object)
+    result[~negative] = values[indices[~negative]]
+    result[negative] = cstring[-indices[negative] - 1]
+    return result
 
-def onDataValue(it, value, cstring):
-    return value[it] if (it >= 0) else cstring[abs(it) - 1]
+
+def getDataColumns(indicesInfo):
+    # (frame column, index, indicesKey) of each column getData decodes, in order
+    result = []
+    keys = set()
+    for index in indicesInfo:
+        for indicesKey, suffix in [("valueIndices", "value"), ("aliasIndices", "alias")]:
+            if len(index[indicesKey]) == 0:
+                continue
+            if f'{index["fieldCaption"]}-{suffix}' not in keys:
+                key = f'{index["fieldCaption"]}-{suffix}'
+            else:
+                key = f'{index["fieldCaption"]}-{index["fn"]}-{suffix}'
+            keys.add(key)
+            result.append((key, index, indicesKey))
+    return result
 
 
-def getData(dataFull, indicesInfo):
-    if "cstring" in dataFull:
-        cstring = dataFull["cstring"]
-    else:
-        cstring = {}
-    frameData = {}
+def getDataArrays(dataFull, indicesInfo):
+    # values array of each dataType used by indicesInfo, unknown dataTypes are read from cstring
+    arrays = {"cstring": getValuesArray(dataFull["cstring"] if "cstring" in dataFull else [])}
     for index in indicesInfo:
-        if index["dataType"] in dataFull:
-            t = dataFull[index["dataType"]]
-            if len(index["valueIndices"]) > 0:
-                values = []
-                for value in index["valueIndices"]:
-                    if value < len(t):
-                        values.append(onDataValue(value, t, cstring))
-                if f'{index["fieldCaption"]}-value' not in frameData:
-                    frameData[f'{index["fieldCaption"]}-value'] = values
-                else:
-                    frameData[f'{index["fieldCaption"]}-{index["fn"]}-value'] = values
-            if len(index["aliasIndices"]) > 0:
-                values = []
-                for value in index["aliasIndices"]:
-                    if value < len(t):
-                        values.append(onDataValue(value, t, cstring))
-                if f'{index["fieldCaption"]}-alias' not in frameData:
-                    frameData[f'{index["fieldCaption"]}-alias'] = values
-                else:
-                    frameData[f'{index["fieldCaption"]}-{index["fn"]}-alias'] = values
-        else:
-            # if datatype is not found, try cstring
-            t = cstring
-            if len(index["valueIndices"]) > 0:
-                values = []
-                for value in index["valueIndices"]:
-                    if value < len(t):
-                        values.append(onDataValue(value, t, cstring))
-                if f'{index["fieldCaption"]}-value' not in frameData:
-                    frameData[f'{index["fieldCaption"]}-value'] = values
-                else:
-                    frameData[f'{index["fieldCaption"]}-{index["fn"]}-value'] = values
-            if len(index["aliasIndices"]) > 0:
-                values = []
-                for value in index["aliasIndices"]:
-                    if value < len(t):
-                        values.append(onDataValue(value, t, cstring))
-                if f'{index["fieldCaption"]}-alias' not in frameData:
-                    frameData[f'{index["fieldCaption"]}-alias'] = values
-                else:
-                    frameData[f'{index["fieldCaption"]}-{index["fn"]}-alias'] = values
+        dataType = index["dataType"] if index["dataType"] in dataFull else "cstring"
+        if dataType not in arrays:
+            arrays[dataType] = getValuesArray(dataFull[dataType])
+    return arrays
+
+
+@profiling.profiled("utils.getData")
+def getData(dataFull, indicesInfo, asArray=False, dataTypes=None, arrays=None):
+    if arrays is None:
+        arrays = getDataArrays(dataFull, indicesInfo)
+    cstring = arrays["cstring"]
+    frameData = {}
+    for key, index, indicesKey in getDataColumns(indicesInfo):
+        t = arrays[index["dataType"] if index["dataType"] in dataFull else "cstring"]
+        values = decodeIndices(index[indicesKey], t, cstring)
+        if not asArray:
+            values = values.tolist()
+        frameData[key] = values
+        if dataTypes is not None:
+            dataTypes[key] = index["dataType"]
     return frameData
 
 
-def getDataFullCmdResponse(presModel, originSegments, dataSegments={}):
+@profiling.profiled("utils.getDataFullCmdResponse")
+def getDataFullCmdResponse(presModel, originSegments, dataSegments={}, dataDictionary=None):
     if (not dataSegments) and ("dataDictionary" in presModel) and ("dataSegments" in presModel["dataDictionary"]):
         dataSegments = presModel["dataDictionary"]["dataSegments"]
-    dataSegmentscp = copy.deepcopy(dataSegments)
-    originSegmentscp = copy.deepcopy(originSegments)
-    dataColumns = []
-    for d in list(originSegmentscp):
-        if (originSegmentscp[d] is not None):
-            dataColumns.extend(originSegmentscp[d]["dataColumns"])
-
-    for d in list(dataSegmentscp):
-        if (d not in originSegments) and (dataSegmentscp[d] is not None):
-            dataColumns.extend(dataSegmentscp[d]["dataColumns"])
-
-    dataFull = {}
-    for t in dataColumns:
-        if t["dataType"] in dataFull:
-            dataFull[t["dataType"]].extend(t["dataValues"])
-        else:
-            dataFull[t["dataType"]] = t["dataValues"]
-    return dataFull
+    return getDataDictionaryView(originSegments, dataSegments, dataDictionary)
 
 
 def getZones(presModel):
@@ -367,100 +431,41 @@ def getStoryPointsFromInfo(logger, info):
     return result
 
 
-def listWorksheetCmdResponse(presModel):
-    if (("workbookPresModel" in presModel) and
-        ("dashboardPresModel" in presModel["workbookPresModel"]) and
-            ("zones" in presModel["workbookPresModel"]["dashboardPresModel"])):
-        zones = presModel["workbookPresModel"]["dashboardPresModel"]["zones"]
-        return [
-            zones[z]
-            for z in list(zones)
-            if zones[z] is not None
-            and ("worksheet" in zones[z])
-            and ("presModelHolder" in zones[z])
-            and ("visual" in zones[z]["presModelHolder"])
-            and ("vizData" in zones[z]["presModelHolder"]["visual"])
-        ]
-    return []
+def listWorksheetCmdResponse(presModel, index=None):
+    return getPresModelIndex(getZones(presModel), index).getWorksheetZones()
 
 
-def listStoryPointsCmdResponse(presModel, TS=None):
-    if (("workbookPresModel" in presModel) and
-        ("dashboardPresModel" in presModel["workbookPresModel"]) and
-            ("zones" in presModel["workbookPresModel"]["dashboardPresModel"])):
-        zones = presModel["workbookPresModel"]["dashboardPresModel"]["zones"] if TS is None else TS.zones
-        storypoints = [
-            zones[z]["presModelHolder"]["flipboard"]["storyPoints"]
-            for z in list(zones)
-            if zones[z] is not None
-            and ("presModelHolder" in zones[z])
-            and ("flipboard" in zones[z]["presModelHolder"])
-            and ("storyPoints" in zones[z]["presModelHolder"]["flipboard"])
-        ]
-        stories = []
-        if len(storypoints) > 0:
-            storypoint = storypoints[0]
-            keys = list(storypoint.keys())
-            if len(keys) > 0:
-                zones = storypoint[keys[0]]["dashboardPresModel"]["zones"]
-                stories = [
-                    zones[z]
-                    for z in list(zones)
-                    if zones[z] is not None
-                    and ("worksheet" in zones[z])
-                    and ("presModelHolder" in zones[z])
-                    and ("visual" in zones[z]["presModelHolder"])
-                    and ("vizData" in zones[z]["presModelHolder"]["visual"])
-                ]
-        return stories
-    return []
+def listStoryPointsCmdResponse(presModel, TS=None, index=None):
+    return listWorksheetStoryPoint(presModel, hasWorksheet=True, TS=TS, index=index)
 
 
-def listWorksheetStoryPoint(presModel, hasWorksheet=True, TS=None):
-    if (("workbookPresModel" in presModel) and
-        ("dashboardPresModel" in presModel["workbookPresModel"]) and
-            ("zones" in presModel["workbookPresModel"]["dashboardPresModel"])):
-        zones = presModel["workbookPresModel"]["dashboardPresModel"]["zones"] if TS is None else TS.zones
-        storypoints = [
-            zones[z]["presModelHolder"]["flipboard"]["storyPoints"]
-            for z in list(zones)
-            if zones[z] is not None
-            and ("presModelHolder" in zones[z])
-            and ("flipboard" in zones[z]["presModelHolder"])
-            and ("storyPoints" in zones[z]["presModelHolder"]["flipboard"])
-        ]
-        stories = []
-        if len(storypoints) > 0:
-            storypoint = storypoints[0]
-            keys = list(storypoint.keys())
-            if len(keys) > 0:
-                zones = storypoint[keys[0]]["dashboardPresModel"]["zones"]
-                if hasWorksheet:
-                    stories = [
-                        zones[z]
-                        for z in list(zones)
-                        if zones[z] is not None
-                        and ("worksheet" in zones[z])
-                        and ("presModelHolder" in zones[z])
-                        and ("visual" in zones[z]["presModelHolder"])
-                        and ("vizData" in zones[z]["presModelHolder"]["visual"])
-                    ]
-                else:
-                    stories = [
-                        zones[z]
-                        for z in list(zones)
-                        if ("presModelHolder" in zones[z])
-                    ]
-        return stories
-    return []
+def listWorksheetStoryPoint(presModel, hasWorksheet=True, TS=None, index=None):
+    zones = getZones(presModel)
+    if len(zones) == 0:
+        return []
+    storyPointIndex = getPresModelIndex(
+        zones if TS is None else TS.zones, index).getStoryPointIndex()
+    if storyPointIndex is None:
+        return []
+    if hasWorksheet:
+        return storyPointIndex.getWorksheetZones()
+    zones = storyPointIndex.zones
+    return [
+        zones[z]
+        for z in list(zones)
+        if ("presModelHolder" in zones[z])
+    ]
 
 
-def getWorksheetCmdResponse(selectedZone, dataFull):
-    details = selectedZone["presModelHolder"]["visual"]["vizData"]
+def hasWorksheetCmdResponseData(selectedZone):
+    return "paneColumnsData" in selectedZone["presModelHolder"]["visual"]["vizData"]
 
-    if "paneColumnsData" not in details:
+
+@profiling.profiled("utils.getWorksheetCmdResponse")
+def getWorksheetCmdResponse(selectedZone, dataFull, asArray=False, dataTypes=None):
+    if not hasWorksheetCmdResponseData(selectedZone):
         return None
-    columnsData = details["paneColumnsData"]
+    columnsData = selectedZone["presModelHolder"]["visual"]["vizData"]["paneColumnsData"]
 
     result = [
         {
@@ -475,11 +480,12 @@ def getWorksheetCmdResponse(selectedZone, dataFull):
         for t in columnsData["vizDataColumns"]
         if t.get("fieldCaption")
     ]
-    return getData(dataFull, result)
+    return getData(dataFull, result, asArray=asArray, dataTypes=dataTypes)
 
 
-def getWorksheetDownloadCmdResponse(dataFull, underlyingDataTableColumns):
-    result = [
+@profiling.profiled("utils.getWorksheetDownloadCmdResponse")
+def getWorksheetDownloadIndicesInfo(underlyingDataTableColumns):
+    return [
         {
             "fieldCaption": t["fieldCaption"],
             "valueIndices": t["valueIndices"],
@@ -490,7 +496,11 @@ def getWorksheetDownloadCmdResponse(dataFull, underlyingDataTableColumns):
         for t in underlyingDataTableColumns
         if t.get("fieldCaption")
     ]
-    return getData(dataFull, result)
+
+
+def getWorksheetDownloadCmdResponse(dataFull, underlyingDataTableColumns, asArray=False, dataTypes=None, arrays=None):
+    return getData(dataFull, getWorksheetDownloadIndicesInfo(underlyingDataTableColumns),
+                   asArray=asArray, dataTypes=dataTypes, arrays=arrays)
 
 
 def selectWorksheetCmdResponse(presModel, logger):
@@ -509,6 +519,7 @@ def selectWorksheetCmdResponse(presModel, logger):
     return zonesWithWorksheet
 
 
+@profiling.profiled("utils.getParameterControlInput")
 def getParameterControlInput(info):
     presModel = getPresModelVizInfo(info)
     storyPointZones = listWorksheetStoryPoint(presModel, hasWorksheet=False)
@@ -535,6 +546,7 @@ def getParameterControlInput(info):
     ]
 
 
+@profiling.profiled("utils.getParameterControlVqlResponse")
 def getParameterControlVqlResponse(presModel):
     zones = presModel["workbookPresModel"]["dashboardPresModel"]["zones"]
     zoneStoryPoint = listWorksheetStoryPoint(presModel, hasWorksheet=False)
@@ -560,69 +572,22 @@ def getParameterControlVqlResponse(presModel):
     ]
 
 
-def getSelectedFilters(presModel, worksheetName):
-    zones = presModel["workbookPresModel"]["dashboardPresModel"]["zones"]
-    selectedFilters = [
-        {
-            "fn": zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]["fn"],
-            "columnFullNames": zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]["columnFullNames"],
-            "domainTables":zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]["domainTables"],
-        }
-        for z in list(zones)
-        if zones[z] is not None
-        and ("worksheet" in zones[z])
-        and ("presModelHolder" in zones[z])
-        and ("quickFilterDisplay" in zones[z]["presModelHolder"])
-        and ("quickFilter" in zones[z]["presModelHolder"]["quickFilterDisplay"])
-        and ("categoricalFilter" in zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"])
-        and zones[z]["worksheet"] == worksheetName
-    ]
-    if len(selectedFilters) == 0:
-        storypoints = [
-            zones[z]["presModelHolder"]["flipboard"]["storyPoints"]
-            for z in list(zones)
-            if zones[z] is not None
-            and ("presModelHolder" in zones[z])
-            and ("flipboard" in zones[z]["presModelHolder"])
-            and ("storyPoints" in zones[z]["presModelHolder"]["flipboard"])
-        ]
-        if len(storypoints) > 0:
-            storypoint = storypoints[0]
-            keys = list(storypoint.keys())
-            selectedFilters = []
-            for key in keys:
-                zones = storypoint[key]["dashboardPresModel"]["zones"]
-                selectedFilters.extend([
-                    {
-                        "fn": zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]["fn"],
-                        "columnFullNames": zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]["columnFullNames"],
-                        "domainTables":zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"]["categoricalFilter"]["domainTables"],
-                    }
-                    for z in list(zones)
-                    if zones[z] is not None
-                    and ("worksheet" in zones[z])
-                    and ("presModelHolder" in zones[z])
-                    and ("quickFilterDisplay" in zones[z]["presModelHolder"])
-                    and ("quickFilter" in zones[z]["presModelHolder"]["quickFilterDisplay"])
-                    and ("categoricalFilter" in zones[z]["presModelHolder"]["quickFilterDisplay"]["quickFilter"])
-                    and zones[z]["worksheet"] == worksheetName
-                ])
-            return selectedFilters
+def getSelectedFilters(presModel, worksheetName, index=None):
+    index = getPresModelIndex(
+        presModel["workbookPresModel"]["dashboardPresModel"]["zones"], index)
+    selectedFilters = index.getSelectedFilters(worksheetName)
+    if (len(selectedFilters) == 0) and (index.storyPoints is not None):
+        for key in index.getStoryPointKeys():
+            selectedFilters.extend(index.getStoryPointIndex(
+                key).getSelectedFilters(worksheetName))
     return selectedFilters
 
 
-def listFilters(logger, presModel, worksheetName, selectedFilters, rootDashboard):
-    zones = presModel["workbookPresModel"]["dashboardPresModel"]["zones"]
-    filters = [
-        json.loads(zones[z]["presModelHolder"]["visual"]["filtersJson"])
-        for z in list(zones)
-        if zones[z] is not None
-        and ("worksheet" in zones[z])
-        and ("presModelHolder" in zones[z])
-        and ("visual" in zones[z]["presModelHolder"])
-        and ("filtersJson" in zones[z]["presModelHolder"]["visual"])
-        and zones[z]["worksheet"] == worksheetName
-    ]
+@profiling.profiled("utils.listFilters")
+def listFilters(logger, presModel, worksheetName, selectedFilters, rootDashboard, index=None):
+    index = getPresModelIndex(
+        presModel["workbookPresModel"]["dashboardPresModel"]["zones"], index)
+    filters = index.getFilters(worksheetName)
     if len(filters) != 0:
         entries = []
         for arr in filters:
@@ -650,17 +615,9 @@ def listFilters(logger, presModel, worksheetName, selectedFilters, rootDashboard
                     })
         return entries
     else:
-        storypoints = [
-            zones[z]["presModelHolder"]["flipboard"]["storyPoints"]
-            for z in list(zones)
-            if zones[z] is not None
-            and ("presModelHolder" in zones[z])
-            and ("flipboard" in zones[z]["presModelHolder"])
-            and ("storyPoints" in zones[z]["presModelHolder"]["flipboard"])
-        ]
-        if len(storypoints) > 0:
-            storypoint = storypoints[0]
-            keys = list(storypoint.keys())
+        if index.storyPoints is not None:
+            storypoint = index.storyPoints
+            keys = index.getStoryPointKeys()
             filtersList = []
             for key in keys:
                 storyboardId = storypoint[key]["storyPointId"]
@@ -680,18 +637,7 @@ def listFilters(logger, presModel, worksheetName, selectedFilters, rootDashboard
                     logger.warning(
                         "sheetPath and visualIds not found in dashboardPresModel")
                     return []
-                zones = storypoint[key]["dashboardPresModel"]["zones"]
-                filters = [
-                    json.loads(zones[z]["presModelHolder"]
-                               ["visual"]["filtersJson"])
-                    for z in list(zones)
-                    if zones[z] is not None
-                    and ("worksheet" in zones[z])
-                    and ("presModelHolder" in zones[z])
-                    and ("visual" in zones[z]["presModelHolder"])
-                    and ("filtersJson" in zones[z]["presModelHolder"]["visual"])
-                    and zones[z]["worksheet"] == worksheetName
-                ]
+                filters = index.getStoryPointIndex(key).getFilters(worksheetName)
                 if len(filters) != 0:
                     entries = []
                     for arr in filters:
@@ -733,20 +679,23 @@ def getTooltipText(tooltipServerCmdResponse):
         return ""
 
 
-def getFiltersForAllWorksheet(logger, data, info, rootDashboard, cmdResponse=False):
+@profiling.profiled("utils.getFiltersForAllWorksheet")
+def getFiltersForAllWorksheet(logger, data, info, rootDashboard, cmdResponse=False, index=None):
     filterResult = {}
     if cmdResponse:
         presModel = data["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
-        worksheets = listWorksheetCmdResponse(presModel)
+        index = getPresModelIndex(getZones(presModel), index)
+        worksheets = listWorksheetCmdResponse(presModel, index)
         if len(worksheets) == 0:
-            worksheets = listStoryPointsCmdResponse(presModel)
+            worksheets = listStoryPointsCmdResponse(presModel, index=index)
         for worksheet in worksheets:
             selectedFilters = getSelectedFilters(
                 presModel,
-                worksheet["worksheet"]
+                worksheet["worksheet"],
+                index
             )
             filters = listFilters(logger, presModel,
-                                  worksheet["worksheet"], selectedFilters, rootDashboard)
+                                  worksheet["worksheet"], selectedFilters, rootDashboard, index)
             filterResult[worksheet["worksheet"]] = filters
     else:
         presModelMapVizData = getPresModelVizData(data)
@@ -759,11 +708,15 @@ def getFiltersForAllWorksheet(logger, data, info, rootDashboard, cmdResponse=Fal
                 worksheets = listStoryPointsInfo(presModelMapVizInfo)
         else:
             worksheets = []
+        index = None
+        if len(worksheets) > 0:
+            index = getPresModelIndex(
+                presModelMapVizInfo["workbookPresModel"]["dashboardPresModel"]["zones"])
         for worksheet in worksheets:
             selectedFilters = getSelectedFilters(
-                presModelMapVizInfo, worksheet)
+                presModelMapVizInfo, worksheet, index)
             filters = listFilters(logger, presModelMapVizInfo,
-                                  worksheet, selectedFilters, rootDashboard)
+                                  worksheet, selectedFilters, rootDashboard, index)
             filterResult[worksheet] = filters
     return filterResult
 
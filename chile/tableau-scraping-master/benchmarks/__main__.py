@@ -0,0 +1,4 @@
+import sys
+from benchmarks.bench_decode import main
+
+sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from unittest import mock
+from tableauscraper import TableauScraper as TS
+from tableauscraper import api
+from tableauscraper import dashboard
+from tableauscraper import utils
+from tableauscraper.dataDictionary import DataDictionary
+from benchmarks import fixtures
+
+# the embed page only carries the tsConfigContainer, the bootstrap response is synthesized
+VIZ_HTML = '<textarea id="tsConfigContainer">{"vizql_root": "/vizql", "sessionid": "XXX", "sheetId": "sheet"}</textarea>'
+
+
+def measure(func, setup, repeat):
+    # best of repeat wall times, then the allocation high-water mark of one more run
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    args = setup()
+    gc.collect()
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"time": min(times), "peak": peak}
+
+
+def getScraper(text):
+    ts = TS(logLevel=logging.WARNING, delayMs=0)
+    with mock.patch.object(api, "getTableauViz", return_value=VIZ_HTML), \
+            mock.patch.object(api, "getTableauData", return_value=text):
+        ts.loads("https://example.com/views/benchmark/dashboard")
+    return ts
+
+
+def loadAll(workbook):
+    for worksheet in workbook.worksheets:
+        worksheet.data
+    return workbook
+
+
+def getBenchmarks(tuples, worksheets, zones):
+    info, data = fixtures.getBootstrap(tuples, worksheets, zones)
+    text = fixtures.getBootstrapText(info, data)
+    cmdResponse = fixtures.getCmdResponse(tuples, worksheets, zones)
+    ts = getScraper(text)
+    # a snapshot releases the segment values into the data dictionary pools
+    state = getScraper(text).snapshot()
+    presModelMap = utils.getPresModelVizData(ts.data)
+    dataFull = utils.getDataFull(presModelMap, ts.dataSegments)
+    indicesInfo = utils.getIndicesInfo(presModelMap, "[WORKSHEET0]")
+
+    def restored():
+        # data dictionary pools restored from the snapshot, no worksheet decoded yet
+        return (TS(logLevel=logging.WARNING, delayMs=0).restore(state),)
+
+    return [
+        ("getBootstrapDocuments", lambda: utils.getBootstrapDocuments(text), lambda: ()),
+        ("loads", getScraper, lambda: (text,)),
+        ("getDataFull", lambda: utils.getDataFull(
+            presModelMap, ts.dataSegments, dataDictionary=DataDictionary()), lambda: ()),
+        ("getData", lambda: utils.getData(dataFull, indicesInfo), lambda: ()),
+        ("getWorksheets", lambda scraper: loadAll(dashboard.getWorksheets(
+            scraper, scraper.data, scraper.info)), restored),
+        ("updateFullData", lambda scraper: scraper.getWorkbook().updateFullData(
+            cmdResponse), restored),
+        ("getWorksheetsCmdResponse", lambda scraper: loadAll(dashboard.getWorksheetsCmdResponse(
+            scraper, cmdResponse)), lambda: (prepareCmdResponse(restored()[0], cmdResponse),)),
+        ("getFiltersForAllWorksheet", lambda scraper: utils.getFiltersForAllWorksheet(
+            scraper.logger, scraper.data, scraper.info, rootDashboard=scraper.dashboard), restored),
+        ("getFiltersForAllWorksheetCmdResponse", lambda scraper: utils.getFiltersForAllWorksheet(
+            scraper.logger, cmdResponse, None, rootDashboard=scraper.dashboard, cmdResponse=True), restored),
+    ]
+
+
+def prepareCmdResponse(scraper, cmdResponse):
+    scraper.getWorkbook().updateFullData(cmdResponse)
+    return scraper
+
+
+def run(sizes, worksheets, zones, repeat, names=None):
+    results = []
+    for tuples in sizes:
+        for name, func, setup in getBenchmarks(tuples, worksheets, zones):
+            if (names is not None) and (name not in names):
+                continue
+            result = measure(func, setup, repeat)
+            result.update({"name": name, "tuples": tuples})
+            results.append(result)
+            print(f'{name:<40} {tuples:>9} tuples {result["time"] * 1000:>10.1f} ms {result["peak"] / 1024 / 1024:>9.1f} MB', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    # a benchmark regresses when its time or peak memory grows by more than threshold
+    reference = dict([((t["name"], t["tuples"]), t) for t in baseline])
+    regressions = []
+    for result in results:
+        key = (result["name"], result["tuples"])
+        if key not in reference:
+            continue
+        for metric in ["time", "peak"]:
+            if (reference[key][metric] > 0) and (result[metric] / reference[key][metric] > threshold):
+                regressions.append(
+                    f'{result["name"]} ({result["tuples"]} tuples): {metric} {reference[key][metric]:.4g} -> {result[metric]:.4g}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="time and memory of the tableauscraper decoding path on synthetic workbooks")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma separated numbers of tuples per workbook, e.g. 10000,100000,1000000")
+    parser.add_argument("--worksheets", type=int, default=10,
+                        help="worksheets sharing the tuples")
+    parser.add_argument("--zones", type=int, default=200,
+                        help="extra zones (parameter controls, navigation) per dashboard")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="json results to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="maximum ratio to the baseline before failing")
+    args = parser.parse_args(argv)
+
+    results = run(
+        [int(t) for t in args.sizes.split(",")],
+        args.worksheets,
+        args.zones,
+        args.repeat,
+        names=args.only.split(",") if args.only else None
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
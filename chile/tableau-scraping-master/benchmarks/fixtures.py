@@ -0,0 +1,174 @@
+import json
+import random
+
+# scaled up versions of the tableauDataResponse / vqlCmdResponse fixtures of tests/python/test_common.py
+
+
+def getSegment(rows, distinct, seed=0):
+    rnd = random.Random(seed)
+    return {
+        "dataColumns": [
+            {"dataType": "cstring", "dataValues": [f"value {i}" for i in range(distinct)]},
+            {"dataType": "real", "dataValues": [rnd.random() * 1000 for _ in range(rows)]},
+            {"dataType": "integer", "dataValues": [rnd.randint(0, 100000) for _ in range(rows)]},
+        ]
+    }
+
+
+def getVizData(rows, distinct, offset, seed=0):
+    # one cstring column with aliases, one real and one integer column
+    rnd = random.Random(seed)
+    return {
+        "paneColumnsData": {
+            "paneColumnsList": [{
+                "vizPaneColumns": [
+                    {"tupleIds": list(range(1, rows + 1)), "valueIndices": [rnd.randrange(distinct) for _ in range(rows)], "aliasIndices": []},
+                    {"tupleIds": [], "valueIndices": [], "aliasIndices": [-(rnd.randrange(distinct) + 1) for _ in range(rows)]},
+                    {"tupleIds": [], "valueIndices": list(range(offset, offset + rows)), "aliasIndices": []},
+                    {"tupleIds": [], "valueIndices": list(range(offset, offset + rows)), "aliasIndices": []},
+                ]
+            }],
+            "vizDataColumns": [
+                {"fieldCaption": "[DIMENSION]", "dataType": "cstring", "paneIndices": [0], "columnIndices": [0], "isAutoSelect": True},
+                {"fieldCaption": "[ALIAS]", "dataType": "cstring", "paneIndices": [0], "columnIndices": [1]},
+                {"fieldCaption": "[MEASURE]", "dataType": "real", "paneIndices": [0], "columnIndices": [2]},
+                {"fieldCaption": "[COUNT]", "dataType": "integer", "paneIndices": [0], "columnIndices": [3]},
+            ]
+        }
+    }
+
+
+def getFiltersJson(worksheetIndex, filterValues):
+    return json.dumps([{
+        "table": {
+            "schema": [{"caption": f"FILTER_{worksheetIndex}", "ordinal": 0, "name": ["FILTER", f"FILTER_{worksheetIndex}"]}],
+            "tuples": [{"t": [{"v": f"FILTER_VALUE_{i}"}], "s": i == 0} for i in range(filterValues)]
+        }
+    }])
+
+
+def getWorksheetNames(worksheets):
+    return [f"[WORKSHEET{i}]" for i in range(worksheets)]
+
+
+def getExtraZones(zones, start):
+    # parameter controls and text zones, they are scanned but hold no data
+    result = {}
+    for i in range(zones):
+        if i % 2 == 0:
+            result[str(start + i)] = {"presModelHolder": {"parameterControl": {
+                "fieldCaption": f"[INPUT_NAME{i}]",
+                "parameterName": f"[Parameters].[Parameter {i}]",
+                "formattedValues": [f"select{j}" for j in range(10)]
+            }}}
+        else:
+            result[str(start + i)] = {"presModelHolder": {"flipboardNav": {}}}
+    return result
+
+
+def getBootstrap(tuples, worksheets=10, zones=200, distinct=1000, filterValues=100):
+    # returns the info and data documents of a bootstrap response holding tuples rows in total
+    rows = max(1, tuples // worksheets)
+    names = getWorksheetNames(worksheets)
+    infoZones = dict([
+        (str(i), {"worksheet": name, "presModelHolder": {"visual": {"filtersJson": getFiltersJson(i, filterValues)}}})
+        for i, name in enumerate(names)
+    ])
+    infoZones.update(getExtraZones(zones, len(names)))
+    info = {
+        "sheetName": "[SHEET_NAME]",
+        "worldUpdate": {"applicationPresModel": {"workbookPresModel": {
+            "dashboardPresModel": {
+                "zones": infoZones,
+                "viewIds": dict([(name, str(i)) for i, name in enumerate(names)])
+            },
+            "sheetsInfo": [
+                {"sheet": name, "isDashboard": False, "isVisible": True, "namesOfSubsheets": [], "windowId": f"{{{i}}}"}
+                for i, name in enumerate(names)
+            ]
+        }}}
+    }
+    data = {
+        "secondaryInfo": {"presModelMap": {
+            "vizData": {"presModelHolder": {"genPresModelMapPresModel": {"presModelMap": dict([
+                (name, {"presModelHolder": {"genVizDataPresModel": getVizData(rows, distinct, i * rows, seed=i)}})
+                for i, name in enumerate(names)
+            ])}}},
+            "dataDictionary": {"presModelHolder": {"genDataDictionaryPresModel": {"dataSegments": {
+                "0": getSegment(rows * worksheets, distinct)
+            }}}}
+        }}
+    }
+    return info, data
+
+
+def getBootstrapText(info, data):
+    # same framing as the bootstrapSession response
+    infoJson = json.dumps(info)
+    dataJson = json.dumps(data)
+    return f"{len(infoJson)};{infoJson}{len(dataJson)};{dataJson}"
+
+
+def getCmdResponse(tuples, worksheets=10, zones=200, distinct=1000, filterValues=100):
+    # a command response updating every worksheet, with a new data segment
+    rows = max(1, tuples // worksheets)
+    names = getWorksheetNames(worksheets)
+    cmdZones = dict([
+        (str(i), {"worksheet": name, "presModelHolder": {"visual": {
+            "vizData": getVizData(rows, distinct, rows * worksheets + i * rows, seed=100 + i),
+            "filtersJson": getFiltersJson(i, filterValues)
+        }}})
+        for i, name in enumerate(names)
+    ])
+    cmdZones.update(getExtraZones(zones, len(names)))
+    return {"vqlCmdResponse": {"layoutStatus": {"applicationPresModel": {
+        "workbookPresModel": {"dashboardPresModel": {"zones": cmdZones}},
+        "dataDictionary": {"dataSegments": {"1": getSegment(rows * worksheets, distinct, seed=1)}}
+    }}}}
+
+
+def getUnderlyingData(rows, distinct=1000, seed=0):
+    rnd = random.Random(seed)
+    segment = getSegment(rows, distinct, seed)
+    return {"vqlCmdResponse": {"layoutStatus": {}, "cmdResultList": [{
+        "commandName": "tabdoc:get-underlying-data",
+        "commandReturn": {"underlyingDataTable": {
+            "tableAlias": "",
+            "tableName": "",
+            "numRows": rows,
+            "dataDictionary": {"dataSegments": {"0": segment}},
+            "underlyingDataTableColumns": [
+                {"dataType": "cstring", "fieldCaption": "DIMENSION", "fn": "[federated].[DIMENSION]",
+                 "valueIndices": [rnd.randrange(distinct) for _ in range(rows)], "aliasIndices": []},
+                {"dataType": "real", "fieldCaption": "MEASURE", "fn": "[federated].[MEASURE]",
+                 "valueIndices": list(range(rows)), "aliasIndices": []},
+                {"dataType": "integer", "fieldCaption": "COUNT", "fn": "[federated].[COUNT]",
+                 "valueIndices": list(range(rows)), "aliasIndices": []},
+            ]
+        }}
+    }]}}
+
+
+def getCrossTabDialog(worksheets=10):
+    return {"vqlCmdResponse": {"layoutStatus": {"applicationPresModel": {"presentationLayerNotification": [{
+        "presModelHolder": {"genExportCrosstabOptionsDialogPresModel": {"thumbnailSheetPickerItems": [
+            {"thumbnailUri": "", "sheetName": name, "sheetdocId": f"{{{i}}}"}
+            for i, name in enumerate(getWorksheetNames(worksheets))
+        ]}}
+    }]}}}}
+
+
+def getCrossTabExport(resultKey):
+    return {"vqlCmdResponse": {"layoutStatus": {"applicationPresModel": {"presentationLayerNotification": [{
+        "presModelHolder": {"genExportFilePresModel": {"resultKey": resultKey}}
+    }]}}}}
+
+
+def getCrossTab(rows, distinct=1000, seed=0):
+    # tab separated, the server sends it as utf-16
+    rnd = random.Random(seed)
+    lines = ["DIMENSION\tMEASURE\tCOUNT"] + [
+        f"value {rnd.randrange(distinct)}\t{rnd.random() * 1000}\t{rnd.randint(0, 100000)}"
+        for _ in range(rows)
+    ]
+    return "\n".join(lines)
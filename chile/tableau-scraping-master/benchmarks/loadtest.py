@@ -0,0 +1,200 @@
+import argparse
+import logging
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from tableauscraper import TableauScraper as TS
+from tableauscraper.TableauScraper import TableauException
+from tableauscraper import api
+from tableauscraper import ratelimit
+from tableauscraper import transport
+from benchmarks.mockServer import MockTableauServer
+
+SCENARIO_STEPS = ("select", "filter", "underlying", "crosstab")
+
+
+class TimingAdapter(transport.TableauHTTPAdapter):
+    # records the latency of every request sent through the pooled adapter
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+        self.samples = []  # (route, seconds, status code)
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            r = super().send(request, **kwargs)
+        except requests.RequestException:
+            self.record(getRoute(request.path_url), time.perf_counter() - start, 0)
+            raise
+        self.record(getRoute(request.path_url),
+                    time.perf_counter() - start, r.status_code)
+        return r
+
+    def record(self, route, duration, status):
+        with self.lock:
+            self.samples.append((route, duration, status))
+
+
+def createTimingAdapter(poolSize, timeout=(10, 120)):
+    # urllib3 retries run inside send, with their backoff sleeps: without them each sample is one request
+    return TimingAdapter(
+        timeout=timeout,
+        pool_connections=poolSize,
+        pool_maxsize=poolSize,
+        max_retries=0,
+        pool_block=False
+    )
+
+
+def getRoute(pathUrl):
+    path = pathUrl.split("?")[0]
+    if "/commands/" in path:
+        return path.split("/")[-1]
+    for route in ["bootstrapSession", "tempfile", "views"]:
+        if f"/{route}/" in path:
+            return route
+    return path
+
+
+def getPercentile(values, percentile):
+    # nearest rank
+    if len(values) == 0:
+        return 0
+    values = sorted(values)
+    return values[max(0, math.ceil(percentile / 100 * len(values)) - 1)]
+
+
+def getSummary(samples, elapsed):
+    durations = [t[1] for t in samples]
+    return {
+        "requests": len(samples),
+        "errors": len([t for t in samples if (t[2] == 0) or (t[2] >= 400)]),
+        "requestsPerSecond": len(samples) / elapsed if elapsed > 0 else 0,
+        "p50": getPercentile(durations, 50),
+        "p99": getPercentile(durations, 99),
+    }
+
+
+def runUser(url, scraperOptions, steps, iterations, userIndex):
+    ts = TS(**scraperOptions)
+    try:
+        ts.loads(url)
+        ws = ts.getWorksheet("[WORKSHEET0]")
+        values = ws.getSelectableValues("[DIMENSION]")
+    except (TableauException, requests.RequestException, ValueError, KeyError) as e:
+        ts.logger.debug(f"user {userIndex} bootstrap failed: {e}")
+        return iterations
+    failures = 0
+    for i in range(iterations):
+        try:
+            for step in steps:
+                if step == "select":
+                    ws.select("[DIMENSION]", values[(userIndex + i) % len(values)])
+                elif step == "filter":
+                    ts.getWorksheet("[WORKSHEET0]").setFilter(
+                        "FILTER_0", f"FILTER_VALUE_{(userIndex + i) % 10}")
+                elif step == "underlying":
+                    ws.getDownloadableUnderlyingData(numRows=0)
+                elif step == "crosstab":
+                    ts.getWorkbook().getCrossTabData("[WORKSHEET0]")
+        except (api.APIResponseException, requests.RequestException, ValueError, KeyError) as e:
+            ts.logger.debug(f"user {userIndex} iteration {i} failed: {e}")
+            failures += 1
+    return failures
+
+
+def run(users=4, iterations=10, steps=SCENARIO_STEPS, delayMs=0, rate=None, burst=1, serverOptions={}):
+    server = MockTableauServer(**serverOptions).start()
+    adapter = createTimingAdapter(poolSize=users)
+    scraperOptions = {
+        "logLevel": logging.WARNING,
+        "delayMs": delayMs,
+        "adapter": adapter,
+        "rateLimiter": ratelimit.RateLimiter(rate=rate, burst=burst) if rate else None,
+    }
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            failures = sum(executor.map(
+                lambda userIndex: runUser(server.getVizUrl(), scraperOptions, steps, iterations, userIndex),
+                range(users)
+            ))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    routes = sorted(set([t[0] for t in adapter.samples]))
+    return {
+        "elapsed": elapsed,
+        "failedIterations": failures,
+        "total": getSummary(adapter.samples, elapsed),
+        "routes": dict([
+            (route, getSummary([t for t in adapter.samples if t[0] == route], elapsed))
+            for route in routes
+        ]),
+        "serverRequests": dict(server.requestCounts),
+    }
+
+
+def printReport(report):
+    print(f'{"route":<32} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9}')
+    rows = list(report["routes"].items()) + [("total", report["total"])]
+    for route, summary in rows:
+        print(f'{route:<32} {summary["requests"]:>9} {summary["errors"]:>7} {summary["requestsPerSecond"]:>9.1f} {summary["p50"] * 1000:>9.1f} {summary["p99"] * 1000:>9.1f}')
+    print(f'elapsed {report["elapsed"]:.2f}s, failed iterations {report["failedIterations"]}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="drive TableauScraper against a local mock vizql server")
+    parser.add_argument("--users", type=int, default=4,
+                        help="concurrent scrapers, each with its own viz session")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--steps", default=",".join(SCENARIO_STEPS),
+                        help=f'comma separated steps of an iteration among {",".join(SCENARIO_STEPS)}')
+    parser.add_argument("--delay-ms", type=int, default=0,
+                        help="delayMs of each scraper")
+    parser.add_argument("--rate", type=float,
+                        help="requests per second of a shared RateLimiter")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of requests answered with 429")
+    parser.add_argument("--tuples", type=int, default=10000,
+                        help="tuples of the bootstrap and command responses")
+    parser.add_argument("--worksheets", type=int, default=10)
+    parser.add_argument("--zones", type=int, default=200)
+    parser.add_argument("--underlying-rows", type=int, default=10000)
+    parser.add_argument("--crosstab-rows", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    report = run(
+        users=args.users,
+        iterations=args.iterations,
+        steps=args.steps.split(","),
+        delayMs=args.delay_ms,
+        rate=args.rate,
+        burst=args.burst,
+        serverOptions={
+            "tuples": args.tuples,
+            "worksheets": args.worksheets,
+            "zones": args.zones,
+            "underlyingRows": args.underlying_rows,
+            "crossTabRows": args.crosstab_rows,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "errorRate": args.error_rate,
+        }
+    )
+    printReport(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from benchmarks import fixtures
+
+# stand-in vizql server replaying the fixture shapes, for load tests that must not hit a real Tableau host
+
+VIZQL_ROOT = "/vizql/w/benchmark/v/dashboard"
+SESSION_COMMAND = re.compile(r"/sessions/([^/]+)/commands/(tabdoc|tabsrv)/([a-z\-]+)$")
+STATE_COMMANDS = (
+    "select",
+    "categorical-filter-by-index",
+    "dashboard-categorical-filter",
+    "set-parameter-value",
+    "goto-sheet",
+    "set-active-story-point",
+    "level-drill-up-down",
+)
+
+
+class MockTableauServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    latency: float = 0  # seconds added to every response
+    jitter: float = 0  # uniform random extra latency, in seconds
+    errorRate: float = 0  # share of requests answered with 429
+    retryAfter: int = 1
+
+    def __init__(self, host="127.0.0.1", port=0, tuples=10000, worksheets=10, zones=200, underlyingRows=10000, crossTabRows=10000, latency=0, jitter=0, errorRate=0, retryAfter=1):
+        super().__init__((host, port), MockTableauHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.retryAfter = retryAfter
+        self.lock = threading.Lock()
+        self.requestCounts = {}
+        # payloads are serialized once, the server cost stays out of the measures
+        info, data = fixtures.getBootstrap(tuples, worksheets, zones)
+        self.bootstrap = fixtures.getBootstrapText(info, data).encode("utf-8")
+        self.cmdResponse = json.dumps(fixtures.getCmdResponse(
+            tuples, worksheets, zones)).encode("utf-8")
+        self.underlyingData = json.dumps(
+            fixtures.getUnderlyingData(underlyingRows)).encode("utf-8")
+        self.crossTabDialog = json.dumps(
+            fixtures.getCrossTabDialog(worksheets)).encode("utf-8")
+        self.crossTabExport = json.dumps(
+            fixtures.getCrossTabExport("benchmark")).encode("utf-8")
+        self.crossTab = fixtures.getCrossTab(crossTabRows).encode("utf-16")
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def getVizUrl(self, name="dashboard"):
+        return f"{self.url}/views/benchmark/{name}"
+
+    def countRequest(self, route):
+        with self.lock:
+            self.requestCounts[route] = self.requestCounts.get(route, 0) + 1
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MockTableauHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, the scraper reuses pooled connections
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.startswith("/views/"):
+            tsConfig = json.dumps({
+                "vizql_root": VIZQL_ROOT,
+                "sessionid": uuid.uuid4().hex,
+                "sheetId": path.split("/")[-1]
+            })
+            self.respond("viz", f'<textarea id="tsConfigContainer">{tsConfig}</textarea>'.encode("utf-8"), "text/html")
+        elif "/tempfile/sessions/" in path:
+            self.respond("tempfile", self.server.crossTab,
+                         "text/csv; charset=utf-16")
+        else:
+            self.respond("unknown", b"", status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > 0:
+            self.rfile.read(length)
+        path = self.path.split("?")[0]
+        command = SESSION_COMMAND.search(path)
+        if "/bootstrapSession/sessions/" in path:
+            self.respond("bootstrapSession", self.server.bootstrap,
+                         "text/plain; charset=utf-8")
+        elif command is None:
+            self.respond("unknown", b"", status=404)
+        elif command.group(3) in STATE_COMMANDS:
+            self.respond(command.group(3), self.server.cmdResponse)
+        elif command.group(3) in ("get-underlying-data", "get-summary-data"):
+            self.respond(command.group(3), self.server.underlyingData)
+        elif command.group(3) == "export-crosstab-server-dialog":
+            self.respond(command.group(3), self.server.crossTabDialog)
+        elif command.group(3) == "export-crosstab-to-csvserver":
+            self.respond(command.group(3), self.server.crossTabExport)
+        else:
+            self.respond(command.group(3), b"", status=404)
+
+    def respond(self, route, body, contentType="application/json", status=200):
+        self.server.countRequest(route)
+        delay = self.server.latency + random.uniform(0, self.server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if (self.server.errorRate > 0) and (random.random() < self.server.errorRate):
+            status, body, contentType = 429, b"rate limited", "text/plain"
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", str(self.server.retryAfter))
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
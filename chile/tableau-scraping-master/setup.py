@@ -28,5 +28,6 @@ setuptools.setup(
         "Topic :: Software Development",
     ],
     python_requires=">=3.6",
-    install_requires=["beautifulsoup4>=4.0.0", "pandas", "requests>=2.14.0"],
+    install_requires=["beautifulsoup4>=4.0.0", "numpy", "pandas", "requests>=2.14.0"],
+    extras_require={"fast": ["orjson"]},
 )
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+from pytest_mock import MockerFixture
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+from tests.python.test_common import data as data
+from tests.python.test_common import info as info
+from tests.python.test_common import tableauDownloadableUnderlyingData as tableauDownloadableUnderlyingData
+from tableauscraper import AsyncTableauScraper as ATS
+from tableauscraper.TableauScraper import TableauScraper
+from tableauscraper import api
+from tableauscraper import ratelimit
+from tableauscraper.TableauWorkbook import TableauWorkbook
+from tableauscraper.TableauWorksheet import TableauWorksheet
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def mockBootstrap(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+
+
+def test_AsyncTableauScraper_loads(mocker: MockerFixture) -> None:
+    mockBootstrap(mocker)
+
+    async def scenario():
+        ts = ATS()
+        await ts.loads(fakeUri)
+        wb = await ts.getWorkbook()
+        ws = await ts.getWorksheet("[WORKSHEET1]")
+        return ts, wb, ws
+
+    ts, wb, ws = run(scenario())
+    assert ts.data == data
+    assert ts.info == info
+    assert type(wb) is TableauWorkbook
+    assert len(wb.worksheets) == 2
+    assert type(ws) is TableauWorksheet
+    assert ws.name == "[WORKSHEET1]"
+    assert ws.data.shape[0] == 4
+
+
+def test_AsyncTableauScraper_commands(mocker: MockerFixture) -> None:
+    mockBootstrap(mocker)
+    mocker.patch("tableauscraper.api.filter", return_value=vqlCmdResponse)
+    mocker.patch("tableauscraper.api.select", return_value=vqlCmdResponse)
+    mocker.patch("tableauscraper.api.getDownloadableUnderlyingData",
+                 return_value=json.loads(tableauDownloadableUnderlyingData))
+
+    async def scenario():
+        ts = ATS(delayMs=0)
+        await ts.loads(fakeUri)
+        filtered = await ts.setFilter("[WORKSHEET1]", "FILTER_1", "FITLTER_VALUE_1")
+        selected = await ts.select("[WORKSHEET1]", "[FIELD1]", "2")
+        underlying = await ts.getDownloadableUnderlyingData("[WORKSHEET1]")
+        return ts, filtered, selected, underlying
+
+    ts, filtered, selected, underlying = run(scenario())
+    assert type(filtered) is TableauWorkbook
+    assert filtered.cmdResponse
+    assert filtered.getWorksheet("[WORKSHEET1]").data.shape[0] == 4
+    assert type(selected) is TableauWorkbook
+    assert len(selected.worksheets) == 1
+    # the last workbook is kept for name resolution, downloads don't replace it
+    assert ts.workbook is selected
+    assert underlying.shape[0] > 0
+
+
+def test_AsyncTableauScraper_batchCommands(mocker: MockerFixture) -> None:
+    mockBootstrap(mocker)
+    filter = mocker.patch("tableauscraper.api.filter",
+                          return_value=vqlCmdResponse)
+    select = mocker.patch("tableauscraper.api.select",
+                          return_value=vqlCmdResponse)
+
+    async def scenario():
+        ts = ATS(delayMs=0)
+        await ts.loads(fakeUri)
+        filtered = await ts.setFilters("[WORKSHEET1]", {"FILTER_1": ["FITLTER_VALUE_1"]})
+        selected = await ts.selectMany("[WORKSHEET1]", "[FIELD1]", ["2", "3"])
+        return ts, filtered, selected
+
+    ts, filtered, selected = run(scenario())
+    assert filtered.getWorksheet("[WORKSHEET1]").data.shape[0] == 4
+    assert filter.call_count == 1
+    assert select.call_args[0][2] == [1, 2]
+    assert ts.workbook is selected
+
+
+def test_AsyncTableauScraper_concurrentSessions(mocker: MockerFixture) -> None:
+    mockBootstrap(mocker)
+    mocker.patch("tableauscraper.api.select", return_value=vqlCmdResponse)
+
+    async def scenario():
+        scrapers = [ATS(delayMs=200) for _ in range(5)]
+        await asyncio.gather(*[ts.loads(fakeUri) for ts in scrapers])
+
+        async def twoSelects(ts):
+            await ts.select("[WORKSHEET1]", "[FIELD1]", "2")
+            return await ts.select("[WORKSHEET1]", "[FIELD1]", "3")
+        start = time.time()
+        results = await asyncio.gather(*[twoSelects(ts) for ts in scrapers])
+        return results, time.time() - start
+
+    results, elapsed = run(scenario())
+    assert all(type(t) is TableauWorkbook for t in results)
+    # sessions wait for their own delay concurrently instead of one after the other
+    assert elapsed < 0.9
+
+
+def test_AsyncTableauScraper_readsWaitForCommands(mocker: MockerFixture) -> None:
+    mockBootstrap(mocker)
+    events = []
+
+    def select(*args, **kwargs):
+        events.append("select")
+        time.sleep(0.2)
+        events.append("selected")
+        return vqlCmdResponse
+    mocker.patch("tableauscraper.api.select", side_effect=select)
+    getWorkbook = TableauScraper.getWorkbook
+    getWorksheet = TableauScraper.getWorksheet
+    mocker.patch.object(TableauScraper, "getWorkbook", autospec=True, side_effect=lambda ts: (
+        events.append("getWorkbook"), getWorkbook(ts))[1])
+    mocker.patch.object(TableauScraper, "getWorksheet", autospec=True, side_effect=lambda ts, name: (
+        events.append("getWorksheet"), getWorksheet(ts, name))[1])
+
+    async def scenario():
+        ts = ATS(delayMs=0)
+        await ts.loads(fakeUri)
+        ws = await ts.getWorksheet("[WORKSHEET1]")
+        events.clear()
+        selecting = asyncio.ensure_future(ts.select(ws, "[FIELD1]", "2"))
+        await asyncio.sleep(0.05)
+        await asyncio.gather(selecting, ts.getWorkbook(), ts.getWorksheet("[WORKSHEET1]"))
+
+    run(scenario())
+    # the segments and the data dictionary are read once the command persisted them
+    assert events[:2] == ["select", "selected"]
+    assert sorted(events[2:]) == ["getWorkbook", "getWorksheet"]
+
+
+def test_AsyncTableauScraper_throttle() -> None:
+    async def scenario():
+        ts = ATS(delayMs=300)
+        ts.lastActionTime = time.time()
+        start = time.time()
+        await ts.throttle()
+        return time.time() - start
+
+    elapsed = run(scenario())
+    assert 0.25 < elapsed < 0.45
+
+
+def test_AsyncTableauScraper_delayEachRequest(httpserver, mocker: MockerFixture) -> None:
+    mockBootstrap(mocker)
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+
+    def threeSelects(ts):
+        for i in range(3):
+            api.select(scraper=ts, worksheetName="", selection=[i])
+
+    async def scenario(**kwargs):
+        ts = ATS(**kwargs)
+        await ts.loads(fakeUri)
+        ts.host = httpserver.url + "/"
+        ts.lastActionTime = 0
+        start = time.time()
+        await ts.command(threeSelects, ts, keepWorkbook=False)
+        return time.time() - start
+
+    # the requests of one command are not sent in a burst
+    assert run(scenario(delayMs=200)) > 0.35
+    limiter = ratelimit.RateLimiter(rate=10, burst=1)
+    assert run(scenario(delayMs=0, rateLimiter=limiter)) > 0.15
+    assert len(httpserver.requests) == 6
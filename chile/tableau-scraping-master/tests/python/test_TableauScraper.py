@@ -1,3 +1,4 @@
+import copy
 import pytest
 from pytest_mock import MockerFixture
 from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
@@ -11,6 +12,7 @@ from tests.python.test_common import tableauSessionResponse as tableauSessionRes
 from tests.python.test_common import tableauPlaceHolderDataWithTicket as tableauPlaceHolderDataWithTicket
 from tests.python.test_common import tableauPlaceHolderDataEmpty as tableauPlaceHolderDataEmpty
 from tableauscraper import TableauScraper as TS
+from tableauscraper import utils
 from tableauscraper.TableauWorkbook import TableauWorkbook
 from tableauscraper.TableauWorksheet import TableauWorksheet
 
@@ -179,3 +181,25 @@ def test_TableauScraper_promptSelect(mocker: MockerFixture) -> None:
         "[FIELD1]-value",
         "[FIELD2]-alias",
     ]
+
+
+def test_TableauScraper_releaseKeepsBootstrapDocument(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    bootstrap = copy.deepcopy(ts.data)
+    presModelMap = utils.getPresModelVizData(ts.data)
+    assert ts.dataSegments is not presModelMap["dataDictionary"]["presModelHolder"][
+        "genDataDictionaryPresModel"]["dataSegments"]
+    ws = ts.getWorksheet("[WORKSHEET1]")
+    assert ws.data.shape[0] == 4
+    # only the scraper's copy of the segments is released
+    assert ts.data == bootstrap
+    assert ts.dataSegments != presModelMap["dataDictionary"]["presModelHolder"][
+        "genDataDictionaryPresModel"]["dataSegments"]
+    dataFull = utils.getDataFull(presModelMap, ts.dataSegments)
+    assert dataFull
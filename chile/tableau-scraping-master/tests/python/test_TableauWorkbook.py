@@ -23,6 +23,9 @@ from tests.python.test_common import tableauExportCrosstabServerDialog
 from tests.python.test_common import tableauExportCrosstabToCsvServerGenExportFile
 from tests.python.test_common import tableauExportCrosstabToCsvServerGenFileDownload
 import json
+import io
+import threading
+from tableauscraper import utils
 
 
 def test_TableauWorkbook(mocker: MockerFixture) -> None:
@@ -224,8 +227,8 @@ def test_getCsvData(mocker: MockerFixture) -> None:
     )
     mocker.patch("tableauscraper.api.getTableauData",
                  return_value=tableauDataResponse)
-    mocker.patch("tableauscraper.api.getCsvData",
-                 return_value=tableauDownloadableCsvData)
+    mocker.patch("tableauscraper.api.getCsvDataStream",
+                 return_value=io.BytesIO(tableauDownloadableCsvData.encode("utf-8")))
     ts = TS()
     ts.loads(fakeUri)
     wb = ts.getWorkbook()
@@ -235,14 +238,34 @@ def test_getCsvData(mocker: MockerFixture) -> None:
     assert data.shape[1] == 1
 
 
+def test_getCsvDataChunks(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    stream = io.BytesIO(tableauDownloadableCsvData.encode("utf-8"))
+    getCsvDataStream = mocker.patch("tableauscraper.api.getCsvDataStream",
+                                    return_value=stream)
+    ts = TS()
+    ts.loads(fakeUri)
+    wb = ts.getWorkbook()
+
+    chunks = list(wb.getCsvData("[WORKSHEET1]", chunkSize=2))
+    # parsed from the network stream without spooling it first
+    assert getCsvDataStream.call_args.kwargs["spool"] is False
+    assert [t.shape[0] for t in chunks] == [2, 1]
+    assert stream.closed
+
+
 def test_getCsvDataNoViewIds(mocker: MockerFixture) -> None:
     mocker.patch(
         "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
     )
     mocker.patch("tableauscraper.api.getTableauData",
                  return_value=tableauDataResponseNoViewIds)
-    mocker.patch("tableauscraper.api.getCsvData",
-                 return_value=tableauDownloadableCsvData)
+    mocker.patch("tableauscraper.api.getCsvDataStream",
+                 return_value=io.BytesIO(tableauDownloadableCsvData.encode("utf-8")))
     ts = TS()
     ts.loads(fakeUri)
     wb = ts.getWorkbook()
@@ -257,8 +280,8 @@ def test_getCsvDataViewIdsNoSheet(mocker: MockerFixture) -> None:
     )
     mocker.patch("tableauscraper.api.getTableauData",
                  return_value=tableauDataResponseViewIdsNoSheet)
-    mocker.patch("tableauscraper.api.getCsvData",
-                 return_value=tableauDownloadableCsvData)
+    mocker.patch("tableauscraper.api.getCsvDataStream",
+                 return_value=io.BytesIO(tableauDownloadableCsvData.encode("utf-8")))
     ts = TS()
     ts.loads(fakeUri)
     wb = ts.getWorkbook()
@@ -344,8 +367,8 @@ def test_getCrossTabData(mocker: MockerFixture) -> None:
                  return_value=json.loads(tableauExportCrosstabServerDialog))
     mocker.patch("tableauscraper.api.exportCrosstabToCsvServer",
                  return_value=json.loads(tableauExportCrosstabToCsvServerGenExportFile))
-    mocker.patch("tableauscraper.api.downloadCrossTabData",
-                 return_value=tableauCrossTabData)
+    mocker.patch("tableauscraper.api.downloadCrossTabDataStream",
+                 side_effect=lambda *args, **kwargs: io.BytesIO(tableauCrossTabData.encode("utf-16")))
 
     ts = TS()
     ts.loads(fakeUri)
@@ -360,3 +383,105 @@ def test_getCrossTabData(mocker: MockerFixture) -> None:
     data = wb.getCrossTabData(sheetName="[WORKSHEET1]")
     assert data.shape[0] == 3
     assert data.shape[1] == 2
+
+
+def test_getCrossTabDataChunks(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    mocker.patch("tableauscraper.api.exportCrosstabServerDialog",
+                 return_value=json.loads(tableauExportCrosstabServerDialog))
+    mocker.patch("tableauscraper.api.exportCrosstabToCsvServer",
+                 return_value=json.loads(tableauExportCrosstabToCsvServerGenExportFile))
+    mocker.patch("tableauscraper.api.downloadCrossTabDataStream",
+                 return_value=io.BytesIO(tableauCrossTabData.encode("utf-16")))
+
+    ts = TS()
+    ts.loads(fakeUri)
+    wb = ts.getWorkbook()
+
+    chunks = list(wb.getCrossTabData(sheetName="[WORKSHEET1]", chunkSize=1))
+    assert len(chunks) == 3
+    assert all([t.shape[1] == 2 for t in chunks])
+
+
+def test_getAllCrossTabs(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    dialog = json.loads(tableauExportCrosstabServerDialog)
+    dialog["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]["presentationLayerNotification"][0]["presModelHolder"][
+        "genExportCrosstabOptionsDialogPresModel"]["thumbnailSheetPickerItems"].append({
+            "thumbnailUri": "", "sheetName": "[WORKSHEET2]", "sheetdocId": "{YYYYY}"
+        })
+    exportDialog = mocker.patch("tableauscraper.api.exportCrosstabServerDialog",
+                                return_value=dialog)
+    threads = []
+
+    def exportResponse(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return json.loads(tableauExportCrosstabToCsvServerGenExportFile)
+
+    def downloadResponse(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return io.BytesIO(tableauCrossTabData.encode("utf-16"))
+    exportCsv = mocker.patch("tableauscraper.api.exportCrosstabToCsvServer",
+                             side_effect=exportResponse)
+    mocker.patch("tableauscraper.api.downloadCrossTabDataStream",
+                 side_effect=downloadResponse)
+
+    ts = TS()
+    ts.loads(fakeUri)
+    wb = ts.getWorkbook()
+
+    result = wb.getAllCrossTabs()
+    assert list(result.keys()) == ["[WORKSHEET1]", "[WORKSHEET2]"]
+    assert all([t.shape == (3, 2) for t in result.values()])
+    assert exportDialog.call_count == 1
+    assert [t.args[1] for t in exportCsv.call_args_list] == [
+        "{XXXXX-XXXX-XXXX-XXXX-XXXXXXXXXX}", "{YYYYY}"]
+    # exports and downloads run in the workers
+    assert len(threads) == 4
+    assert threading.current_thread() not in threads
+
+    result = wb.getAllCrossTabs(
+        sheetNames=["[WORKSHEET2]", "[UNKNOWN]"], workers=1)
+    assert list(result.keys()) == ["[WORKSHEET2]", "[UNKNOWN]"]
+    assert result["[WORKSHEET2]"].shape == (3, 2)
+    assert result["[UNKNOWN]"] is None
+
+
+def test_lazyWorksheets(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    mocker.patch("tableauscraper.api.select", return_value=vqlCmdResponse)
+    getData = mocker.spy(utils, "getData")
+    ts = TS()
+    ts.loads(fakeUri)
+    workbook = ts.getWorkbook()
+    assert len(workbook.worksheets) == 2
+    # nothing is decoded until a worksheet data is read
+    assert getData.call_count == 0
+    assert not workbook.worksheets[0].isLoaded()
+
+    ws = workbook.getWorksheet("[WORKSHEET1]")
+    assert ws.data.shape == (4, 2)
+    assert ws.isLoaded()
+    assert not workbook.worksheets[1].isLoaded()
+    assert getData.call_count == 1
+    # decoded once then cached
+    assert ws.data is ws.data
+    assert getData.call_count == 1
+
+    workbook = ws.select("[FIELD1]", "2")
+    assert not any([t.isLoaded() for t in workbook.worksheets])
+    callCount = getData.call_count
+    assert workbook.worksheets[0].data.shape[0] == 4
+    assert getData.call_count == callCount + 1
@@ -25,6 +25,7 @@ from tests.python.test_common import storyPointsInfo as storyPointsInfo
 from tests.python.test_common import tableauDownloadableSummaryData as tableauDownloadableSummaryData
 from tests.python.test_common import tableauDownloadableUnderlyingData as tableauDownloadableUnderlyingData
 import json
+import pandas as pd
 
 
 def test_TableauWorksheet(mocker: MockerFixture) -> None:
@@ -471,3 +472,146 @@ def test_TableauWorksheet_renderTooltip(mocker: MockerFixture) -> None:
         x=0, y=0
     )
     assert tableauDataFrameGroup == "<div></div>"
+
+
+def test_TableauWorksheet_selectIsMemoized(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponseWithTupleIds)
+    select = mocker.patch("tableauscraper.api.select",
+                          return_value=vqlCmdResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    ws = dashboard.getWorksheets(
+        ts, dataWithTupleIds, info).getWorksheet("[WORKSHEET1]")
+
+    getData = mocker.spy(utils, "getData")
+    getIndicesInfo = mocker.spy(utils, "getIndicesInfo")
+    for value, tupleId in [("2", 2), ("3", 4), ("5", 8), ("2", 2)]:
+        ws.select("[FIELD1]", value)
+        assert select.call_args[0][2] == [tupleId]
+    # the column is decoded once, indices info once per flags
+    assert getData.call_count == 1
+    assert getIndicesInfo.call_count == 2
+
+    # returned values are copies of the cache
+    values = ws.getSelectableValues("[FIELD1]")
+    assert values == ["2", "3", "4", "5"]
+    values.append("X")
+    assert ws.getSelectableValues("[FIELD1]") == ["2", "3", "4", "5"]
+
+    # unknown value is logged, no command is sent
+    callCount = select.call_count
+    workbook = ws.select("[FIELD1]", "X")
+    assert len(workbook.worksheets) == 0
+    assert select.call_count == callCount
+
+
+def test_TableauWorksheet_setFilters(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    filter = mocker.patch("tableauscraper.api.filter",
+                          return_value=vqlCmdResponse)
+    getWorksheetsCmdResponse = mocker.spy(
+        dashboard, "getWorksheetsCmdResponse")
+    ts = TS()
+    ts.loads(fakeUri)
+    secondFilter = dict(ts.getWorksheet("[WORKSHEET1]").getFilters()[0])
+    secondFilter["column"] = "FILTER_2"
+    secondFilter["globalFieldName"] = "[FILTER].[FILTER_2]"
+    ts.filters["[WORKSHEET1]"][secondFilter["globalFieldName"]] = secondFilter
+    ws = ts.getWorksheet("[WORKSHEET1]")
+
+    wb = ws.setFilters({
+        "FILTER_1": "FITLTER_VALUE_2",
+        "FILTER_2": ["FITLTER_VALUE_1", "FITLTER_VALUE_3"],
+    })
+    assert type(wb) is TableauWorkbook
+    assert wb.getWorksheet("[WORKSHEET1]").data.shape == (4, 2)
+    # one command per column, a single workbook is built
+    assert [(t.kwargs["globalFieldName"], t.kwargs["selection"]) for t in filter.call_args_list] == [
+        ("[FILTER].[FILTER_1]", [1]),
+        ("[FILTER].[FILTER_2]", [0, 2]),
+    ]
+    assert getWorksheetsCmdResponse.call_count == 1
+
+    # nothing is sent when any column or value is unknown, wherever it is
+    filter.reset_mock()
+    wb = ws.setFilters({"UNKNOWN": "X", "FILTER_1": "FITLTER_VALUE_1"})
+    assert len(wb.worksheets) == 0
+    assert filter.call_count == 0
+    wb = ws.setFilters({"FILTER_1": "FITLTER_VALUE_1", "UNKNOWN": "X"})
+    assert len(wb.worksheets) == 0
+    wb = ws.setFilters({"FILTER_1": "FITLTER_VALUE_1", "FILTER_2": ["FITLTER_VALUE_1", "X"]})
+    assert len(wb.worksheets) == 0
+    assert filter.call_count == 0
+
+    wb = ws.setFilters({})
+    assert len(wb.worksheets) == 0
+
+
+def test_TableauWorksheet_selectMany(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    select = mocker.patch("tableauscraper.api.select",
+                          return_value=vqlCmdResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    ws = ts.getWorksheet("[WORKSHEET1]")
+
+    wb = ws.selectMany("[FIELD1]", ["2", "4", "5"])
+    assert type(wb) is TableauWorkbook
+    assert len(wb.worksheets) == 1
+    assert select.call_count == 1
+    assert select.call_args[0][2] == [1, 3, 4]
+
+    # unknown value, nothing is sent
+    wb = ws.selectMany("[FIELD1]", ["2", "X"])
+    assert len(wb.worksheets) == 0
+    assert select.call_count == 1
+
+
+def test_iterDownloadableUnderlyingData(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    getDownloadableUnderlyingData = mocker.patch("tableauscraper.api.getDownloadableUnderlyingData",
+                                                 return_value=json.loads(tableauDownloadableUnderlyingData))
+    ts = TS()
+    ts.loads(fakeUri)
+    ws = ts.getWorksheet("[WORKSHEET1]")
+    full = ws.getDownloadableUnderlyingData()
+
+    getDownloadableUnderlyingData.return_value = json.loads(
+        tableauDownloadableUnderlyingData)
+    frames = list(ws.iterDownloadableUnderlyingData(chunkSize=64))
+    assert getDownloadableUnderlyingData.call_args[0][3] == 0
+    assert [t.shape for t in frames] == [(64, 42), (64, 42), (64, 42), (8, 42)]
+    assert frames[1].index[0] == 64
+    pd.testing.assert_frame_equal(
+        pd.concat(frames).astype(object), full.astype(object))
+
+
+def test_iterDownloadableSummaryData(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    mocker.patch("tableauscraper.api.getDownloadableSummaryData",
+                 return_value=json.loads(tableauDownloadableSummaryData))
+    ts = TS()
+    ts.loads(fakeUri)
+    frames = list(ts.getWorksheet(
+        "[WORKSHEET1]").iterDownloadableSummaryData(numRows=200, chunkSize=150))
+    assert [t.shape for t in frames] == [(150, 8), (50, 8)]
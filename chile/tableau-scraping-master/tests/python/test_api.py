@@ -202,6 +202,22 @@ def test_getCsvData(httpserver, mocker: MockerFixture):
     assert result == tableauDownloadableCsvData
 
 
+def test_getCsvDataStream(httpserver, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    httpserver.serve_content(tableauDownloadableCsvData)
+    ts.host = httpserver.url + "/"
+    with api.getCsvDataStream(scraper=ts, viewId="") as f:
+        assert f.read().decode("utf-8") == tableauDownloadableCsvData
+    with api.getCsvDataStream(scraper=ts, viewId="", spool=False) as f:
+        assert f.read().decode("utf-8") == tableauDownloadableCsvData
+
+
 def test_setActiveStoryPoint(httpserver, mocker: MockerFixture):
     mocker.patch(
         "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
@@ -275,6 +291,20 @@ def test_tableau_downloadable_csv_data(httpserver, mocker: MockerFixture):
     assert result == tableauCrossTabData
 
 
+def test_downloadCrossTabDataStream(httpserver, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    httpserver.serve_content(tableauCrossTabData.encode("utf-16"))
+    ts.host = httpserver.url + "/"
+    with api.downloadCrossTabDataStream(scraper=ts, resultKey="xxx") as f:
+        assert f.read().decode("utf-16") == tableauCrossTabData
+
+
 def test_delayExcution():
     ts = TS()
     ts.lastActionTime = time.time()
@@ -0,0 +1,249 @@
+import io
+import json
+import os
+import threading
+import time
+import pytest
+from pytest_mock import MockerFixture
+from tableauscraper import TableauScraper as TS
+from tableauscraper import api
+from tableauscraper import cache
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+
+
+def test_commandKeyChainsState():
+    root = cache.getStateHash(fakeUri)
+    assert root == cache.getStateHash(fakeUri)
+    assert root != cache.getStateHash(fakeUri, {"a": "b"})
+    # a republished viz starts from another state
+    assert root != cache.getStateHash(fakeUri, bootstrap={"0": {"dataColumns": []}})
+    assert cache.getStateHash(fakeUri, bootstrap={"0": {"dataColumns": []}}) != cache.getStateHash(
+        fakeUri, bootstrap={"0": {"dataColumns": [{"dataType": "integer"}]}})
+    key = cache.getCommandKey(root, "tabdoc/select", (("worksheet", (None, "ws")),))
+    # tuples and their json round trip give the same key
+    assert key == cache.getCommandKey(
+        root, "tabdoc/select", [["worksheet", [None, "ws"]]])
+    assert key != cache.getCommandKey(
+        key, "tabdoc/select", (("worksheet", (None, "ws")),))
+
+
+def test_responseCacheTtl(tmp_path):
+    responseCache = cache.ResponseCache(str(tmp_path), ttl=60)
+    responseCache.set("a", {"value": 1})
+    assert responseCache.get("a") == {"value": 1}
+    assert responseCache.get("b") is None
+    assert (responseCache.hits, responseCache.misses) == (1, 1)
+
+    # entries are reloaded from disk
+    responseCache = cache.ResponseCache(str(tmp_path), ttl=60)
+    assert responseCache.get("a") == {"value": 1}
+    responseCache.ttl = 0
+    time.sleep(0.01)
+    assert responseCache.get("a") is None
+    assert not os.path.exists(responseCache.getFile("a"))
+
+
+def test_responseCacheLruEviction(tmp_path):
+    entrySize = len(json.dumps({"created": time.time(), "response": "x" * 100}))
+    responseCache = cache.ResponseCache(str(tmp_path), maxSize=entrySize * 2 + 8)
+    responseCache.set("a", "x" * 100)
+    responseCache.set("b", "x" * 100)
+    # a is now the most recently used
+    assert responseCache.get("a") is not None
+    responseCache.set("c", "x" * 100)
+    assert responseCache.get("b") is None
+    assert responseCache.get("a") is not None
+    assert responseCache.get("c") is not None
+    assert responseCache.size <= entrySize * 2 + 8
+
+    responseCache.clear()
+    assert responseCache.size == 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_cachedCommands(httpserver, tmp_path, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+
+    def run():
+        ts = TS(delayMs=0, cache=cache.ResponseCache(str(tmp_path)))
+        ts.loads(fakeUri)
+        ts.host = httpserver.url + "/"
+        api.select(scraper=ts, worksheetName="", selection=[1])
+        api.select(scraper=ts, worksheetName="", selection=[2])
+        return ts
+
+    ts = run()
+    assert len(httpserver.requests) == 2
+    assert ts.pendingCommands == []
+
+    # an identical run is served from the cache
+    ts = run()
+    assert len(httpserver.requests) == 2
+    assert ts.cache.hits == 2
+    assert len(ts.pendingCommands) == 2
+
+    # the same command after another state is a different entry
+    assert api.select(scraper=ts, worksheetName="", selection=[1]) == vqlCmdResponse
+    # both skipped commands are sent before the miss
+    assert len(httpserver.requests) == 5
+    assert ts.pendingCommands == []
+
+
+def test_uncachedCommandsSendPending(httpserver, tmp_path, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+    responseCache = cache.ResponseCache(str(tmp_path))
+    for _ in range(2):
+        ts = TS(delayMs=0, cache=responseCache)
+        ts.loads(fakeUri)
+        ts.host = httpserver.url + "/"
+        api.setParameterValue(scraper=ts, parameterName="p", value="1")
+    assert len(httpserver.requests) == 1
+    api.exportCrosstabServerDialog(ts)
+    api.exportCrosstabServerDialog(ts)
+    assert len(httpserver.requests) == 4
+
+
+def test_downloadsSendPending(httpserver, tmp_path, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+    responseCache = cache.ResponseCache(str(tmp_path))
+
+    def run():
+        ts = TS(delayMs=0, cache=responseCache)
+        ts.loads(fakeUri)
+        ts.host = httpserver.url + "/"
+        api.filter(scraper=ts, worksheetName="ws", globalFieldName="[FIELD1]",
+                   dashboard="db", selection=[1])
+        return ts
+
+    run()
+    ts = run()
+    assert len(httpserver.requests) == 1
+    assert len(ts.pendingCommands) == 1
+
+    # the csv reads the filtered session: the cached filter is sent first
+    # (the test server has one response for all paths, the replayed filter must get a vizql response)
+    assert api.getCsvData(ts, viewId="") == json.dumps(vqlCmdResponse)
+    assert [t.path.split("/")[-1] for t in httpserver.requests[1:]] == [
+        "categorical-filter-by-index", ""]
+    assert "/vudcsv/" in httpserver.requests[-1].path
+    assert ts.pendingCommands == []
+
+    for download in [
+        lambda: api.getCsvDataStream(ts, viewId="").close(),
+        lambda: api.getDownloadableData(ts, "ws", "db", ""),
+        lambda: api.downloadCrossTabDataStream(ts, "key").close(),
+    ]:
+        ts.pendingCommands = [("tabdoc/select", (("worksheet", (None, "ws")),))]
+        count = len(httpserver.requests)
+        download()
+        assert len(httpserver.requests) == count + 2
+        assert httpserver.requests[count].path.endswith("/commands/tabdoc/select")
+        assert ts.pendingCommands == []
+
+
+def test_pendingCommandsLock(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS(delayMs=0)
+    ts.loads(fakeUri)
+    replaying = threading.Event()
+    sent = []
+
+    def sendRequest(scraper, session, method, url, endpoint, **kwargs):
+        if endpoint == "tabdoc/select":
+            replaying.set()
+            time.sleep(0.1)
+        sent.append(endpoint)
+        return mocker.Mock(raw=io.BytesIO(b""), headers={}, status_code=200)
+    mocker.patch("tableauscraper.api.sendRequest", side_effect=sendRequest)
+    ts.pendingCommands = [("tabdoc/select", (("worksheet", (None, "ws")),))]
+
+    replay = threading.Thread(target=api.sendPendingCommands, args=(ts,))
+    replay.start()
+    replaying.wait(5)
+    # another worker of the same scraper downloads while the replay is in progress
+    api.downloadCrossTabDataStream(ts, "key", spool=False)
+    replay.join()
+    assert sent == ["tabdoc/select", "tempfile"]
+
+
+def test_delayLockPerScraper():
+    first = TS(delayMs=0)
+    second = TS(delayMs=0)
+    assert first.delayLock is not second.delayLock
+    assert first.lock is not second.lock
+
+
+def test_failedReplayResetsState(httpserver, tmp_path, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+    responseCache = cache.ResponseCache(str(tmp_path))
+    for _ in range(2):
+        ts = TS(delayMs=0, cache=responseCache)
+        ts.loads(fakeUri)
+        ts.host = httpserver.url + "/"
+        api.select(scraper=ts, worksheetName="", selection=[1])
+    assert len(ts.pendingCommands) == 1
+
+    # the session expired on the server: the replay fails
+    httpserver.serve_content("session expired", code=410)
+    with pytest.raises(api.APIResponseException):
+        api.select(scraper=ts, worksheetName="", selection=[2])
+    assert ts.stateHash == ""
+    assert ts.pendingCommands == []
+
+    # an html error page with a 200 status is not a vizql response either
+    ts.loads(fakeUri)
+    ts.host = httpserver.url + "/"
+    api.select(scraper=ts, worksheetName="", selection=[1])
+    httpserver.serve_content("<html></html>")
+    with pytest.raises(api.APIResponseException):
+        api.getCsvData(ts, viewId="")
+    assert ts.stateHash == ""
+
+    # the cache is not used anymore for this session
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+    count = len(httpserver.requests)
+    hits = responseCache.hits
+    api.select(scraper=ts, worksheetName="", selection=[1])
+    assert len(httpserver.requests) == count + 1
+    assert responseCache.hits == hits
+    assert ts.stateHash == ""
+
+
+def test_stateHashFromBootstrap(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS(delayMs=0)
+    ts.loads(fakeUri)
+    assert ts.stateHash == cache.getStateHash(
+        fakeUri, bootstrap=ts.dataSegments)
+    assert ts.stateHash != cache.getStateHash(fakeUri)
@@ -0,0 +1,204 @@
+import multiprocessing
+import threading
+import time
+import pandas as pd
+import pytest
+from pytest_mock import MockerFixture
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+from tableauscraper import TableauScraper as TS
+from tableauscraper import crawler
+from tableauscraper import api
+
+
+def mockBootstrap(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    return mocker.patch("tableauscraper.api.getTableauData",
+                        return_value=tableauDataResponse)
+
+
+def test_getCombinations():
+    combinations = crawler.getCombinations(
+        [("A", ["a1", "a2"]), ("B", ["b1", "b2", "b3"])])
+    assert len(combinations) == 6
+    assert combinations[0] == {"A": "a1", "B": "b1"}
+    assert combinations[-1] == {"A": "a2", "B": "b3"}
+    assert crawler.getCombinations({"A": ["a1"], "B": ["b1"]}) == [
+        {"A": "a1", "B": "b1"}]
+    assert crawler.getCombinations({"A": []}) == []
+
+
+def test_crawl(mocker: MockerFixture):
+    bootstrap = mockBootstrap(mocker)
+    filterCall = mocker.patch(
+        "tableauscraper.api.filter", return_value=vqlCmdResponse)
+    values = ["FITLTER_VALUE_1", "FITLTER_VALUE_2", "FITLTER_VALUE_3"]
+    received = []
+
+    def sink(combination, df):
+        received.append((combination, df))
+
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]", {"FILTER_1": values}, sink,
+        workers=2, scraperOptions={"delayMs": 0})
+    assert failed == []
+    assert sorted([t[0]["FILTER_1"] for t in received]) == values
+    assert all(t[1].shape[0] == 4 for t in received)
+    assert filterCall.call_count == 3
+    # one bootstrap per worker, not per combination
+    assert bootstrap.call_count <= 2
+
+
+def test_crawlSinksEachFrame(mocker: MockerFixture):
+    mockBootstrap(mocker)
+    sunk = threading.Event()
+    receivedBefore = []
+    received = []
+
+    def filterResponse(*args, **kwargs):
+        if len(receivedBefore) > 0:
+            # the next combination of the chunk waits for the first frame to reach the sink
+            sunk.wait(5)
+        receivedBefore.append(len(received))
+        return vqlCmdResponse
+    mocker.patch("tableauscraper.api.filter", side_effect=filterResponse)
+
+    def sink(combination, df):
+        received.append(combination)
+        sunk.set()
+
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]",
+        {"FILTER_1": ["FITLTER_VALUE_1", "FITLTER_VALUE_2", "FITLTER_VALUE_3"]},
+        sink, workers=1, chunkSize=3, scraperOptions={"delayMs": 0})
+    assert failed == []
+    assert len(received) == 3
+    # a single chunk, its first frame was sunk before the second filter was sent
+    assert receivedBefore[:2] == [0, 1]
+
+
+def test_crawlBackpressure(mocker: MockerFixture):
+    mockBootstrap(mocker)
+    filterCall = mocker.patch("tableauscraper.crawler.applyCombination")
+    ahead = []
+
+    def sink(combination, df):
+        # the worker is blocked once the queue holds workers * 2 frames
+        time.sleep(0.1)
+        ahead.append(filterCall.call_count)
+
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]", {"FILTER_1": ["V%d" % i for i in range(8)]},
+        sink, workers=1, chunkSize=8, scraperOptions={"delayMs": 0})
+    assert failed == []
+    # first frame in the sink, two in the queue and one blocked on put
+    assert ahead[0] <= 4
+
+
+def test_crawlSinkErrorCancels(mocker: MockerFixture):
+    mockBootstrap(mocker)
+    filterCall = mocker.patch("tableauscraper.crawler.applyCombination")
+
+    def sink(combination, df):
+        raise IOError("disk full")
+
+    with pytest.raises(IOError):
+        crawler.crawl(
+            fakeUri, "[WORKSHEET1]", {"FILTER_1": ["V%d" % i for i in range(20)]},
+            sink, workers=2, chunkSize=2, scraperOptions={"delayMs": 0})
+    # the chunks not started were cancelled, the running ones stopped after their combination
+    assert filterCall.call_count < 20
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the mocks only reach forked workers")
+def test_crawlProcesses(mocker: MockerFixture):
+    mockBootstrap(mocker)
+    mocker.patch("tableauscraper.api.filter", return_value=vqlCmdResponse)
+    received = []
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]", {"FILTER_1": ["FITLTER_VALUE_1", "FITLTER_VALUE_2"]},
+        lambda c, df: received.append((c, df.shape)),
+        workers=2, processes=True, scraperOptions={"delayMs": 0})
+    assert failed == []
+    assert sorted([t[0]["FILTER_1"] for t in received]) == [
+        "FITLTER_VALUE_1", "FITLTER_VALUE_2"]
+    assert all([t[1][0] == 4 for t in received])
+
+
+def test_crawlSkipsUnchangedFilters(mocker: MockerFixture):
+    mockBootstrap(mocker)
+    filterCall = mocker.patch(
+        "tableauscraper.api.filter", return_value=vqlCmdResponse)
+    received = []
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]",
+        [("FILTER_1", ["FITLTER_VALUE_1"]),
+         ("FILTER_1", ["FITLTER_VALUE_1"])],
+        lambda c, df: received.append(c),
+        workers=1, scraperOptions={"delayMs": 0})
+    assert failed == []
+    assert len(received) == 1
+    assert filterCall.call_count == 1
+
+
+def test_crawlFailedCombination(mocker: MockerFixture):
+    bootstrap = mockBootstrap(mocker)
+    mocker.patch("tableauscraper.api.filter",
+                 side_effect=api.APIResponseException("error"))
+    received = []
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]", {"FILTER_1": ["FITLTER_VALUE_1", "UNKNOWN"]},
+        lambda c, df: received.append(c),
+        workers=1, retries=1, scraperOptions={"delayMs": 0})
+    assert received == []
+    assert [t[0]["FILTER_1"] for t in failed] == ["FITLTER_VALUE_1", "UNKNOWN"]
+    # each failure bootstraps a new session before retrying
+    assert bootstrap.call_count == 4
+
+
+def test_crawlReusesScraper(mocker: MockerFixture):
+    bootstrap = mockBootstrap(mocker)
+    filterCall = mocker.patch(
+        "tableauscraper.api.filter", return_value=vqlCmdResponse)
+    ts = TS(delayMs=0)
+    ts.loads(fakeUri)
+    values = ["FITLTER_VALUE_1", "FITLTER_VALUE_2"]
+    received = []
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]", {"FILTER_1": values},
+        lambda c, df: received.append(c), workers=1, scraper=ts)
+    assert failed == []
+    assert sorted([t["FILTER_1"] for t in received]) == values
+    # the session of the scraper is used, nothing is bootstrapped again
+    assert bootstrap.call_count == 1
+    assert all([t.args[0] is ts for t in filterCall.call_args_list])
+
+    # concurrent workers: one reuses the scraper, the others bootstrap a fork of it
+    filterCall.reset_mock()
+    failed = crawler.crawl(
+        fakeUri, "[WORKSHEET1]", {"FILTER_1": values + ["FITLTER_VALUE_3"]},
+        lambda c, df: None, workers=2, chunkSize=1, scraper=ts)
+    assert failed == []
+    scrapers = set([id(t.args[0]) for t in filterCall.call_args_list])
+    assert bootstrap.call_count - 1 == len(scrapers - set([id(ts)]))
+
+    with pytest.raises(ValueError):
+        crawler.crawl(fakeUri, "[WORKSHEET1]", {"FILTER_1": values},
+                      lambda c, df: None, scraper=ts, processes=True)
+
+
+def test_csvSink(tmp_path):
+    path = str(tmp_path / "out.csv")
+    sink = crawler.csvSink(path)
+    sink({"Estado": "Activo"}, pd.DataFrame({"a": [1, 2]}))
+    sink({"Estado": "Inactivo"}, pd.DataFrame({"a": [3]}))
+    sink({"Estado": "Inactivo"}, pd.DataFrame())
+    df = pd.read_csv(path)
+    assert list(df.columns) == ["a", "Estado"]
+    assert list(df["a"]) == [1, 2, 3]
+    assert list(df["Estado"]) == ["Activo", "Activo", "Inactivo"]
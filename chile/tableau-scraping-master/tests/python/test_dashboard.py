@@ -0,0 +1,126 @@
+import pytest
+import numpy as np
+import pandas as pd
+from pytest_mock import MockerFixture
+from tableauscraper import dashboard
+
+
+def test_buildDataFrame():
+    df = dashboard.buildDataFrame({
+        "[INT]-value": [1, 2, 3],
+        "[REAL]-value": [1, 2.5, 3],
+        "[REAL]-alias": ["1", "2.5", "3"],
+        "[STR]-alias": ["a", "b", "a"],
+        "[MIXED]-value": [1, "%null%", 3],
+        "[DATE]-value": ["2021-01-01", "2021-02-01", "2021-03-01"],
+    }, {
+        "[INT]-value": "integer",
+        "[REAL]-value": "real",
+        "[REAL]-alias": "real",
+        "[STR]-alias": "cstring",
+        "[MIXED]-value": "integer",
+        "[DATE]-value": "date",
+    })
+    assert list(df.columns) == [
+        "[INT]-value", "[REAL]-value", "[REAL]-alias", "[STR]-alias", "[MIXED]-value", "[DATE]-value"]
+    assert df["[INT]-value"].dtype == np.int64
+    assert df["[REAL]-value"].dtype == np.float64
+    assert df["[REAL]-value"].tolist() == [1.0, 2.5, 3.0]
+    assert isinstance(df["[REAL]-alias"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["[STR]-alias"].dtype, pd.CategoricalDtype)
+    assert df["[STR]-alias"].tolist() == ["a", "b", "a"]
+    assert df["[MIXED]-value"].dtype == object
+    assert df["[MIXED]-value"].tolist() == [1, "%null%", 3]
+    assert pd.api.types.is_datetime64_any_dtype(df["[DATE]-value"])
+
+
+def test_buildDataFrameRagged():
+    df = dashboard.buildDataFrame({
+        "[INT]-value": np.array([1, 2, 3], dtype=object),
+        "[SHORT]-value": [5],
+        "[STR]-alias": ["a", "b"],
+    }, {"[INT]-value": "integer", "[SHORT]-value": "integer"})
+    assert df.shape == (3, 3)
+    # short columns are padded with 0 like fillna(0) used to
+    assert df["[SHORT]-value"].tolist() == [5, 0, 0]
+    assert df["[SHORT]-value"].dtype == np.int64
+    assert df["[STR]-alias"].tolist() == ["a", "b", 0]
+
+
+def test_buildDataFrameEmpty():
+    df = dashboard.buildDataFrame({})
+    assert df.shape == (0, 0)
+    df = dashboard.buildDataFrame({"[A]-value": []})
+    assert df.shape == (0, 1)
+
+
+def test_iterWorksheetDownloadCmdResponseStableTypes(mocker: MockerFixture):
+    scraper = mocker.Mock(dataSegments={}, dataDictionary=None)
+    data = {"vqlCmdResponse": {"cmdResultList": [{"commandReturn": {"underlyingDataTable": {
+        "dataDictionary": {"dataSegments": {"0": {"dataColumns": [
+            {"dataType": "integer", "dataValues": [1, 2, 3]},
+            {"dataType": "cstring", "dataValues": ["%null%", "a", "b", "c"]},
+        ]}}},
+        "underlyingDataTableColumns": [
+            # %null% only appears in the second chunk
+            {"fieldCaption": "INT", "dataType": "integer",
+                "valueIndices": [0, 1, 2, -1], "aliasIndices": []},
+            # each chunk has its own subset of the categories
+            {"fieldCaption": "STR", "dataType": "cstring",
+                "valueIndices": [1, 1, 2, 3], "aliasIndices": []},
+        ]
+    }}}]}}
+    frames = list(dashboard.iterWorksheetDownloadCmdResponse(scraper, data, chunkSize=2))
+    assert len(frames) == 2
+    assert list(frames[0].dtypes) == list(frames[1].dtypes)
+    assert frames[0]["INT-value"].dtype == object
+    assert frames[1]["INT-value"].tolist() == [3, "%null%"]
+    assert list(frames[0]["STR-value"].cat.categories) == ["a", "b", "c"]
+    assert frames[1]["STR-value"].tolist() == ["b", "c"]
+
+
+def test_iterWorksheetDownloadCmdResponseColumnStates(mocker: MockerFixture):
+    scraper = mocker.Mock(dataSegments={}, dataDictionary=None)
+    data = {"vqlCmdResponse": {"cmdResultList": [{"commandReturn": {"underlyingDataTable": {
+        "dataDictionary": {"dataSegments": {"0": {"dataColumns": [
+            {"dataType": "integer", "dataValues": [1, 2, 2 ** 70]},
+            {"dataType": "real", "dataValues": [0.5, 1.5, 2.5, 3.5]},
+            {"dataType": "cstring", "dataValues": ["a"]},
+        ]}}},
+        "underlyingDataTableColumns": [
+            # the out of range integer is only in the second chunk
+            {"fieldCaption": "BIG", "dataType": "integer",
+                "valueIndices": [0, 1, 2, 0], "aliasIndices": []},
+            {"fieldCaption": "REAL", "dataType": "real",
+                "valueIndices": [0, 1, 2, 3], "aliasIndices": []},
+            # shorter than the others, padded with 0 in the second chunk
+            {"fieldCaption": "STR", "dataType": "cstring",
+                "valueIndices": [0, 0, 0], "aliasIndices": []},
+        ]
+    }}}]}}
+    getStateType = mocker.spy(dashboard, "getStateType")
+    frames = list(dashboard.iterWorksheetDownloadCmdResponse(scraper, data, chunkSize=2))
+    assert list(frames[0].dtypes) == list(frames[1].dtypes)
+    assert frames[0]["BIG-value"].dtype == object
+    assert frames[1]["BIG-value"].tolist() == [2 ** 70, 1]
+    assert frames[0]["REAL-value"].dtype == np.float64
+    assert frames[1]["STR-value"].tolist() == ["a", 0]
+    # only the string columns keep their distinct values
+    states = dict([(t.args[1], t.args[0]) for t in getStateType.call_args_list])
+    assert states["real"]["distinct"] == set()
+    assert states["cstring"]["kinds"] == {"string", "integer"}
+
+
+def test_buildDataFrameMissingAndOverflow():
+    df = dashboard.buildDataFrame({
+        "[INT]-value": [1, None, 3],
+        "[STR]-alias": ["a", None, "b"],
+        "[BIG]-value": [1, 2 ** 70, 3],
+    }, {"[INT]-value": "integer", "[BIG]-value": "integer"})
+    # None values inside a column are filled with 0 like fillna(0) used to
+    assert df["[INT]-value"].tolist() == [1, 0, 3]
+    assert df["[INT]-value"].dtype == np.int64
+    assert df["[STR]-alias"].tolist() == ["a", 0, "b"]
+    # integers that don't fit int64 keep the column as python objects
+    assert df["[BIG]-value"].dtype == object
+    assert df["[BIG]-value"].tolist() == [1, 2 ** 70, 3]
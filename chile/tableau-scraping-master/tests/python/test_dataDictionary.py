@@ -0,0 +1,234 @@
+import gc
+import json
+import tracemalloc
+import pytest
+import numpy as np
+from tableauscraper.dataDictionary import DataDictionary, DataView
+from tableauscraper import utils
+
+
+def segment(*columns):
+    return {
+        "dataColumns": [
+            {"dataType": dataType, "dataValues": values}
+            for dataType, values in columns
+        ]
+    }
+
+
+def test_dataView():
+    values = [1, 2, 3]
+    view = DataView(values, 2)
+    values.append(4)
+    assert len(view) == 2
+    assert view[1] == 2
+    assert view[-1] == 2
+    assert view[0:5] == [1, 2]
+    assert list(view) == [1, 2]
+    assert view == [1, 2]
+    with pytest.raises(IndexError):
+        view[2]
+
+
+def test_mergeIsIncremental():
+    segments = {
+        "0": segment(("cstring", ["a", "b"]), ("real", [1.0])),
+    }
+    dictionary = DataDictionary()
+    assert dictionary.merge(segments)
+    firstView = dictionary.getView()
+    assert firstView["cstring"] == ["a", "b"]
+
+    # merging the same segments again is a no-op
+    assert not dictionary.merge(segments)
+
+    segments["1"] = segment(("cstring", ["c"]), ("integer", [5]))
+    segments["2"] = None
+    assert dictionary.merge(segments)
+    view = dictionary.getView()
+    assert view["cstring"] == ["a", "b", "c"]
+    assert view["real"] == [1.0]
+    assert view["integer"] == [5]
+    # earlier views are snapshots
+    assert firstView["cstring"] == ["a", "b"]
+    assert "integer" not in firstView
+    # the source segments are not mutated
+    assert segments["0"]["dataColumns"][0]["dataValues"] == ["a", "b"]
+
+
+def test_viewIsReadOnly():
+    dictionary = DataDictionary()
+    dictionary.merge({"0": segment(("cstring", ["a"]))})
+    view = dictionary.getView()
+    with pytest.raises(TypeError):
+        view["cstring"] = ["b"]
+    with pytest.raises(TypeError):
+        view["cstring"][0] = "b"
+
+
+def test_mergeReplacedSegment():
+    dictionary = DataDictionary()
+    segments = {
+        "0": segment(("cstring", ["a", "b"])),
+        "1": segment(("cstring", ["c"])),
+    }
+    dictionary.merge(segments)
+    segments["0"] = segment(("cstring", ["x"]))
+    dictionary.merge(segments)
+    assert dictionary.getView()["cstring"] == ["x", "c"]
+
+
+def test_getDataFullCmdResponseExtraSegments():
+    dictionary = DataDictionary()
+    origin = {"0": segment(("cstring", ["a"]))}
+    extra = {"0": segment(("cstring", ["z"])),
+             "1": segment(("cstring", ["b"]))}
+    dataFull = utils.getDataFullCmdResponse(
+        {}, origin, extra, dataDictionary=dictionary)
+    assert dataFull["cstring"] == ["a", "b"]
+    # segments that are not persisted don't leak into the scraper data dictionary
+    assert dictionary.getView()["cstring"] == ["a"]
+
+
+def test_viewArrayIsIncremental():
+    dictionary = DataDictionary()
+    segments = {"0": segment(("cstring", ["a", "b"]))}
+    dictionary.merge(segments)
+    firstView = dictionary.getView()
+    assert firstView["cstring"].toArray().tolist() == ["a", "b"]
+    cached = dictionary.arrays["cstring"]
+
+    segments["1"] = segment(("cstring", ["c"]))
+    dictionary.merge(segments)
+    view = dictionary.getView()
+    assert np.asarray(view["cstring"]).tolist() == ["a", "b", "c"]
+    assert dictionary.arrays["cstring"][:2].tolist() == cached.tolist()
+    # earlier views are still snapshots
+    assert firstView["cstring"].toArray().tolist() == ["a", "b"]
+
+    # a view taken before a rebuild keeps its own values
+    oldView = dictionary.getView()
+    segments["0"] = segment(("cstring", ["x"]))
+    dictionary.merge(segments)
+    assert oldView["cstring"].toArray().tolist() == ["a", "b", "c"]
+    assert dictionary.getView()["cstring"].toArray().tolist() == ["x", "c"]
+
+
+def test_typedPools():
+    dictionary = DataDictionary()
+    segments = {"0": segment(("integer", [1, 2]), ("real", [1.5, 2]),
+                             ("cstring", ["a", "b"]), ("boolean", [True]))}
+    dictionary.merge(segments)
+    assert dictionary.pools["integer"].typecode == "q"
+    assert dictionary.pools["real"].typecode == "d"
+    assert type(dictionary.pools["cstring"]) is list
+    assert type(dictionary.pools["boolean"]) is list
+    view = dictionary.getView()
+    assert view["integer"] == [1, 2]
+    assert view["real"][1] == 2.0
+    assert view["boolean"] == [True]
+    assert view["integer"].toArray().dtype == np.int64
+    assert view["real"].toArray().dtype == np.float64
+    assert view["cstring"].toArray().dtype == object
+
+    # values that don't fit the type turn the pool into a list
+    segments["2"] = segment(("integer", [2 ** 70]), ("real", [3]))
+    dictionary.merge(segments)
+    assert type(dictionary.pools["integer"]) is list
+    assert dictionary.getView()["integer"] == [1, 2, 2 ** 70]
+    assert dictionary.getView()["integer"].toArray().tolist() == [1, 2, 2 ** 70]
+    assert dictionary.pools["real"].typecode == "d"
+    assert view["integer"] == [1, 2]
+    assert view["integer"].toArray().tolist() == [1, 2]
+
+    # decoded values are python objects
+    frameData = utils.getData(dictionary.getView(), [{
+        "fieldCaption": "f", "fn": "f", "dataType": "real",
+        "valueIndices": [0, 2], "aliasIndices": [-1]
+    }])
+    assert frameData == {"f-value": [1.5, 3.0], "f-alias": ["a"]}
+    assert type(frameData["f-value"][0]) is float
+
+
+def getTracedSize():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def test_releaseFreesValues():
+    count = 100000
+    text = json.dumps({"0": segment(
+        ("integer", list(range(10 ** 9, 10 ** 9 + count))),
+        ("real", [t + 0.5 for t in range(count)]),
+        ("cstring", [f"value {t}" for t in range(count)]),
+    )})
+    tracemalloc.start()
+    try:
+        start = getTracedSize()
+        segments = json.loads(text)
+        raw = getTracedSize() - start
+        # without release, the pools come on top of the segments
+        kept = DataDictionary()
+        kept.merge(segments)
+        assert getTracedSize() - start > raw
+        del kept
+
+        dictionary = DataDictionary(release=True)
+        dictionary.merge(segments)
+        view = dictionary.getView()
+        assert view["integer"].toArray()[-1] == 10 ** 9 + count - 1
+        assert view["cstring"][-1] == f"value {count - 1}"
+        released = getTracedSize() - start
+    finally:
+        tracemalloc.stop()
+    assert released < raw * 0.7
+    assert "dataValues" not in segments["0"]["dataColumns"][0]
+    assert dictionary.segments["0"] is segments["0"]
+    # numeric arrays are not kept between calls
+    assert "integer" not in dictionary.arrays
+
+
+def test_releasedSegmentsRebuild():
+    dictionary = DataDictionary(release=True)
+    segments = {
+        "0": segment(("cstring", ["a", "b"]), ("integer", [1])),
+        "1": segment(("cstring", ["c"]), ("integer", [2, 3])),
+    }
+    dictionary.merge(segments)
+    segments["0"] = segment(("cstring", ["x"]))
+    assert dictionary.merge(segments)
+    view = dictionary.getView()
+    assert view["cstring"] == ["x", "c"]
+    assert view["integer"] == [2, 3]
+    assert dictionary.layout["1"] == [("cstring", 1, 1), ("integer", 0, 2)]
+
+    # a released segment can't be decoded without the pools that hold its values
+    with pytest.raises(ValueError):
+        DataDictionary().merge(segments)
+
+    restored = DataDictionary(release=True).restore(
+        json.loads(json.dumps(dictionary.getState())), dict(segments))
+    assert restored.getView()["cstring"] == ["x", "c"]
+    assert restored.getView()["integer"].toArray().dtype == np.int64
+    assert not restored.merge(segments)
+
+
+def test_typedPoolsIndexedInPlace():
+    count = 10 ** 6
+    dictionary = DataDictionary()
+    dictionary.merge({"0": segment(("real", [t + 0.5 for t in range(count)]))})
+    view = dictionary.getView()
+    indicesInfo = [{"fieldCaption": "R", "dataType": "real",
+                    "valueIndices": [0, 10, count - 1], "aliasIndices": [], "fn": ""}]
+    tracemalloc.start()
+    try:
+        frameData = utils.getData(view, indicesInfo, asArray=True)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert frameData["R-value"].tolist() == [0.5, 10.5, count - 0.5]
+    # only the decoded rows are copied, not the pool
+    assert peak < count
+    # no view on the pool outlives the decode, it can still grow
+    dictionary.merge({"1": segment(("real", [1.5]))})
+    assert len(dictionary.getView()["real"]) == count + 1
@@ -0,0 +1,31 @@
+import pytest
+import pandas as pd
+from tableauscraper import export
+
+
+def frames():
+    yield pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    yield pd.DataFrame({"a": [3], "b": ["z"]})
+
+
+def test_writeCsv(tmp_path):
+    path = str(tmp_path / "out.csv")
+    assert export.writeCsv(frames(), path) == 3
+    assert pd.read_csv(path).to_dict("list") == {
+        "a": [1, 2, 3], "b": ["x", "y", "z"]}
+
+    # append keeps a single header
+    assert export.writeCsv(frames(), path, append=True) == 3
+    assert len(pd.read_csv(path)) == 6
+
+    # overwritten when not appending
+    assert export.writeCsv(iter([]), path) == 0
+    assert open(path).read() == ""
+
+
+def test_writeParquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "out.parquet")
+    assert export.writeParquet(frames(), path) == 3
+    assert pd.read_parquet(path).to_dict("list") == {
+        "a": [1, 2, 3], "b": ["x", "y", "z"]}
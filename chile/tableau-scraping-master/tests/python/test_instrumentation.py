@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+import pytest
+import requests
+from pytest_mock import MockerFixture
+from tableauscraper import TableauScraper as TS
+from tableauscraper import AsyncTableauScraper as ATS
+from tableauscraper import api
+from tableauscraper import instrumentation
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+
+
+def getEvent(endpoint, duration, status=200, error=None):
+    return {
+        "endpoint": endpoint,
+        "duration": duration,
+        "status": status,
+        "error": error,
+        "payloadBytes": 10,
+        "responseBytes": 100,
+        "serverTime": duration / 2,
+        "sleepTime": 0.5,
+    }
+
+
+def test_requestHooks(httpserver, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    started = []
+    ended = []
+    ts = TS(retries=0, onRequestStart=started.append,
+            onRequestEnd=[ended.append])
+    ts.loads(fakeUri)
+    content = json.dumps(vqlCmdResponse)
+    httpserver.serve_content(content)
+    ts.host = httpserver.url + "/"
+
+    api.select(scraper=ts, worksheetName="", selection=[1])
+    assert len(started) == 1
+    event = ended[0]
+    assert event is started[0]
+    assert event["endpoint"] == "tabdoc/select"
+    assert event["method"] == "POST"
+    assert event["status"] == 200
+    assert event["responseBytes"] == len(content)
+    assert event["payloadBytes"] > 0
+    assert 0 < event["serverTime"] <= event["duration"]
+    assert event["sleepTime"] >= 0
+    assert event["error"] is None
+
+    # streamed downloads only know the announced size
+    httpserver.serve_content("a,b\n1,2")
+    api.getCsvDataStream(ts, viewId="").close()
+    assert ended[-1]["endpoint"] == "vudcsv"
+    assert ended[-1]["responseBytes"] == 7
+
+    ts.host = "http://127.0.0.1:1/"
+    with pytest.raises(requests.RequestException):
+        api.select(scraper=ts, worksheetName="", selection=[1])
+    assert ended[-1]["error"] is not None
+    assert ended[-1]["status"] == 0
+
+
+def test_requestStats():
+    ts = TS()
+    stats = instrumentation.RequestStats(
+        buckets=(0.1, 1)).attach(ts)
+    for duration in [0.05, 0.2, 0.3, 2]:
+        ts.onRequestEnd[0](getEvent("tabdoc/select", duration))
+    stats.onRequestEnd(getEvent("bootstrapSession", 0.5,
+                                status=0, error="timeout"))
+    summary = stats.getSummary()
+    select = summary["tabdoc/select"]
+    assert select["count"] == 4
+    assert select["errors"] == 0
+    assert select["p50"] == 0.2
+    assert select["p99"] == 2
+    assert select["sleepTime"] == 2
+    assert select["responseBytes"] == 400
+    assert select["histogram"] == [(0.1, 1), (1, 2), (None, 1)]
+    assert summary["bootstrapSession"]["errors"] == 1
+    # slowest endpoints first
+    report = stats.report().splitlines()
+    assert report[1].startswith("tabdoc/select")
+    assert report[2].startswith("bootstrapSession")
+
+    stats.detach(ts)
+    assert ts.onRequestEnd == []
+    stats.reset()
+    assert stats.getSummary() == {}
+
+
+def test_asyncSleepTime(httpserver, mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    httpserver.serve_content(json.dumps(vqlCmdResponse))
+    stats = instrumentation.RequestStats()
+
+    def twoSelects(ts):
+        api.select(scraper=ts, worksheetName="", selection=[1])
+        api.select(scraper=ts, worksheetName="", selection=[2])
+
+    async def scenario():
+        ts = ATS(delayMs=200, onRequestEnd=stats.onRequestEnd)
+        await ts.loads(fakeUri)
+        ts.host = httpserver.url + "/"
+        ts.lastActionTime = time.time()
+        await ts.command(twoSelects, ts, keepWorkbook=False)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+    # the delay of both requests is reported, it is slept inside the instrumented request
+    select = stats.getSummary()["tabdoc/select"]
+    assert select["count"] == 2
+    assert 0.35 < select["sleepTime"] < 0.6
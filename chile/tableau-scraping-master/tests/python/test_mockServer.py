@@ -0,0 +1,54 @@
+import logging
+import time
+import requests
+from tableauscraper import TableauScraper as TS
+from tableauscraper import transport
+from benchmarks.mockServer import MockTableauServer
+from benchmarks import loadtest
+
+
+def test_mockServerScraper():
+    server = MockTableauServer(
+        tuples=100, worksheets=2, zones=4, underlyingRows=10, crossTabRows=5).start()
+    try:
+        ts = TS(logLevel=logging.WARNING, delayMs=0)
+        ts.loads(server.getVizUrl())
+        wb = ts.getWorkbook()
+        assert wb.getWorksheetNames() == ["[WORKSHEET0]", "[WORKSHEET1]"]
+        ws = ts.getWorksheet("[WORKSHEET0]")
+        assert ws.data.shape[0] == 50
+
+        wb = ws.select("[DIMENSION]", ws.getSelectableValues("[DIMENSION]")[0])
+        assert len(wb.worksheets) == 2
+        assert ws.getDownloadableUnderlyingData().shape == (10, 3)
+        assert wb.getCrossTabData("[WORKSHEET1]").shape == (5, 3)
+        assert server.requestCounts["select"] == 1
+    finally:
+        server.stop()
+
+
+def test_loadtest():
+    report = loadtest.run(users=2, iterations=2, serverOptions={
+        "tuples": 100, "worksheets": 2, "zones": 4, "underlyingRows": 10, "crossTabRows": 5
+    })
+    assert report["failedIterations"] == 0
+    assert report["total"]["errors"] == 0
+    # views, bootstrap, then per iteration select, filter, underlying data and 3 crosstab requests
+    assert report["total"]["requests"] == 2 * (2 + 2 * 6)
+    assert report["routes"]["select"]["requests"] == 4
+    assert 0 < report["total"]["p50"] <= report["total"]["p99"]
+    assert loadtest.getPercentile([3, 1, 2, 4], 50) == 2
+
+
+def test_timingAdapterSamplesEachRequest(httpserver):
+    httpserver.serve_content("busy", code=503)
+    adapter = loadtest.createTimingAdapter(poolSize=1)
+    session = transport.mountAdapter(requests.Session(), adapter)
+    start = time.perf_counter()
+    assert session.get(httpserver.url + "/views/a").status_code == 503
+    # not retried: one sample, no backoff sleep in its duration
+    assert len(adapter.samples) == 1
+    assert adapter.samples[0][0] == "views"
+    assert adapter.samples[0][2] == 503
+    assert adapter.samples[0][1] <= time.perf_counter() - start < 0.5
+    assert len(httpserver.requests) == 1
@@ -0,0 +1,118 @@
+import copy
+import gc
+import json
+import weakref
+import pytest
+from pytest_mock import MockerFixture
+from tableauscraper import TableauScraper as TS
+from tableauscraper import dashboard
+from tableauscraper import presModelIndex
+from tableauscraper import utils
+from tableauscraper.presModelIndex import PresModelIndex, getPresModelIndex
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+
+
+def worksheetZone(name, filters=None, quickFilter=None, vizData=True):
+    holder = {"visual": {}}
+    if vizData:
+        holder["visual"]["vizData"] = {}
+    if filters is not None:
+        holder["visual"]["filtersJson"] = json.dumps(filters)
+    if quickFilter is not None:
+        holder["quickFilterDisplay"] = {
+            "quickFilter": {"categoricalFilter": quickFilter}}
+    return {"worksheet": name, "presModelHolder": holder}
+
+
+def test_presModelIndex():
+    quickFilter = {"fn": "[a].[b]", "columnFullNames": [], "domainTables": []}
+    zones = {
+        "0": worksheetZone("[WS1]", filters=[{"id": 1}]),
+        "1": None,
+        "2": {"presModelHolder": {"flipboard": {"storyPoints": {
+            "10": {"dashboardPresModel": {"zones": {"0": worksheetZone("[STORY]")}}}
+        }}}},
+        "3": worksheetZone("[WS2]", quickFilter=quickFilter, vizData=False),
+        "4": worksheetZone("[WS1]", filters=[{"id": 2}]),
+    }
+    index = PresModelIndex(zones)
+    assert [t["worksheet"] for t in index.getWorksheetZones()] == [
+        "[WS1]", "[WS1]"]
+    assert index.getWorksheetZone("[WS1]") is zones["0"]
+    assert index.getWorksheetZone("[WS2]") is None
+    assert index.getFilters("[WS1]") == [[{"id": 1}], [{"id": 2}]]
+    assert index.getFilters("[WS2]") == []
+    assert index.getSelectedFilters("[WS2]") == [quickFilter]
+    assert index.getColumns("[WS1]") == []
+    assert index.getColumns("[UNKNOWN]") == []
+    assert index.getStoryPointKeys() == ["10"]
+    storyPointIndex = index.getStoryPointIndex()
+    assert storyPointIndex is index.getStoryPointIndex("10")
+    assert [t["worksheet"] for t in storyPointIndex.getWorksheetZones()] == [
+        "[STORY]"]
+
+
+def test_getPresModelIndexIsShared():
+    presModel = vqlCmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
+    zones = utils.getZones(presModel)
+    index = getPresModelIndex(zones)
+    assert getPresModelIndex(zones, index) is index
+    assert getPresModelIndex(dict(zones), index) is not index
+    # nothing global keeps the index or the zones alive
+    assert getPresModelIndex(zones) is not index
+
+    columns = utils.getIndicesInfoVqlResponse(
+        presModel, "[WORKSHEET1]", index=index)
+    assert [t["fieldCaption"] for t in columns] == ["[FIELD1]", "[FIELD2]"]
+    # the columns are computed once per index
+    assert utils.getIndicesInfoVqlResponse(
+        presModel, "[WORKSHEET1]", index=index) is columns
+    assert utils.getIndicesInfoVqlResponse(presModel, "[UNKNOWN]") == []
+
+    reference = weakref.ref(index)
+    del index
+    gc.collect()
+    assert reference() is None
+
+
+def test_worksheetsShareIndex(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    response = copy.deepcopy(vqlCmdResponse)
+    zones = utils.getZones(
+        response["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"])
+    zones["99"] = dict(copy.deepcopy(zones["0"]), worksheet="[WORKSHEET3]")
+    ts = TS()
+    ts.loads(fakeUri)
+    ts.zones = zones
+    build = mocker.spy(presModelIndex, "PresModelIndex")
+    wb = dashboard.getWorksheetsCmdResponse(ts, response)
+    for worksheet in wb.worksheets:
+        worksheet.getColumns()
+    assert len(wb.worksheets) == 2
+    assert build.call_count == 1
+
+
+def test_commandIndexesResponseOnce(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    ws = ts.getWorksheet("[WORKSHEET1]")
+    mocker.patch("tableauscraper.api.select", return_value=vqlCmdResponse)
+    build = mocker.spy(presModelIndex, "PresModelIndex")
+    wb = ws.select("[FIELD1]", "2")
+    for worksheet in wb.worksheets:
+        worksheet.getColumns()
+    assert len(wb.worksheets) == 1
+    # updateFullData indexes the response for the filters, the workbook reuses it
+    assert build.call_count == 1
@@ -0,0 +1,67 @@
+import json
+from pytest_mock import MockerFixture
+from tableauscraper import TableauScraper as TS
+from tableauscraper import profiling
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+
+
+def test_disabled(mocker: MockerFixture):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    profiling.reset()
+    assert profiling.span("test", key=1) is profiling.nullSpan
+    ts = TS()
+    ts.loads(fakeUri)
+    ts.getWorkbook().getWorksheets()[0].data
+    assert profiling.getEvents() == []
+
+
+def test_profile(mocker: MockerFixture, tmp_path):
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    mocker.patch("tableauscraper.api.select", return_value=vqlCmdResponse)
+    with profiling.profile() as p:
+        ts = TS()
+        ts.loads(fakeUri)
+        wb = ts.getWorkbook()
+        ws = wb.getWorksheet("[WORKSHEET1]")
+        ws.data
+        ws.select("[FIELD1]", "2")
+        with profiling.span("test", key=1):
+            pass
+    assert not profiling.enabled
+    summary = p.getSummary()
+    for name in ["utils.getBootstrapDocuments", "dashboard.getWorksheets", "dashboard.loadWorksheet",
+                 "TableauWorksheet.updateFullData", "dashboard.getWorksheetsCmdResponse", "test"]:
+        assert summary[name]["count"] >= 1
+        assert summary[name]["max"] <= summary[name]["total"]
+    events = p.getEvents()
+    assert [t for t in events if t["name"] == "test"][0]["args"] == {"key": 1}
+    # nested spans end before their parents
+    parent = [t for t in events if t["name"] == "dashboard.getWorksheets"][0]
+    child = [t for t in events if t["name"] == "utils.getDataFull"][0]
+    assert parent["ts"] <= child["ts"]
+    assert child["ts"] + child["dur"] <= parent["ts"] + parent["dur"]
+
+    path = tmp_path / "trace.json"
+    p.exportChromeTrace(str(path))
+    with open(path) as f:
+        trace = json.load(f)
+    assert len(trace["traceEvents"]) == len(events)
+    assert all([t["ph"] == "X" for t in trace["traceEvents"]])
+
+    # events stay until the next profile
+    with profiling.profile(clear=False):
+        pass
+    assert len(profiling.getEvents()) == len(events)
+    profiling.reset()
+    assert profiling.getEvents() == []
@@ -0,0 +1,102 @@
+import threading
+import time
+from tableauscraper import TableauScraper as TS
+from tableauscraper import api
+from tableauscraper import ratelimit
+
+
+def test_tokenBucketBurst():
+    bucket = ratelimit.TokenBucket(rate=10, burst=3)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    waitTime = bucket.reserve()
+    assert 0.09 < waitTime <= 0.1
+    # debt accumulates, the next caller waits for its own slot
+    waitTime = bucket.reserve()
+    assert 0.19 < waitTime <= 0.2
+
+
+def test_tokenBucketSharedBetweenThreads():
+    bucket = ratelimit.TokenBucket(rate=20, burst=1)
+    start = time.monotonic()
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    # 10 requests, the first one is free, then 20 per second
+    assert 0.4 < elapsed < 0.7
+
+
+def test_tokenBucketAdaptiveBackoff():
+    bucket = ratelimit.TokenBucket(rate=10, burst=1, minRate=2)
+    bucket.onResponse(429)
+    assert bucket.rate == 5
+    bucket.onResponse(503)
+    bucket.onResponse(503)
+    assert bucket.rate == 2
+    for _ in range(100):
+        bucket.onResponse(200)
+    assert bucket.rate == 10
+
+
+def test_tokenBucketRetryAfter():
+    bucket = ratelimit.TokenBucket(rate=10, burst=1)
+    bucket.onResponse(429, retryAfter=1)
+    waitTime = bucket.reserve()
+    assert waitTime > 1
+
+
+def test_rateLimiterPerHost():
+    limiter = ratelimit.RateLimiter(rate=1, burst=1)
+    assert limiter.getBucket("https://a") is limiter.getBucket("https://a")
+    assert limiter.getBucket("https://a") is not limiter.getBucket("https://b")
+    assert limiter.reserve("https://a") == 0
+    assert limiter.reserve("https://b") == 0
+    assert limiter.reserve("https://a") > 0
+
+
+def test_parseRetryAfter():
+    assert ratelimit.parseRetryAfter(None) is None
+    assert ratelimit.parseRetryAfter("2") == 2
+    assert ratelimit.parseRetryAfter("Wed, 21 Oct 2015 07:28:00 GMT") is None
+
+
+def test_scraperSharedRateLimiter():
+    limiter = ratelimit.RateLimiter(rate=10, burst=1)
+    ts1 = TS(rateLimiter=limiter)
+    ts2 = TS(rateLimiter=limiter)
+    ts1.host = ts2.host = "https://public.tableau.com"
+    start = time.time()
+    api.delayExecution(ts1)
+    api.delayExecution(ts2)
+    api.delayExecution(ts1)
+    elapsed = time.time() - start
+    assert 0.15 < elapsed < 0.3
+
+
+def test_scraperRateLimiterHook(httpserver):
+    limiter = ratelimit.RateLimiter(rate=10, burst=1)
+    ts = TS(rateLimiter=limiter, retries=0)
+    api.setSession(ts)
+    httpserver.serve_content("slow down", code=429,
+                             headers={"Retry-After": "0"})
+    ts.session.post(httpserver.url)
+    assert limiter.getBucket(httpserver.url).rate == 5
+
+
+def test_delayExecutionFixedDelay():
+    ts = TS(delayMs=200)
+    ts.lastActionTime = time.time() - 0.15
+    start = time.time()
+    waitTime = api.delayExecution(ts)
+    elapsed = time.time() - start
+    # only the remaining part of the delay is slept
+    assert 0.03 < waitTime <= 0.05
+    assert elapsed < 0.1
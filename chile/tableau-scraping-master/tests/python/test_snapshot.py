@@ -0,0 +1,97 @@
+import copy
+import pytest
+from pytest_mock import MockerFixture
+from tests.python.test_common import tableauVizHtmlResponse as tableauVizHtmlResponse
+from tests.python.test_common import tableauDataResponse as tableauDataResponse
+from tests.python.test_common import vqlCmdResponse as vqlCmdResponse
+from tests.python.test_common import fakeUri as fakeUri
+from tableauscraper import TableauScraper as TS
+from tableauscraper import AsyncTableauScraper
+
+
+def bootstrap(mocker: MockerFixture) -> TS:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = TS()
+    ts.loads(fakeUri)
+    ts.session.cookies.set("workgroup_session_id", "123",
+                           domain="example.com", path="/")
+    return ts
+
+
+def test_snapshotRestore(mocker: MockerFixture) -> None:
+    ts = bootstrap(mocker)
+    state = ts.snapshot()
+    # values are saved from the data dictionary, the segments are released
+    assert state["dataSegments"] is not ts.dataSegments
+    assert all([
+        "dataValues" not in column
+        for segment in state["dataSegments"].values() for column in segment["dataColumns"]
+    ])
+    assert len(state["dataDictionary"]["pools"]["cstring"]) > 0
+
+    getTableauViz = mocker.patch("tableauscraper.api.getTableauViz")
+    getTableauData = mocker.patch("tableauscraper.api.getTableauData")
+    restored = TS().restore(state)
+    assert getTableauViz.call_count == 0
+    assert getTableauData.call_count == 0
+    assert restored.session is not ts.session
+    assert restored.session.cookies.get("workgroup_session_id") == "123"
+    assert restored.host == ts.host
+    assert restored.tableauData == ts.tableauData
+    assert restored.getWorksheet("[WORKSHEET1]").data.shape == (4, 2)
+    assert restored.filters == ts.filters
+    assert restored.filters is not ts.filters
+
+    with pytest.raises(ValueError):
+        TS().restore({"version": 0})
+
+
+def test_saveLoadSnapshot(mocker: MockerFixture, tmp_path) -> None:
+    ts = bootstrap(mocker)
+    path = str(tmp_path / "snapshot.json")
+    ts.saveSnapshot(path)
+
+    restored = TS().loadSnapshot(path)
+    assert restored.session.cookies.get("workgroup_session_id") == "123"
+    assert restored.info == ts.info
+    assert restored.filters == ts.filters
+    assert restored.getWorkbook().getWorksheetNames() == [
+        "[WORKSHEET1]", "[WORKSHEET2]"]
+
+
+def test_fork(mocker: MockerFixture) -> None:
+    ts = bootstrap(mocker)
+    forked = ts.fork()
+    assert type(forked) is TS
+    assert forked.adapter is ts.adapter
+    assert forked.session is not ts.session
+    assert forked.dataDictionary is not ts.dataDictionary
+    assert forked.session.cookies.get("workgroup_session_id") == "123"
+
+    # commands on the fork don't change the origin state
+    mocker.patch("tableauscraper.api.select", return_value=vqlCmdResponse)
+    filters = copy.deepcopy(ts.filters)
+    zones = ts.zones
+    forked.getWorksheet("[WORKSHEET1]").select("[FIELD1]", "2")
+    assert ts.zones is zones
+    assert forked.zones is not zones
+    assert ts.filters == filters
+
+
+def test_forkAsync(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "tableauscraper.api.getTableauViz", return_value=tableauVizHtmlResponse
+    )
+    mocker.patch("tableauscraper.api.getTableauData",
+                 return_value=tableauDataResponse)
+    ts = AsyncTableauScraper()
+    TS.loads(ts, fakeUri)
+    ts.workbook = ts.emptyWorkbook()
+    forked = ts.fork()
+    assert type(forked) is AsyncTableauScraper
+    assert forked.workbook is None
+    assert forked.blockingDelay == ts.blockingDelay
@@ -0,0 +1,57 @@
+from tableauscraper import state
+
+
+def getFilter(globalFieldName, values):
+    return {"globalFieldName": globalFieldName, "values": values}
+
+
+def test_mergeFilters():
+    filters = state.getFilterStore({
+        "ws1": [getFilter("a", [1]), getFilter("b", [2])],
+        "ws2": [getFilter("c", [3])],
+    })
+    merged = state.mergeFilters(filters, {
+        "ws1": [getFilter("a", [4])],
+        "ws3": [getFilter("d", [5])],
+    })
+    # updated filters move to the end, like the list based merge did
+    assert list(merged["ws1"].keys()) == ["b", "a"]
+    assert merged["ws1"]["a"]["values"] == [4]
+    assert merged["ws3"]["d"]["values"] == [5]
+    # copy on write, unchanged worksheets are shared and the previous state is untouched
+    assert merged["ws2"] is filters["ws2"]
+    assert filters["ws1"]["a"]["values"] == [1]
+    assert "ws3" not in filters
+
+
+def test_mergeParameters():
+    parameters = state.getParameterStore([
+        {"parameterName": "p1", "column": "c1", "values": ["1"]},
+        {"parameterName": "p1", "column": "c2", "values": ["1"]},
+    ])
+    assert [t["column"] for t in state.getParameters(parameters)] == ["c1", "c2"]
+    merged = state.mergeParameters(parameters, [
+        {"parameterName": "p1", "column": "c1", "values": ["2"]},
+        {"parameterName": "p2", "column": "c3", "values": ["3"]},
+        {"parameterName": "p2", "column": "c4", "values": ["3"]},
+    ])
+    # known parameters are kept, only the first control of a new parameter is added
+    assert [t["column"] for t in state.getParameters(merged)] == ["c1", "c2", "c3"]
+    assert merged["p1"] is parameters["p1"]
+    assert list(parameters.keys()) == ["p1"]
+
+
+def test_mergeZones():
+    withVizData = {"presModelHolder": {"visual": {"vizData": {}}}}
+    zones = {"1": withVizData, "2": withVizData}
+    newZones = {
+        "1": {"presModelHolder": {}},
+        "2": {"presModelHolder": {"visual": {"vizData": {"new": True}}}},
+        "3": None,
+        "4": {"presModelHolder": {}},
+    }
+    merged = state.mergeZones(zones, newZones)
+    assert merged["1"] is withVizData
+    assert merged["2"] is newZones["2"]
+    assert merged["4"] is newZones["4"]
+    assert "3" not in merged
@@ -0,0 +1,91 @@
+from pytest_mock import MockerFixture
+from pytest_localserver.http import WSGIServer
+from requests.adapters import HTTPAdapter
+from tableauscraper import TableauScraper as TS
+from tableauscraper import api
+from tableauscraper import transport
+from tests.python.test_common import tableauDownloadableCsvData
+
+
+def flakyServer(failures, status="503 Service Unavailable"):
+    calls = {"count": 0}
+
+    def app(environ, start_response):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            start_response(status, [("Content-Type", "text/plain")])
+            return [b"unavailable"]
+        start_response("200 OK", [("Content-Type", "text/csv")])
+        return [tableauDownloadableCsvData.encode("utf-8")]
+    return app, calls
+
+
+def test_createAdapter():
+    adapter = transport.createAdapter(
+        poolConnections=4, poolMaxsize=8, retries=5, backoffFactor=0, timeout=3)
+    assert adapter.timeout == 3
+    assert adapter.max_retries.total == 5
+    assert 503 in adapter.max_retries.status_forcelist
+    assert adapter._pool_maxsize == 8
+    assert adapter._pool_connections == 4
+
+
+def test_adapterDefaultTimeout(mocker: MockerFixture):
+    send = mocker.patch.object(HTTPAdapter, "send")
+    adapter = transport.createAdapter(timeout=7)
+    adapter.send(None)
+    assert send.call_args[1]["timeout"] == 7
+    adapter.send(None, timeout=2)
+    assert send.call_args[1]["timeout"] == 2
+
+
+def test_setSessionSharesAdapter():
+    ts = TS()
+    api.setSession(ts)
+    firstSession = ts.session
+    api.setSession(ts)
+    assert ts.session is not firstSession
+    assert ts.session.get_adapter("https://example.com") is ts.adapter
+    assert firstSession.get_adapter("http://example.com") is ts.adapter
+
+
+def test_sharedAdapterAcrossScrapers():
+    adapter = transport.createAdapter()
+    ts1 = TS(adapter=adapter)
+    ts2 = TS(adapter=adapter)
+    api.setSession(ts1)
+    api.setSession(ts2)
+    assert ts1.session.get_adapter("https://example.com") is adapter
+    assert ts2.session.get_adapter("https://example.com") is adapter
+
+
+def test_retryIdempotentRead():
+    app, calls = flakyServer(failures=2)
+    server = WSGIServer(application=app)
+    server.start()
+    try:
+        ts = TS(retries=3, backoffFactor=0)
+        api.setSession(ts)
+        ts.host = server.url + "/"
+        ts.tableauData = {"vizql_root": "", "sessionid": "", "sheetId": ""}
+        result = api.getCsvData(scraper=ts, viewId="")
+        assert result == tableauDownloadableCsvData
+        assert calls["count"] == 3
+    finally:
+        server.stop()
+
+
+def test_noRetryOnCommand():
+    app, calls = flakyServer(failures=1)
+    server = WSGIServer(application=app)
+    server.start()
+    try:
+        ts = TS(retries=3, backoffFactor=0, delayMs=0)
+        api.setSession(ts)
+        ts.host = server.url + "/"
+        ts.tableauData = {"vizql_root": "", "sessionid": "", "sheetId": ""}
+        r = ts.session.post(server.url + "/commands")
+        assert r.status_code == 503
+        assert calls["count"] == 1
+    finally:
+        server.stop()
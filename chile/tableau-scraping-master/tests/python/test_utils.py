@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from tableauscraper import utils
 import os.path
 import json
@@ -132,6 +133,40 @@ def test_getData():
     assert frameData["[FIELD2]-alias"] == ["6", "7", "8", "9"]
 
 
+def test_getData_negativeAndOutOfRange():
+    dataFull = {"cstring": ["a", "b", "c"], "real": [1.5, 2.5]}
+    indicesInfo = [{
+        "fieldCaption": "[FIELD1]",
+        "dataType": "real",
+        "fn": "",
+        "valueIndices": [0, -2, 5, 1, -1],
+        "aliasIndices": [],
+    }, {
+        "fieldCaption": "[FIELD2]",
+        "dataType": "integer",
+        "fn": "",
+        "valueIndices": [],
+        "aliasIndices": [2, 0, 3],
+    }]
+    frameData = utils.getData(dataFull, indicesInfo)
+    # out of range indices are dropped, negative ones are read from cstring
+    assert frameData["[FIELD1]-value"] == [1.5, "b", 2.5, "a"]
+    # unknown datatype falls back to cstring
+    assert frameData["[FIELD2]-alias"] == ["c", "a"]
+    assert frameData == {
+        k: [utils.onDataValue(i, dataFull[t], dataFull["cstring"])
+            for i in indices if i < len(dataFull[t])]
+        for k, t, indices in [
+            ("[FIELD1]-value", "real", [0, -2, 5, 1, -1]),
+            ("[FIELD2]-alias", "cstring", [2, 0, 3])
+        ]
+    }
+
+    frameData = utils.getData(dataFull, indicesInfo, asArray=True)
+    assert isinstance(frameData["[FIELD1]-value"], np.ndarray)
+    assert frameData["[FIELD1]-value"].tolist() == [1.5, "b", 2.5, "a"]
+
+
 def test_getDataFullCmdResponse():
     presModel = vqlCmdResponse["vqlCmdResponse"]["layoutStatus"]["applicationPresModel"]
     dataFull = utils.getDataFullCmdResponse(presModel, {})
@@ -264,3 +299,102 @@ def test_getIndicesInfoVqlResponse():
     ]
     indicesInfo = utils.getIndicesInfoVqlResponse(presModel, "[WORKSHEET1]")
     assert len(indicesInfo) == 0
+
+
+def test_getBootstrapDocuments():
+    info = json.dumps({"sheetName": "[SHEET]", "values": ["a;b", "}"]})
+    data = json.dumps({"secondaryInfo": {"key": 1}})
+    text = f"{len(info)};{info}{len(data)};{data}"
+    assert utils.getBootstrapDocuments(text) == [
+        json.loads(info), json.loads(data)]
+
+    # prefix in utf-16 code units doesn't match python string length
+    info = json.dumps({"value": "\U0001F600"}, ensure_ascii=False)
+    text = f"\n{len(info) + 1};{info}{len(data)};{data}\n"
+    assert utils.getBootstrapDocuments(text) == [
+        json.loads(info), json.loads(data)]
+
+    # wrong prefixes fall back to decoding one document at a time
+    text = f"433337;{info}12;{data}"
+    assert utils.getBootstrapDocuments(text) == [
+        json.loads(info), json.loads(data)]
+
+    with pytest.raises(ValueError):
+        utils.getBootstrapDocuments("<html>error</html>")
+    with pytest.raises(ValueError):
+        utils.getBootstrapDocuments(f"{len(info)};{info}")
+
+
+def test_getBootstrapDocumentsWithoutOrjson(mocker):
+    mocker.patch("tableauscraper.utils.orjson", None)
+    data = json.dumps({"secondaryInfo": {}})
+    text = f"{len(data)};{data}{len(data)};{data}"
+    assert utils.getBootstrapDocuments(text) == [
+        json.loads(data), json.loads(data)]
+
+
+def test_getTsConfigContainer():
+    text = """
+<html><body>
+<textarea class="x" id="tsConfigContainer" style="display:none">{"vizql_root": "/vizql", "value": "a &amp; b"}</textarea>
+<textarea id="other">{}</textarea>
+</body></html>
+"""
+    container = utils.getTsConfigContainer(text)
+    assert json.loads(container) == {"vizql_root": "/vizql", "value": "a & b"}
+    assert utils.getTsConfigContainer("<html></html>") is None
+    # data-id is another attribute
+    text = """
+<textarea data-id="tsConfigContainer">{"value": 1}</textarea>
+<textarea id="tsConfigContainer">{"value": 2}</textarea>
+"""
+    assert json.loads(utils.getTsConfigContainer(text)) == {"value": 2}
+
+
+def test_getTableauPlaceholderParams():
+    text = """
+<html>
+    <div class='tableauPlaceholder other' style="width: 100%">
+        <noscript><a href="#"><img src="x.png" /></a></noscript>
+        <object class="tableauViz">
+            <param name="host_url" value="https%3A%2F%2Fexample.com%2F"/>
+            <param name='site_root' value='' />
+            <param name="name" value="Book&#47;Sheet" >
+        </object>
+    </div>
+</html>
+"""
+    assert utils.getTableauPlaceholderParams(text) == {
+        "host_url": "https%3A%2F%2Fexample.com%2F",
+        "site_root": "",
+        "name": "Book/Sheet",
+    }
+    assert utils.getTableauPlaceholderParams("<div></div>") is None
+    assert utils.getTableauPlaceholderParams(
+        '<div class="tableauPlaceholder"></div>') == {}
+
+
+def test_getTableauPlaceholderParamsNestedDivs():
+    text = """
+<div data-class="tableauPlaceholder"><param name="name" value="decoy"/></div>
+<div class="tableauPlaceholder">
+    <div class="header"><div>title</div></div>
+    <object class="tableauViz">
+        <param name="host_url" value="https%3A%2F%2Fexample.com%2F"/>
+        <param name="name" value="Book&#47;Sheet"/>
+    </object>
+</div>
+<param name="site_root" value="outside"/>
+"""
+    assert utils.getTableauPlaceholderParams(text) == {
+        "host_url": "https%3A%2F%2Fexample.com%2F",
+        "name": "Book/Sheet",
+    }
+
+
+def test_getTableauPlaceholderParamsFallback(mocker):
+    # markers that the targeted extraction doesn't recognize go through bs4
+    getSoup = mocker.spy(utils, "getSoup")
+    text = '<div data-x=">" class=tableauPlaceholder><param name="name" value="a"/></div>'
+    assert utils.getTableauPlaceholderParams(text) == {"name": "a"}
+    assert getSoup.call_count == 1